@@ -5,10 +5,10 @@ from typing import Optional, Set, Union, Dict
 import json
 
 from .models import PluginInstance, Plugin, Pipeline, UploadedFiles, Feed, ComputeResource
+from .placement import optimize_placement
 
 import networkx as nx
 ### for debugging
-import matplotlib.pyplot as plt
 import math
 class ChrisClientError(Exception):
     pass
@@ -267,6 +267,37 @@ class ChrisClient:
         #print(json.dumps(dict_plugin, sort_keys=True, indent=4))
         return dict_plugin
     
+    def get_plugins_by_id(self, plugin_ids) -> Dict[int, dict]:
+        """
+        Get the details of the plugins with the given ids, following the pages of the
+        plugin search results until all of them are found.
+        :param plugin_ids: ids of the plugins
+        :raises PluginNotFoundError: if some of the plugins are not registered
+        """
+        missing = set(plugin_ids)
+        plugins = {}
+        for plugin in self._get_all_results(self.search_addr_plugins):
+            if plugin['id'] in missing:
+                plugins[plugin['id']] = plugin
+                missing.discard(plugin['id'])
+                if not missing:
+                    break
+        if missing:
+            raise PluginNotFoundError('Plugins not found: '
+                                      + ', '.join(str(i) for i in sorted(missing)))
+        return plugins
+
+    def _get_all_results(self, url: str):
+        """
+        Iterate over the results of all the pages of a paginated collection.
+        """
+        while url:
+            res = self._s.get(url)
+            res.raise_for_status()
+            data = res.json()
+            yield from data['results']
+            url = data.get('next')
+
     def check_plugin_compute_env(self, plugin_name, summary=False):
         plugin_details = self.get_plugin_details(plugin_name = plugin_name)
         compute_addr = plugin_details[plugin_name]['compute_resources']
@@ -388,7 +419,8 @@ class ChrisClient:
         identity_dict = {} ### keep track of which node_id is corresponding to which plugin id
         for link in link_list:
             identity_dict[link['id']] = link['plugin_id']
-            if 'previous_id' in link:
+            G.add_node(link['id'])
+            if link.get('previous_id') is not None:
                 previous_label = link['previous_id']
                 this_label = link['id']
                 G.add_edge(previous_label, this_label)
@@ -429,150 +461,30 @@ class ChrisClient:
             budget = amount of availiable cost that constrain the compute environment assignment
         output: a dictionary with list of compute environment assignment
         '''
-        return_dict = {}
-
-        ### 1. get all plug-in id from the given pipeline
+        ### 1. get all plug-in id from the given pipeline (in topological order)
         data = self.get_pipeline_details(pipeline_id)
-        plugin_list = data['plugin_list']
+        plugin_names = {plugin['plugin_id']: plugin['plugin_name'] for plugin in data['plugin_list']}
 
-        ### 1.2 get all compute env cost
-        res = self._s.get(self.addr_compute_resources)
-        res.raise_for_status()
-        env_data = res.json()
-        cost_dict = {}
-        compute_resources = env_data['results']
-        for i, env in enumerate(compute_resources):
-            cost_dict[env['name']] = env['cost']
-            cost_dict[i] = env['cost']
-            # cmp_cost = resource['cost']
-        # print(cost_dict)
-        ### 2. for each plug-in get the expected runtime and cost
-        ###
-        runtime_dict = {}
-        for plugin in plugin_list:
-            runtime_dict[plugin['plugin_id']] = {}
-            for i, env in enumerate(compute_resources):
-                expected_runtime = 100 # this should be changed to input size
-                ### need to change how we calculate expected_runtime
-                expected_runtime = expected_runtime / (env['cpus']+0.001)
-                ###
-                runtime_dict[plugin['plugin_id']][env['name']] = expected_runtime
-                runtime_dict[plugin['plugin_id']][i] = expected_runtime
-        # print(runtime_dict)
-        # print(runtime_dict['pl-s3retrieve']['test_env1'])
-        ### 3. construct a network where node = current plug-in, edge = the environment to take, weight = expected runtime
-        print("node sequence: ", data['topology'])
-        print("plugin sequence: ", [plugin['plugin_name'] for plugin in data['plugin_list']])
-        G = nx.DiGraph()
-        count = 0
-        num_env = len(compute_resources)
-        pos = {}
-        pos[0] = (0,0)
-        for n in range(0, len(data['topology'])):
-
-            ### 1st layer
-            # print("layer ", n)
-            if count == 0:
-                for i, env in enumerate(compute_resources):
-                    ### DO REQUIREMENT CHECK HERE
-                    ### if check fail don't add edge
-
-                    G.add_edge(count, (count+i+1), weight=env['cost'])
-                    pos[count+i+1] = (1,i)
-                    # print((1,i))
-                count = count + 1
-            ### 2nd and next layer
-            else:
-                for i, env in enumerate(compute_resources):
-                    for j, env2 in enumerate(compute_resources):
-                        ### DO REQUIREMENT CHECK HERE
-                        ### if check fail don't add edge
-                        
-                        G.add_edge(count+i, count+num_env+j, weight=env2['cost'])
-                        pos[count+num_env+j] = (math.ceil(count/num_env)+1,j)
-                        # print("edge: ", (count+i, count+num_env+j))
-                        # print((math.ceil(count/num_env)+1,j))
-                count = count + num_env
-        ### last layer
-        # print("last layer")
-        for i, env in enumerate(compute_resources):
-            ### DO REQUIREMENT CHECK HERE
-            ### if check fail don't add edge
-
-            G.add_edge(count+i, count+num_env, weight=0)
-        pos[count+i+1] = (math.ceil(count/num_env)+1,0)
-        count = count + num_env
-        ### use next 2 lines to print what's the network looks like
-        nx.draw(G, pos=pos)
-        plt.show()
-        ### 3.1 calculate all possible path
-        best_path_time = -1
-        best_path_cost = -1
-        best_path = []
-        ### for each path, calculate total expected runtime and total cost
-        for path in nx.all_simple_paths(G, source=0, target=count):
-            
-            # print(path[:-1])
-            # get total expected time
-            total_time = 0
-            total_cost = 0
-            for i,v in enumerate(path[:-2]):
-                next_node = path[i+1]
-                which_plugin = data['topology'][i]
-                env_index = cost_dict[(next_node -1) % num_env]
-                total_time = total_time + runtime_dict[which_plugin][env_index]
-                total_cost = total_cost + cost_dict[env_index]
-                # if v == 0:
-                #     total_time = total_time + runtime_dict[which_plugin][cost_dict[next_node % num_env]]
-                # else:
-                #     total_time = total_time + runtime_dict[which_plugin][cost_dict[int(next_node-this_node-num_env)]]
-
-                # print(path)
-            # print(path[:-1])
-            # print('total time = ', total_time)
-            # print('total cost =', total_cost)
-            ### replace the current best path if it doesn't go over budget and any of the following is true
-            ### 1. there's no best path yet
-            ### 2. current path has better time
-            ### 3. current path has same time but with lower cost
-            if total_cost <= budget:
-                if total_time < best_path_time or best_path_time == -1:
-                    best_path_time = total_time
-                    best_path_cost = total_cost
-                    best_path = path
-                if total_time == best_path_time and total_cost< best_path_cost:
-                    best_path_time = total_time
-                    best_path_cost = total_cost
-                    best_path = path
-
-            
-                    
-        # print("best path:", best_path)
-        ### chaging from path to which env
-        env_path = []
-        for i,v in enumerate(best_path[:-2]):
-            next_node = best_path[i+1]
-            env_index = int(cost_dict[(next_node -1) % num_env])
-            env_name = list(compute_resources)[env_index]['name']
-            env_path.append(env_name)
+        ### 1.2 get the requirements of each plug-in and all compute env
+        all_plugins = self.get_plugins_by_id(data['topology'])
+        plugins = [all_plugins[plugin_id] for plugin_id in data['topology']]
+        envs = [env for env in self._get_all_results(self.addr_compute_resources)
+                if env['name'] not in ['auto_free', 'auto_best']]
 
+        ### 2. find the lowest runtime assignment within budget (see placement module)
+        placement = optimize_placement(plugins, envs, budget)
         return_dict = {}
+        if placement is None:
+            return_dict['status'] = 'No compute environment assignment within budget'
+            return_dict['match_result'] = []
+            return return_dict
         return_dict['status'] = 'OK'
-        #return_dict['env selection'] = env_path
-        #print("plugin sequence: ", [plugin['plugin_name'] for plugin in data['plugin_list']])
         match_list = []
-        for index,plugin in enumerate(data['plugin_list']):
-            temp_dict = {}
-            temp_dict[plugin['plugin_name']] = env_path[index]
-            match_list.append(temp_dict)
+        for plugin_id, env_name in zip(data['topology'], placement['assignment']):
+            match_list.append({plugin_names[plugin_id]: env_name})
         return_dict['match_result'] = match_list
-        ### 3.2 traverse the rest of the path, 
-        ###         if during the travsersal the cost exceed budget, skip it 
-        ###         if during the travsersal the expected runtime exceed best path expected runtime, skip it 
-        ###         when travsersal complete, compare the expected runtime, set path with lower runtime as best path
-        ### 4. calculate the rest of the path
-        ### 5. output the path it takes
-
+        return_dict['expected_runtime'] = placement['runtime']
+        return_dict['expected_cost'] = placement['cost']
         return return_dict
 
     def list_all_pipelines(self):
@@ -0,0 +1,98 @@
+"""
+Pipeline placement engine. Assigns a compute environment to every plugin of a
+pipeline so that the total expected runtime is minimized while the total cost stays
+within a budget.
+
+The search is a dynamic program over the plugins and a discretized budget, so it
+runs in O(plugins * environments * budget_steps) instead of enumerating the
+|environments| ** |plugins| possible assignments.
+"""
+
+import math
+from typing import Callable, Dict, List, Optional
+
+
+# max number of budget units used by the dynamic program
+DEFAULT_BUDGET_STEPS = 1000
+
+
+def plugin_fits_env(plugin: Dict, env: Dict) -> bool:
+    """
+    Check a plugin's minimum requirements against a compute environment.
+    """
+    return (env['cpus'] >= plugin['min_cpu_limit'] and
+            env['gpus'] >= plugin['min_gpu_limit'] and
+            env['memory'] >= plugin['min_memory_limit'] and
+            env['workers'] >= plugin['min_number_of_workers'])
+
+
+def default_expected_runtime(plugin: Dict, env: Dict) -> float:
+    """
+    Estimate a plugin's runtime on a compute environment (relative units).
+    """
+    return 100 / (env['cpus'] + 0.001)
+
+
+def get_budget_unit(costs: List[float], budget: float, budget_steps: int) -> float:
+    """
+    Get the cost of a budget unit. Integer costs are kept exact when the budget fits
+    in budget_steps units, otherwise the budget is split into budget_steps units.
+    """
+    if budget <= 0:
+        return 1.0
+    if budget <= budget_steps and all(float(c).is_integer() for c in costs):
+        return 1.0
+    return budget / budget_steps
+
+
+def optimize_placement(plugins: List[Dict], envs: List[Dict], budget: float,
+                       runtime: Callable[[Dict, Dict], float] = default_expected_runtime,
+                       budget_steps: int = DEFAULT_BUDGET_STEPS) -> Optional[Dict]:
+    """
+    Find the assignment of environments to the plugins (in pipeline order) with the
+    lowest total expected runtime (ties broken by the lowest cost) whose total cost
+    is within budget. Only environments that meet a plugin's requirements are
+    considered for that plugin. Costs are rounded up to whole budget units so the
+    returned assignment never exceeds the budget.
+
+    Return a dictionary with the 'assignment' (list of environment names), the
+    expected 'runtime' and the 'cost', or None if there is no feasible assignment.
+    """
+    unit = get_budget_unit([env['cost'] for env in envs], budget, budget_steps)
+    max_units = int(math.floor(budget / unit + 1e-9)) if budget > 0 else 0
+    env_units = [int(math.ceil(env['cost'] / unit - 1e-9)) for env in envs]
+
+    # best[u] = (runtime, cost) of the best partial assignment that spends u units
+    best = [None] * (max_units + 1)
+    best[0] = (0.0, 0.0)
+    choices = []  # choices[k][u] = (env index, previous units) for plugin k
+    for plugin in plugins:
+        options = [(i, env_units[i], runtime(plugin, env), env['cost'])
+                   for i, env in enumerate(envs)
+                   if env_units[i] <= max_units and plugin_fits_env(plugin, env)]
+        new_best = [None] * (max_units + 1)
+        choice = [None] * (max_units + 1)
+        for u, current in enumerate(best):
+            if current is None:
+                continue
+            for i, units, env_runtime, cost in options:
+                v = u + units
+                if v > max_units:
+                    continue
+                candidate = (current[0] + env_runtime, current[1] + cost)
+                if new_best[v] is None or candidate < new_best[v]:
+                    new_best[v] = candidate
+                    choice[v] = (i, u)
+        best = new_best
+        choices.append(choice)
+
+    feasible = [(value, u) for u, value in enumerate(best) if value is not None]
+    if not feasible:
+        return None
+    (total_runtime, total_cost), u = min(feasible)
+    assignment = []
+    for choice in reversed(choices):
+        i, u = choice[u]
+        assignment.append(envs[i]['name'])
+    assignment.reverse()
+    return {'assignment': assignment, 'runtime': total_runtime, 'cost': total_cost}
@@ -0,0 +1,29 @@
+"""
+Benchmark of the pipeline placement optimizer. It is not collected with the unit tests
+and must be run separately:
+
+    python -m unittest tests.benchmark_placement
+"""
+
+from unittest import TestCase
+import random
+import time
+
+from chrisclient.placement import optimize_placement
+
+from .test_placement import make_plugin, make_env
+
+
+class BenchmarkPlacement(TestCase):
+
+    def test_benchmark_optimize_placement_50_plugins_20_envs(self):
+        rnd = random.Random(1)
+        plugins = [make_plugin(f'pl-{i}') for i in range(50)]
+        envs = [make_env(f'env-{j}', rnd.randint(1, 64) * 1000, rnd.uniform(0, 10))
+                for j in range(20)]
+        start = time.perf_counter()
+        placement = optimize_placement(plugins, envs, budget=100)
+        elapsed = time.perf_counter() - start
+        print(f'\n50 plugins x 20 environments placement time: {elapsed:.3f}s '
+              f'(exhaustive search: 20^50 assignments)')
+        self.assertEqual(len(placement['assignment']), 50)
@@ -0,0 +1,104 @@
+from unittest import TestCase, mock
+import itertools
+import random
+import time
+
+from chrisclient.client import ChrisClient, PluginNotFoundError
+from chrisclient.placement import optimize_placement, plugin_fits_env
+
+
+def make_plugin(name, cpu=1000, gpu=0, memory=200, workers=1):
+    return {'name': name, 'min_cpu_limit': cpu, 'min_gpu_limit': gpu,
+            'min_memory_limit': memory, 'min_number_of_workers': workers}
+
+
+def make_env(name, cpus, cost, gpus=0, memory=16000, workers=4):
+    return {'name': name, 'cpus': cpus, 'gpus': gpus, 'memory': memory,
+            'workers': workers, 'cost': cost}
+
+
+class TestPlacement(TestCase):
+
+    def test_optimize_placement_minimizes_runtime_within_budget(self):
+        plugins = [make_plugin('pl-a'), make_plugin('pl-b'), make_plugin('pl-c')]
+        envs = [make_env('free', 1000, 0), make_env('medium', 4000, 2),
+                make_env('large', 16000, 5)]
+        placement = optimize_placement(plugins, envs, budget=9)
+        self.assertEqual(placement['cost'], 9)
+        self.assertEqual(sorted(placement['assignment']), ['large', 'medium', 'medium'])
+
+        placement = optimize_placement(plugins, envs, budget=0)
+        self.assertEqual(placement['assignment'], ['free', 'free', 'free'])
+        self.assertEqual(placement['cost'], 0)
+
+    def test_optimize_placement_matches_exhaustive_search(self):
+        rnd = random.Random(0)
+        plugins = [make_plugin(f'pl-{i}', cpu=rnd.choice([1000, 4000])) for i in range(5)]
+        envs = [make_env(f'env-{j}', rnd.choice([1000, 2000, 4000, 8000]),
+                         rnd.randint(0, 6)) for j in range(4)]
+        budget = 20
+        best = None
+        for assignment in itertools.product(envs, repeat=len(plugins)):
+            if not all(plugin_fits_env(p, e) for p, e in zip(plugins, assignment)):
+                continue
+            cost = sum(e['cost'] for e in assignment)
+            runtime = sum(100 / (e['cpus'] + 0.001) for e in assignment)
+            if cost <= budget and (best is None or (runtime, cost) < best):
+                best = (runtime, cost)
+        placement = optimize_placement(plugins, envs, budget)
+        self.assertAlmostEqual(placement['runtime'], best[0])
+        self.assertEqual(placement['cost'], best[1])
+
+    def test_optimize_placement_respects_plugin_requirements(self):
+        plugins = [make_plugin('pl-gpu', gpu=1)]
+        envs = [make_env('cpu', 64000, 0), make_env('gpu', 1000, 1, gpus=2)]
+        placement = optimize_placement(plugins, envs, budget=1)
+        self.assertEqual(placement['assignment'], ['gpu'])
+        self.assertIsNone(optimize_placement(plugins, envs, budget=0))
+
+    def test_optimize_placement_50_plugins_20_envs(self):
+        rnd = random.Random(1)
+        plugins = [make_plugin(f'pl-{i}') for i in range(50)]
+        envs = [make_env(f'env-{j}', rnd.randint(1, 64) * 1000, rnd.uniform(0, 10))
+                for j in range(20)]
+        start = time.perf_counter()
+        placement = optimize_placement(plugins, envs, budget=100)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(len(placement['assignment']), 50)
+        self.assertLessEqual(placement['cost'], 100)
+
+class TestMatchPipeline(TestCase):
+
+    def setUp(self):
+        addr = 'http://localhost:8000/api/v1/'
+        self.client = ChrisClient.__new__(ChrisClient)
+        self.client.addr = addr
+        self.client.search_addr_plugins = addr + 'plugins/search/'
+        self.client.addr_compute_resources = addr + 'computeresources/'
+        # 12 plugins split in two pages and two compute resources
+        plugins = [dict(make_plugin(f'pl-{i}'), id=i) for i in range(1, 13)]
+        envs = [make_env('free', 1000, 0), make_env('large', 16000, 5)]
+        pages = {
+            addr + 'plugins/search/': {'results': plugins[:10],
+                                       'next': addr + 'plugins/search/?offset=10'},
+            addr + 'plugins/search/?offset=10': {'results': plugins[10:], 'next': None},
+            addr + 'computeresources/': {'results': envs, 'next': None},
+        }
+        self.client._s = mock.Mock()
+        self.client._s.get.side_effect = lambda url: mock.Mock(
+            json=mock.Mock(return_value=pages[url]))
+
+    def test_match_pipeline_finds_plugins_beyond_first_page(self):
+        details = {'topology': [1, 12],
+                   'plugin_list': [{'plugin_id': 1, 'plugin_name': 'pl-1'},
+                                   {'plugin_id': 12, 'plugin_name': 'pl-12'}]}
+        with mock.patch.object(self.client, 'get_pipeline_details',
+                               return_value=details):
+            result = self.client.match_pipeline(1, budget=5)
+        self.assertEqual(result['status'], 'OK')
+        self.assertEqual(result['expected_cost'], 5)
+        self.assertEqual(len(result['match_result']), 2)
+
+    def test_get_plugins_by_id_raises_for_missing_plugins(self):
+        with self.assertRaises(PluginNotFoundError):
+            self.client.get_plugins_by_id([1, 99])
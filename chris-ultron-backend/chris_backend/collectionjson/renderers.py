@@ -1,11 +1,13 @@
 
 import json
+from collections import OrderedDict
 
 from rest_framework.serializers import HyperlinkedRelatedField, HyperlinkedIdentityField
 from rest_framework.serializers import HyperlinkedModelSerializer, ManyRelatedField
 from rest_framework.renderers import JSONRenderer
 
 from .fields import ItemLinkField
+from .services import get_sparse_fieldset
 
 
 class CollectionJsonRenderer(JSONRenderer):
@@ -47,9 +49,17 @@ class CollectionJsonRenderer(JSONRenderer):
         else:
             return [self._make_link(field_name, data)]
 
-    def _transform_item(self, serializer, item):
+    def _get_sparse_item(self, request, item, id_field=None):
+        names = get_sparse_fieldset(request, item.keys())
+        if names is None:
+            return item
+        return OrderedDict((k, v) for (k, v) in item.items()
+                           if k in names or k == id_field)
+
+    def _transform_item(self, serializer, item, request=None):
         fields = serializer.fields.items()
         id_field = self._get_id_field(serializer)
+        item = self._get_sparse_item(request, item, id_field)
         related_fields = self._get_related_fields(fields, id_field)
 
         data = [self._transform_field(k, item[k])
@@ -62,7 +72,8 @@ class CollectionJsonRenderer(JSONRenderer):
 
         links = []
         for x in related_fields:
-            links.extend(self._get_item_field_links(x, item))
+            if x in item:
+                links.extend(self._get_item_field_links(x, item))
 
         if links:
             result['links'] = links
@@ -72,12 +83,14 @@ class CollectionJsonRenderer(JSONRenderer):
     def _transform_items(self, view, data):
         if isinstance(data, dict):
             data = [data]
+        request = getattr(view, 'request', None)
 
         if hasattr(view, 'get_serializer'):
             serializer = view.get_serializer()
-            return map(lambda x: self._transform_item(serializer, x), data)
+            return map(lambda x: self._transform_item(serializer, x, request), data)
         else:
-            return map(self._simple_transform_item, data)
+            return map(lambda x: self._simple_transform_item(
+                self._get_sparse_item(request, x)), data)
 
     def _is_paginated(self, data):
         pagination_keys = ('next', 'previous', 'results')
@@ -0,0 +1,24 @@
+
+from collections import OrderedDict
+
+from .services import get_sparse_fieldset
+
+
+class SparseFieldsetSerializerMixin(object):
+    """
+    Serializer mixin that only keeps the fields requested with the 'fields' and
+    'exclude' query parameters of the request in the serializer's context. The url
+    field is always kept as it identifies the serialized object.
+    """
+
+    def get_fields(self):
+        """
+        Overriden to drop the fields that were not requested.
+        """
+        fields = super(SparseFieldsetSerializerMixin, self).get_fields()
+        names = get_sparse_fieldset(self.context.get('request'), fields.keys())
+        if names is None:
+            return fields
+        url_field_name = getattr(self, 'url_field_name', None)
+        return OrderedDict((name, field) for (name, field) in fields.items()
+                           if name in names or name == url_field_name)
@@ -21,6 +21,29 @@ def get_list_response(list_view_instance, queryset):
     return Response(serializer.data)
 
 
+def get_sparse_fieldset(request, field_names):
+    """
+    Convenience function to get the subset of the given field names requested with the
+    'fields' and 'exclude' query parameters (comma-separated lists of field names) of
+    a GET request. Return None when no sparse fieldset was requested.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    query_params = getattr(request, 'query_params', request.GET)
+    fields = query_params.get('fields')
+    exclude = query_params.get('exclude')
+    if not fields and not exclude:
+        return None
+    names = list(field_names)
+    if fields:
+        requested = {name.strip() for name in fields.split(',')}
+        names = [name for name in names if name in requested]
+    if exclude:
+        excluded = {name.strip() for name in exclude.split(',')}
+        names = [name for name in names if name not in excluded]
+    return names
+
+
 def append_collection_links(response, link_dict):
     """
     Convenience function to append document-level links to a response object.
@@ -139,6 +139,34 @@ class TestCollectionJsonRendererPagination(SimpleGetTest):
         self.assertEqual(next_link.href, 'http://test.com/colleciton/previous')
 
 
+class TestCollectionJsonRendererSparseFieldset(SimpleGetTest):
+    endpoint = '/rest-api/dummy/?fields=name,some_link'
+
+    def setUp(self):
+        create_models()
+        super(TestCollectionJsonRendererSparseFieldset, self).setUp()
+
+    def test_only_requested_fields_are_rendered(self):
+        dummy = self.collection.items[0]
+        self.assertTrue(dummy.href.startswith('http://testserver/rest-api/dummy/'))
+        self.assertEqual([d.name for d in dummy.data], ['name'])
+        self.assertEqual([l.rel for l in dummy.links], ['some_link'])
+
+
+class TestCollectionJsonRendererSparseFieldsetExclude(SimpleGetTest):
+    endpoint = '/rest-api/dummy/?exclude=name,idiots'
+
+    def setUp(self):
+        create_models()
+        super(TestCollectionJsonRendererSparseFieldsetExclude, self).setUp()
+
+    def test_excluded_fields_are_not_rendered(self):
+        dummy = self.collection.items[0]
+        self.assertEqual(len(dummy.data.find('name')), 0)
+        self.assertEqual(len(dummy.links.find(rel='idiots')), 0)
+        self.assertEqual(len(dummy.links.find(rel='moron')), 1)
+
+
 class TestCollectionJsonRendererPaginationWithNone(SimpleGetTest):
     endpoint = '/rest-api/none-paginated/'
 
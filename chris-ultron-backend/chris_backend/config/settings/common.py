@@ -46,7 +46,7 @@ INSTALLED_APPS = [
 # Pagination
 REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CollectionPagination',
     'DEFAULT_RENDERER_CLASSES': (
         'collectionjson.renderers.CollectionJsonRenderer',
         'rest_framework.renderers.JSONRenderer',
@@ -145,3 +145,69 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 STATIC_URL = '/static/'
+
+
+# Plugin instance job data
+# Maximum size (in bytes) of a job zip file held in memory before it is rolled over
+# to a temporary file on disk
+JOB_ZIP_SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+# Size (in bytes) of the chunks used when streaming objects from swift storage
+SWIFT_OBJ_CHUNK_SIZE = 1024 * 1024
+
+# Max number of plugin instance output files inserted into the DB per transaction
+FILE_REGISTRATION_BATCH_SIZE = 1000
+
+# Objects larger than this size (in bytes) are uploaded to swift storage as segmented
+# (dynamic large) objects made of segments of this size
+SWIFT_OBJ_SEGMENT_SIZE = 1024 * 1024 * 1024
+
+# pfcon pushes job status changes to the plugin instances' status callback endpoint.
+# Started plugin instances are still polled as a safety net every
+# PLUGIN_INSTANCE_STATUS_POLL_PERIOD seconds but each job's status is only checked
+# every MIN_INTERVAL seconds while young, then at intervals that grow with the job's
+# age (age * AGE_FACTOR) up to MAX_INTERVAL seconds
+PLUGIN_INSTANCE_STATUS_POLL_PERIOD = 30
+PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL = 120
+PLUGIN_INSTANCE_STATUS_POLL_MAX_INTERVAL = 1800
+PLUGIN_INSTANCE_STATUS_POLL_AGE_FACTOR = 0.1
+
+# URL of the plugin instances' status callback endpoint as reachable from pfcon. It is
+# sent to pfcon with every job submission (pfcon must post to it as the 'chris' user).
+# No status callbacks are requested when it is not set
+PLUGIN_INSTANCE_STATUS_CALLBACK_URL = None
+
+# Max number of started plugin instances on the same compute resource whose status is
+# checked by a single task (with a single pfcon session)
+PLUGIN_INSTANCE_STATUS_CHECK_BATCH_SIZE = 500
+
+# Lease locks used to run periodic tasks only once at a time across all the workers.
+# A lease expires after TASK_LEASE_TTL seconds (must be longer than the tasks' run time,
+# the waiting plugin instances scheduling task stops after half of it)
+TASK_LEASE_BACKEND = 'core.leases.DatabaseLeaseBackend'
+TASK_LEASE_TTL = 300
+
+# Max number of waiting plugin instances claimed for scheduling in a single transaction
+PLUGIN_INSTANCE_SCHEDULE_BATCH_SIZE = 1000
+
+# Whether a plugin instance queued on a saturated compute resource can be moved to
+# another compute resource its plugin is registered with that has capacity left
+PLUGIN_INSTANCE_SPILLOVER = False
+
+# Fair-share admission of the queued plugin instances. Each user's share of the
+# in-flight plugin instances is proportional to the weight of their priority class
+# (users not listed in USER_PRIORITY_CLASSES are in the DEFAULT_PRIORITY_CLASS) and
+# instances that have been queued for longer than MAX_QUEUE_WAIT seconds are admitted
+# first
+PLUGIN_INSTANCE_PRIORITY_CLASSES = {'clinical': 4, 'research': 1}
+PLUGIN_INSTANCE_DEFAULT_PRIORITY_CLASS = 'research'
+PLUGIN_INSTANCE_USER_PRIORITY_CLASSES = {}
+PLUGIN_INSTANCE_MAX_QUEUE_WAIT = 3600
+
+# Runtime models of the plugins on the compute resources used by the automatic
+# compute resource placement. They are refreshed every REFRESH_PERIOD seconds with the
+# plugin instances that finished more than REFRESH_LAG seconds ago and are only used
+# once they have been fit with at least MIN_SAMPLES plugin instances
+PLUGIN_RUNTIME_MODEL_REFRESH_PERIOD = 3600
+PLUGIN_RUNTIME_MODEL_REFRESH_LAG = 60
+PLUGIN_RUNTIME_MODEL_MIN_SAMPLES = 3
@@ -133,6 +133,8 @@ INSTALLED_APPS += ['django_extensions']
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
 
 COMPUTE_RESOURCE_URL = 'http://pfcon.remote:30005/api/v1/'
+PLUGIN_INSTANCE_STATUS_CALLBACK_URL = ('http://chris_dev:8000/api/v1/plugins/instances/'
+                                       'statuscallback/')
 
 # corsheaders
 # ------------------------------------------------------------------------------
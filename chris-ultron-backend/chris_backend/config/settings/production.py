@@ -71,6 +71,10 @@ except Exception as e:
 CHRIS_STORE_URL = get_secret('CHRIS_STORE_URL')
 
 
+# PFCON STATUS CALLBACK CONFIGURATION
+PLUGIN_INSTANCE_STATUS_CALLBACK_URL = env('PLUGIN_INSTANCE_STATUS_CALLBACK_URL', None)
+
+
 # LOGGING CONFIGURATION
 # See http://docs.djangoproject.com/en/2.2/topics/logging for
 # more details on how to customize your logging configuration.
@@ -32,6 +32,9 @@ urlpatterns = format_suffix_patterns([
     path('v1/chrisinstance/<int:pk>/',
          core_views.ChrisInstanceDetail.as_view(), name='chrisinstance-detail'),
 
+    path('v1/swiftpool/',
+         core_views.SwiftConnectionPoolStats.as_view(), name='swiftpool-stats'),
+
 
     path('v1/',
         feed_views.FeedList.as_view(), name='feed-list'),
@@ -92,6 +95,10 @@ urlpatterns = format_suffix_patterns([
          plugin_views.ComputeResourceListQuerySearch.as_view(),
          name='computeresource-list-query-search'),
 
+    path('v1/computeresources/utilization/',
+         plugin_views.ComputeResourceUtilizationList.as_view(),
+         name='computeresource-utilization-list'),
+
     path('v1/computeresources/<int:pk>/',
          plugin_views.ComputeResourceDetail.as_view(), name='computeresource-detail'),
 
@@ -193,6 +200,10 @@ urlpatterns = format_suffix_patterns([
         plugininstance_views.PluginInstanceDetail.as_view(),
         name='plugininstance-detail'),
 
+    path('v1/plugins/instances/statuscallback/',
+        plugininstance_views.PluginInstanceStatusCallback.as_view(),
+        name='plugininstance-status-callback'),
+
     path('v1/plugins/instances/<int:pk>/splits/',
          plugininstance_views.PluginInstanceSplitList.as_view(),
          name='plugininstancesplit-list'),
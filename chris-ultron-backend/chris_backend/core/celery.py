@@ -27,12 +27,16 @@ task_routes = {
     'plugininstances.tasks.run_plugin_instance': {'queue': 'main1'},
     'plugininstances.tasks.check_plugin_instance_exec_status': {'queue': 'main2'},
     'plugininstances.tasks.cancel_plugin_instance': {'queue': 'main2'},
+    'plugininstances.tasks.check_compute_resource_plugin_instances_exec_status':
+        {'queue': 'main2'},
     'plugininstances.tasks.schedule_waiting_plugin_instances':
         {'queue': 'periodic'},
     'plugininstances.tasks.check_started_plugin_instances_exec_status':
         {'queue': 'periodic'},
     'plugininstances.tasks.cancel_waiting_plugin_instances':
         {'queue': 'periodic'},
+    'plugininstances.tasks.refresh_plugin_runtime_models':
+        {'queue': 'periodic'},
 }
 app.conf.update(task_routes=task_routes)
 
@@ -42,16 +46,26 @@ app.conf.beat_schedule = {
         'task': 'plugininstances.tasks.schedule_waiting_plugin_instances',
         'schedule': 45.0,
     },
-    'check-started-plugin-instances-exec-status-every-30-seconds': {
-        'task': 'plugininstances.tasks.check_started_plugin_instances_exec_status',
-        'schedule': 30.0,
-    },
     'cancel-waiting-plugin-instances-every-30-seconds': {
         'task': 'plugininstances.tasks.cancel_waiting_plugin_instances',
         'schedule': 30.0,
     },
 }
 
+
+# setup the periodic tasks whose schedule is read from the Django settings once the
+# configuration is loaded (this module is imported while the settings are loading)
+@app.on_after_configure.connect
+def setup_periodic_tasks(sender, source, **kwargs):
+    source.beat_schedule['check-started-plugin-instances-exec-status'] = {
+        'task': 'plugininstances.tasks.check_started_plugin_instances_exec_status',
+        'schedule': float(settings.PLUGIN_INSTANCE_STATUS_POLL_PERIOD),
+    }
+    source.beat_schedule['refresh-plugin-runtime-models'] = {
+        'task': 'plugininstances.tasks.refresh_plugin_runtime_models',
+        'schedule': float(settings.PLUGIN_RUNTIME_MODEL_REFRESH_PERIOD),
+    }
+
 # use logging settings in Django settings
 @setup_logging.connect
 def config_loggers(*args, **kwags):
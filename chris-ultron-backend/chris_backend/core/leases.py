@@ -0,0 +1,147 @@
+"""
+Lease lock module that ensures an operation (eg. a periodic celery task) is only
+running once at a time across all the workers. A lease expires automatically so that
+a lock held by a worker that died mid-run does not block the operation forever.
+
+The storage backend is pluggable through the TASK_LEASE_BACKEND setting.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.utils import IntegrityError
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TaskLease
+
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseBackend(ABC):
+    """
+    Abstract base class for the lease storage backends.
+    """
+
+    @abstractmethod
+    def acquire(self, name, owner, ttl):
+        """
+        Try to acquire the named lease for ttl seconds. Return whether it was acquired.
+        """
+
+    @abstractmethod
+    def release(self, name, owner):
+        """
+        Release the named lease if it is still held by owner.
+        """
+
+
+class DatabaseLeaseBackend(LeaseBackend):
+    """
+    Lease backend that stores a lease as a DB row with an expiration date. An expired
+    lease is taken over by the next acquire call.
+    """
+
+    def acquire(self, name, owner, ttl):
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=ttl)
+        # take over the lease if it has expired (atomic conditional update)
+        if TaskLease.objects.filter(name=name, expires_at__lte=now).update(
+                owner=owner, expires_at=expires_at):
+            return True
+        try:
+            with transaction.atomic():
+                TaskLease.objects.create(name=name, owner=owner, expires_at=expires_at)
+        except IntegrityError:
+            return False  # the lease is currently held by another owner
+        return True
+
+    def release(self, name, owner):
+        TaskLease.objects.filter(name=name, owner=owner).delete()
+
+
+class PostgresAdvisoryLockBackend(LeaseBackend):
+    """
+    Lease backend that uses a PostgreSQL session-level advisory lock. The lock is
+    released by the DB server when the holder's DB connection is closed (eg. when the
+    worker dies) so the ttl is not used.
+    """
+
+    @staticmethod
+    def get_lock_key(name):
+        digest = hashlib.sha1(name.encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big', signed=True)
+
+    def acquire(self, name, owner, ttl):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [self.get_lock_key(name)])
+            return cursor.fetchone()[0]
+
+    def release(self, name, owner):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [self.get_lock_key(name)])
+
+
+class LeaseManager(object):
+    """
+    Acquire and release leases through the configured backend and keep stats about
+    the acquire latency and contention.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._stats = {'attempts': 0, 'acquired': 0, 'contended': 0,
+                       'total_acquire_latency': 0.0, 'max_acquire_latency': 0.0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(settings.TASK_LEASE_BACKEND)()
+        return self._backend
+
+    @contextmanager
+    def lease(self, name, ttl, owner=None):
+        """
+        Context manager that tries to acquire the named lease for ttl seconds and
+        yields whether it was acquired. An acquired lease is released on exit.
+        """
+        owner = owner or uuid.uuid4().hex
+        start = time.monotonic()
+        acquired = self.backend.acquire(name, owner, ttl)
+        latency = time.monotonic() - start
+        with self._lock:
+            self._stats['attempts'] += 1
+            self._stats['acquired' if acquired else 'contended'] += 1
+            self._stats['total_acquire_latency'] += latency
+            self._stats['max_acquire_latency'] = max(
+                self._stats['max_acquire_latency'], latency)
+        logger.debug('lease %s acquired=%s in %.4fs', name, acquired, latency)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.backend.release(name, owner)
+
+    def get_stats(self):
+        """
+        Return the lease usage stats of this process (latencies in seconds).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        attempts = stats['attempts']
+        stats['avg_acquire_latency'] = (stats['total_acquire_latency'] / attempts
+                                        if attempts else 0.0)
+        return stats
+
+
+lease_manager = LeaseManager()
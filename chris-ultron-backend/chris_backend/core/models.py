@@ -4,6 +4,29 @@ import uuid
 from django.db import models
 
 
+class ChrisInstanceQuerySet(models.QuerySet):
+    """
+    QuerySet class that invalidates the ChRIS instance singleton's cache when the
+    singleton is deleted or updated in bulk.
+    """
+
+    def delete(self):
+        """
+        Overriden to invalidate the singleton's cache.
+        """
+        result = super(ChrisInstanceQuerySet, self).delete()
+        ChrisInstance.clear_cache()
+        return result
+
+    def update(self, **kwargs):
+        """
+        Overriden to invalidate the singleton's cache.
+        """
+        rows = super(ChrisInstanceQuerySet, self).update(**kwargs)
+        ChrisInstance.clear_cache()
+        return rows
+
+
 class ChrisInstance(models.Model):
     """
     Model class that defines a singleton representing a ChRIS instance.
@@ -14,6 +37,8 @@ class ChrisInstance(models.Model):
     job_id_prefix = models.CharField(max_length=100, blank=True, default='chris-jid-')
     description = models.CharField(max_length=600, blank=True)
 
+    objects = ChrisInstanceQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'ChRIS instance'
         verbose_name_plural = 'ChRIS instance'
@@ -21,20 +46,48 @@ class ChrisInstance(models.Model):
     def __str__(self):
         return self.name
 
+    # per-process cache of the singleton
+    _cached_instance = None
+
     def save(self, *args, **kwargs):
         count = ChrisInstance.objects.all().count()
         if count > 0:
             self.id = 1
         super().save(*args, **kwargs)
+        ChrisInstance.clear_cache()
 
     def delete(self, *args, **kwargs):
         pass
 
     @classmethod
     def load(cls):
-        try:
-            obj = cls.objects.get(id=1)
-        except cls.DoesNotExist:
-            obj = cls()
-            obj.save()
+        """
+        Return the singleton, it is fetched from the DB only once per process (the
+        cache is invalidated when the singleton is saved, updated or deleted).
+        """
+        obj = cls._cached_instance
+        if obj is None:
+            try:
+                obj = cls.objects.get(id=1)
+            except cls.DoesNotExist:
+                obj = cls()
+                obj.save()
+            cls._cached_instance = obj
         return obj
+
+    @classmethod
+    def clear_cache(cls):
+        cls._cached_instance = None
+
+
+class TaskLease(models.Model):
+    """
+    Model class that defines a time-limited lock held by the task run (owner) that
+    acquired it.
+    """
+    name = models.CharField(max_length=200, unique=True)
+    owner = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
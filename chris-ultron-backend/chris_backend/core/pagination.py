@@ -0,0 +1,125 @@
+
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.pagination import LimitOffsetPagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the first field of the paginated queryset's ordering
+    (or its model's default ordering). The page size is set with the same 'limit'
+    query parameter used by the limit/offset pagination and an empty cursor requests
+    the first page.
+    """
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Overriden to key the cursor on the queryset's ordering instead of a fixed
+        ordering declared in the pagination class. The primary key is appended as a
+        tie-breaker when the key field is not unique.
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        order = ordering[0] if ordering else '-pk'
+        if not isinstance(order, str) or order == '?':
+            order = '-pk'
+        descending = order.startswith('-')
+        name = order.lstrip('-')
+        if name == 'pk':
+            return (order,)
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return ('-pk',)  # a lookup spanning relations can't be a cursor key
+        if field.many_to_one or field.one_to_one:
+            name = field.attname  # key on the foreign key column
+        elif field.is_relation:
+            return ('-pk',)
+        prefix = '-' if descending else ''
+        if field.unique or field.primary_key:
+            return (prefix + name,)
+        return (prefix + name, prefix + 'pk')
+
+    def decode_cursor(self, request):
+        """
+        Overriden to treat an empty cursor as the cursor of the first page.
+        """
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super(KeysetCursorPagination, self).decode_cursor(request)
+
+
+class CollectionPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that clients can switch to a keyset cursor pagination by
+    passing the 'cursor' query parameter (empty for the first page). The cursor pages
+    are fetched with an indexed range scan instead of a deep OFFSET scan and their
+    responses don't include the total count of the collection. The count can also be
+    skipped in limit/offset mode by passing 'count=false'.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Overriden to delegate to the cursor pagination when a cursor was passed and to
+        avoid counting the collection when the count was not requested.
+        """
+        self.cursor_pagination = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_pagination = KeysetCursorPagination()
+            page = self.cursor_pagination.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor_pagination.display_page_controls
+            return page
+        count = request.query_params.get(self.count_query_param, '')
+        if count.lower() not in ('false', '0'):
+            return super(CollectionPagination, self).paginate_queryset(queryset,
+                                                                       request, view)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = None
+        self.offset = self.get_offset(request)
+        self.request = request
+        # fetch an extra item to know whether there is a following page
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        """
+        Overriden to leave the count out of the response when it was not computed.
+        """
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        if self.count is not None:
+            return super(CollectionPagination, self).get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        """
+        Overriden to get the next link without the count of the collection.
+        """
+        if self.count is not None:
+            return super(CollectionPagination, self).get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def to_html(self):
+        """
+        Overriden to render the page controls of the cursor pagination in the
+        browsable API.
+        """
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.to_html()
+        return super(CollectionPagination, self).to_html()
@@ -5,6 +5,9 @@ Swift storage manager module.
 import logging
 import os
 import time
+import random
+import threading
+from contextlib import contextmanager
 
 from swiftclient import Connection
 from swiftclient.exceptions import ClientException
@@ -13,66 +16,397 @@ from swiftclient.exceptions import ClientException
 logger = logging.getLogger(__name__)
 
 
+class RetryBudget(object):
+    """
+    Process-wide thread-safe token bucket that limits the rate of retries so that
+    workers don't pile up retry storms while the storage service is struggling.
+    Every retry takes one token and tokens are refilled at a constant rate.
+    """
+
+    def __init__(self, capacity=50, refill_rate=5):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per second
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token from the budget. Return False if the budget is exhausted.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._last_refill) * self.refill_rate)
+            self._last_refill = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """
+    Retry policy with capped exponential backoff and full jitter. A call is given up
+    when the max number of attempts is reached, when the next retry would exceed the
+    per-call deadline (in seconds) or when the retry budget is exhausted. Retried
+    errors are logged with the policy's log level.
+    """
+
+    def __init__(self, max_attempts=5, base_delay=0.2, max_delay=5, deadline=30,
+                 budget=None, log_level=logging.ERROR):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.budget = budget
+        self.log_level = log_level
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'retries': 0, 'give_ups': 0,
+                       'budget_exhausted': 0}
+
+    def get_delay(self, attempt):
+        """
+        Return a random delay (in seconds) to wait before the passed retry attempt.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, func, *args, retry_if=None, **kwargs):
+        """
+        Call func with the passed arguments retrying on ClientException errors (or
+        on the errors for which the retry_if predicate returns True).
+        """
+        if retry_if is None:
+            retry_if = lambda e: isinstance(e, ClientException)
+        deadline = time.monotonic() + self.deadline
+        self._count('calls')
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not retry_if(e):
+                    raise
+                logger.log(self.log_level, str(e))
+                attempt += 1
+                delay = self.get_delay(attempt)
+                if attempt >= self.max_attempts or time.monotonic() + delay > deadline:
+                    self._count('give_ups')
+                    raise
+                if self.budget is not None and not self.budget.acquire():
+                    self._count('budget_exhausted')
+                    self._count('give_ups')
+                    raise
+                self._count('retries')
+                time.sleep(delay)
+
+    def get_stats(self):
+        """
+        Return a dictionary with the policy's counters.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, counter):
+        """
+        Internal method to increment one of the policy's counters.
+        """
+        with self._lock:
+            self._stats[counter] += 1
+
+
+# process-wide retry budget shared by all storage operations
+retry_budget = RetryBudget()
+
+# process-wide retry policy used by all SwiftManager storage operations
+retry_policy = RetryPolicy(budget=retry_budget)
+
+
+class PooledConnection(Connection):
+    """
+    Swift storage connection that belongs to a connection pool. Auth tokens obtained
+    by the connection are shared with the other connections in the pool.
+    """
+
+    def __init__(self, pool, pool_key, *args, **kwargs):
+        self.pool = pool
+        self.pool_key = pool_key
+        super(PooledConnection, self).__init__(*args, **kwargs)
+
+    def get_auth(self):
+        """
+        Overriden to record the auth round trip and share the new token.
+        """
+        url, token = super(PooledConnection, self).get_auth()
+        self.pool.set_auth(self.pool_key, url, token)
+        return url, token
+
+
+class SwiftConnectionPool(object):
+    """
+    Process-wide thread-safe pool of swift storage connections. Idle connections are
+    kept per container name and connection parameters and the auth token is reused
+    by all the connections with the same key.
+    """
+
+    def __init__(self, max_idle_conns=10, max_idle_time=300, health_check_interval=60):
+        # max number of idle connections kept per key
+        self.max_idle_conns = max_idle_conns
+        # idle connections older than this (in seconds) are evicted
+        self.max_idle_time = max_idle_time
+        # idle connections older than this (in seconds) are checked before reuse
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle = {}  # key -> list of (connection, time it was released)
+        self._auth = {}  # key -> (storage url, auth token)
+        self._stats = {'hits': 0, 'creations': 0, 'auth_round_trips': 0,
+                       'health_check_failures': 0, 'evictions': 0}
+
+    @staticmethod
+    def get_key(container_name, conn_params):
+        """
+        Return the pool key for a container name and its connection parameters.
+        """
+        return container_name, tuple(sorted((k, repr(v)) for k, v in conn_params.items()))
+
+    def acquire(self, container_name, conn_params):
+        """
+        Get a connection from the pool or create a new one if there isn't any idle
+        connection for the passed container and connection parameters.
+        """
+        key = self.get_key(container_name, conn_params)
+        now = time.monotonic()
+        conn = None
+        with self._lock:
+            self._reset_after_fork()
+            self._evict_idle_conns(now)
+            idle_conns = self._idle.get(key)
+            if idle_conns:
+                conn, released_at = idle_conns.pop()
+                self._stats['hits'] += 1
+            auth = self._auth.get(key)
+        if conn is not None:
+            if now - released_at < self.health_check_interval or self._is_healthy(conn):
+                return conn
+            conn.close()
+        conn = PooledConnection(self, key, **conn_params)
+        if auth is not None and not conn.token:
+            conn.url, conn.token = auth  # reuse token, no auth round trip needed
+        with self._lock:
+            self._stats['creations'] += 1
+        return conn
+
+    def release(self, conn):
+        """
+        Return a connection to the pool.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._reset_after_fork()
+            idle_conns = self._idle.setdefault(conn.pool_key, [])
+            if len(idle_conns) < self.max_idle_conns:
+                idle_conns.append((conn, now))
+                return
+        conn.close()
+
+    def set_auth(self, key, url, token):
+        """
+        Record a new auth token for the passed key.
+        """
+        with self._lock:
+            self._auth[key] = (url, token)
+            self._stats['auth_round_trips'] += 1
+
+    def get_stats(self):
+        """
+        Return a dictionary with the pool's usage counters and current size.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle_connections'] = sum(len(c) for c in self._idle.values())
+        return stats
+
+    def clear(self):
+        """
+        Close all idle connections and forget all cached auth tokens.
+        """
+        with self._lock:
+            idle_conns = [c for conns in self._idle.values() for (c, _) in conns]
+            self._idle = {}
+            self._auth = {}
+        for conn in idle_conns:
+            conn.close()
+
+    def _is_healthy(self, conn):
+        """
+        Internal method to check whether an idle connection can still talk to swift.
+        """
+        try:
+            conn.head_account()
+        except Exception as e:
+            logger.info(f'Discarding unhealthy swift connection, detail: {str(e)}')
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+            return False
+        return True
+
+    def _evict_idle_conns(self, now):
+        """
+        Internal method to close the connections that have been idle for too long.
+        Must be called with the lock held.
+        """
+        for key, idle_conns in self._idle.items():
+            fresh_conns = [(c, t) for (c, t) in idle_conns
+                           if now - t <= self.max_idle_time]
+            for (conn, t) in idle_conns:
+                if now - t > self.max_idle_time:
+                    conn.close()
+                    self._stats['evictions'] += 1
+            self._idle[key] = fresh_conns
+
+    def _reset_after_fork(self):
+        """
+        Internal method to drop the connections inherited from a parent process as
+        their sockets can not be shared (auth tokens are kept). Must be called with
+        the lock held.
+        """
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._idle = {}
+
+
+# process-wide swift connection pool used by all SwiftManager objects
+connection_pool = SwiftConnectionPool()
+
+
+class PooledObjectBody(object):
+    """
+    Iterator over the content chunks of an object downloaded with a pooled swift
+    storage connection. The connection is given back to the pool once the object's
+    body has been fully read. Otherwise the connection still has unread data and is
+    closed instead by close() (also called when the iterator is used as a context
+    manager or garbage collected without having been iterated).
+    """
+
+    def __init__(self, conn, obj_contents):
+        self._conn = conn
+        self._obj_contents = obj_contents
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._conn is None:
+            raise StopIteration
+        try:
+            return next(self._obj_contents)
+        except StopIteration:
+            conn = self._conn
+            self._conn = None
+            connection_pool.release(conn)
+            raise
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Close the connection if the object's body has not been fully read.
+        """
+        if self._conn is None:
+            return
+        conn = self._conn
+        self._conn = None
+        try:
+            self._obj_contents.close()
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
 class SwiftManager(object):
 
     def __init__(self, container_name, conn_params):
         self.container_name = container_name
         # swift storage connection parameters dictionary
         self.conn_params = conn_params
-        # swift storage connection object
-        self._conn = None
 
     def get_connection(self):
         """
-        Connect to swift storage and return the connection object.
+        Get a swift storage connection object from the process-wide connection pool.
+        The connection must be given back with release_connection once done.
         """
-        if self._conn is not None:
-            return self._conn
-        for i in range(5):  # 5 retries at most
-            try:
-                self._conn = Connection(**self.conn_params)
-            except ClientException as e:
-                logger.error(str(e))
-                if i == 4:
-                    raise  # give up
-                time.sleep(0.4)
-            else:
-                return self._conn
+        return connection_pool.acquire(self.container_name, self.conn_params)
 
-    def create_container(self):
+    @staticmethod
+    def release_connection(conn):
         """
-        Create the storage container.
+        Give a swift storage connection object back to the connection pool.
+        """
+        connection_pool.release(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager to use a pooled swift storage connection object.
         """
         conn = self.get_connection()
         try:
-            conn.put_container(self.container_name)
-        except ClientException as e:
-            logger.error(str(e))
-            raise
+            yield conn
+        finally:
+            self.release_connection(conn)
+
+    @staticmethod
+    def get_pool_stats():
+        """
+        Return the process-wide swift connection pool's stats.
+        """
+        return connection_pool.get_stats()
+
+    @staticmethod
+    def get_retry_stats():
+        """
+        Return the process-wide storage operations retry policy's stats.
+        """
+        return retry_policy.get_stats()
+
+    def create_container(self):
+        """
+        Create the storage container.
+        """
+        with self.connection() as conn:
+            retry_policy.call(conn.put_container, self.container_name)
 
     def ls(self, path, **kwargs):
         """
         Return a list of objects in the swift storage with the provided path
-        as a prefix.
+        as a prefix. Failed listings are retried unless 'retry' is False (for callers
+        that already retry the listing with their own policy).
         """
         b_full_listing = kwargs.get('full_listing', True)
+        b_retry = kwargs.get('retry', True)
         l_ls = []  # listing of names to return
         if path:
-            conn = self.get_connection()
-            for i in range(5):
-                try:
-                    # get the full list of objects in Swift storage with given prefix
-                    ld_obj = conn.get_container(self.container_name,
-                                                prefix=path,
-                                                full_listing=b_full_listing)[1]
-                except ClientException as e:
-                    logger.error(str(e))
-                    if i == 4:
-                        raise
-                    time.sleep(0.4)
+            with self.connection() as conn:
+                # get the full list of objects in Swift storage with given prefix
+                if b_retry:
+                    ld_obj = retry_policy.call(conn.get_container, self.container_name,
+                                               prefix=path,
+                                               full_listing=b_full_listing)[1]
                 else:
-                    l_ls = [d_obj['name'] for d_obj in ld_obj]
-                    break
+                    ld_obj = conn.get_container(self.container_name, prefix=path,
+                                                full_listing=b_full_listing)[1]
+            l_ls = [d_obj['name'] for d_obj in ld_obj]
         return l_ls
 
     def path_exists(self, path):
@@ -85,89 +419,92 @@ class SwiftManager(object):
         """
         Return True/False if passed object exists in swift storage.
         """
-        conn = self.get_connection()
-        for i in range(5):
+        with self.connection() as conn:
             try:
-                conn.head_object(self.container_name, obj_path)
+                retry_policy.call(conn.head_object, self.container_name, obj_path,
+                                  retry_if=lambda e: (isinstance(e, ClientException) and
+                                                      e.http_status != 404))
             except ClientException as e:
                 if e.http_status == 404:
                     return False
-                else:
-                    logger.error(str(e))
-                    if i == 4:
-                        raise
-                    time.sleep(0.4)
-            else:
-                return True
+                raise
+        return True
 
     def upload_obj(self, swift_path, contents, **kwargs):
         """
-        Upload an object (a file contents) into swift storage.
+        Upload an object (a file contents) into swift storage. The contents can also
+        be a file object which is then streamed to swift storage.
         """
-        conn = self.get_connection()
-        for i in range(5):
-            try:
-                conn.put_object(self.container_name,
-                                swift_path,
-                                contents=contents,
-                                **kwargs)
-            except ClientException as e:
-                logger.error(str(e))
-                if i == 4:
-                    raise
-                time.sleep(0.4)
-            else:
-                break
+        with self.connection() as conn:
+            self._put_object(conn, self.container_name, swift_path, contents, **kwargs)
+
+    def upload_segmented_obj(self, swift_path, file_obj, size, segment_size, **kwargs):
+        """
+        Upload a large object from a file object of the passed size as a swift
+        dynamic large object. The contents are streamed into segments of at most
+        segment_size bytes stored in a separate '<container>_segments' container
+        (so they are not listed under the object's path) and a manifest object is
+        created at swift_path. The segments of a previous large object at swift_path
+        are deleted once the new manifest is in place.
+        """
+        segments_container = self.container_name + '_segments'
+        segments_prefix = f'{swift_path}/{time.time():f}/{size}/{segment_size}/'
+        with self.connection() as conn:
+            retry_policy.call(conn.put_container, segments_container)
+            n_segments = max((size + segment_size - 1) // segment_size, 1)
+            for i in range(n_segments):
+                segment_length = min(segment_size, size - i * segment_size)
+                self._put_object(conn, segments_container, f'{segments_prefix}{i:08d}',
+                                 file_obj, content_length=segment_length)
+            previous_manifest = self._get_obj_manifest(conn, swift_path)
+            headers = kwargs.pop('headers', {})
+            headers['X-Object-Manifest'] = f'{segments_container}/{segments_prefix}'
+            self._put_object(conn, self.container_name, swift_path, b'',
+                             headers=headers, **kwargs)
+            if previous_manifest:
+                # the segments of the overwritten object are no longer referenced
+                self._delete_segments(conn, previous_manifest)
 
     def download_obj(self, obj_path, **kwargs):
         """
-        Download an object from swift storage.
+        Download an object from swift storage. If a resp_chunk_size keyword argument
+        is passed then an iterator over the object's content chunks is returned. The
+        iterator must be fully consumed or closed (it is a context manager).
         """
         conn = self.get_connection()
-        for i in range(5):
-            try:
-                resp_headers, obj_contents = conn.get_object(self.container_name,
-                                                             obj_path, **kwargs)
-            except ClientException as e:
-                logger.error(str(e))
-                if i == 4:
-                    raise
-                time.sleep(0.4)
-            else:
-                return obj_contents
+        try:
+            resp_headers, obj_contents = retry_policy.call(
+                conn.get_object, self.container_name, obj_path, **kwargs)
+        except Exception:
+            self.release_connection(conn)
+            raise
+        if kwargs.get('resp_chunk_size'):
+            # the connection is in use until the object's body has been read
+            return PooledObjectBody(conn, obj_contents)
+        self.release_connection(conn)
+        return obj_contents
 
     def copy_obj(self, obj_path, dest_path, **kwargs):
         """
         Copy an object to a new destination in swift storage.
         """
-        conn = self.get_connection()
         dest = os.path.join('/' + self.container_name, dest_path.lstrip('/'))
-        for i in range(5):
-            try:
-                conn.copy_object(self.container_name, obj_path, dest, **kwargs)
-            except ClientException as e:
-                logger.error(str(e))
-                if i == 4:
-                    raise
-                time.sleep(0.4)
-            else:
-                break
+        with self.connection() as conn:
+            retry_policy.call(conn.copy_object, self.container_name, obj_path, dest,
+                              **kwargs)
 
-    def delete_obj(self, obj_path):
+    def delete_obj(self, obj_path, segmented=False):
         """
-        Delete an object from swift storage.
+        Delete an object from swift storage. When segmented is True the object can be
+        a dynamic large object (uploaded with upload_segmented_obj) and its segments
+        are deleted after its manifest. This takes an extra HEAD request so it should
+        only be passed for objects that can be larger than SWIFT_OBJ_SEGMENT_SIZE.
         """
-        conn = self.get_connection()
-        for i in range(5):
-            try:
-                conn.delete_object(self.container_name, obj_path)
-            except ClientException as e:
-                logger.error(str(e))
-                if i == 4:
-                    raise
-                time.sleep(0.4)
-            else:
-                break
+        with self.connection() as conn:
+            manifest = self._get_obj_manifest(conn, obj_path) if segmented else None
+            retry_policy.call(conn.delete_object, self.container_name, obj_path)
+            if manifest:
+                self._delete_segments(conn, manifest)
 
     def upload_files(self, local_dir, swift_prefix='', **kwargs):
         """
@@ -198,3 +535,47 @@ class SwiftManager(object):
                     local_file_path = os.path.join(root, filename)
                     with open(local_file_path, 'rb') as f:
                         self.upload_obj(swift_path, f.read(), **kwargs)
+
+    def _get_obj_manifest(self, conn, obj_path):
+        """
+        Internal method to get the '<container>/<prefix>' of the segments of a dynamic
+        large object. Return None if the object doesn't exist or is not a manifest.
+        """
+        try:
+            headers = retry_policy.call(conn.head_object, self.container_name, obj_path,
+                                        retry_if=lambda e: (isinstance(e, ClientException)
+                                                            and e.http_status != 404))
+        except ClientException as e:
+            if e.http_status == 404:
+                return None
+            raise
+        return headers.get('x-object-manifest')
+
+    @staticmethod
+    def _delete_segments(conn, manifest):
+        """
+        Internal method to delete the segments of a dynamic large object given its
+        manifest ('<container>/<prefix>').
+        """
+        segments_container, segments_prefix = manifest.split('/', 1)
+        ld_obj = retry_policy.call(conn.get_container, segments_container,
+                                   prefix=segments_prefix, full_listing=True)[1]
+        for d_obj in ld_obj:
+            retry_policy.call(conn.delete_object, segments_container, d_obj['name'])
+
+    @staticmethod
+    def _put_object(conn, container_name, swift_path, contents, **kwargs):
+        """
+        Internal method to upload an object with retries. File object contents are
+        rewound to their initial position before every attempt.
+        """
+        start = None
+        if hasattr(contents, 'seek') and hasattr(contents, 'tell'):
+            start = contents.tell()
+
+        def put_object():
+            if start is not None:
+                contents.seek(start)
+            conn.put_object(container_name, swift_path, contents=contents, **kwargs)
+
+        retry_policy.call(put_object)
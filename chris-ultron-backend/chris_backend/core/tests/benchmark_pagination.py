@@ -0,0 +1,99 @@
+"""
+Benchmark of the collection pagination modes. It is not collected with the tests and
+must be run separately:
+
+    python manage.py test core.tests.benchmark_pagination
+"""
+
+import logging
+import time
+from base64 import b64encode
+from urllib.parse import urlencode
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.conf import settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import PluginInstance, PluginInstanceFile
+from core.pagination import CollectionPagination
+
+
+COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
+
+
+class CollectionPaginationBenchmark(TestCase):
+    """
+    Benchmark the pagination modes of the default pagination on a large collection.
+    """
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        user = User.objects.create_user(username='foo', password='bar')
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=COMPUTE_RESOURCE_URL)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin.compute_resources.set([compute_resource])
+        self.plg_inst = PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                      compute_resource=compute_resource)
+        self.factory = APIRequestFactory()
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def get_page_time(self, query_params, page_size, repetitions=5):
+        """
+        Custom method to get the best time (in ms) taken by the pagination to fetch
+        the page of files requested by the query parameters.
+        """
+        best = None
+        for _ in range(repetitions):
+            request = Request(self.factory.get('/api/v1/files/', query_params))
+            start = time.perf_counter()
+            paginator = CollectionPagination()
+            page = paginator.paginate_queryset(PluginInstanceFile.objects.all(), request)
+            paginator.get_paginated_response([f.id for f in page])
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        self.assertEqual(len(page), page_size)
+        return best
+
+    def test_benchmark_pagination_deep_page_latency(self):
+        """
+        Benchmark fetching a shallow and a deep page of a 500k files collection in
+        limit/offset mode (with and without the count) and in cursor mode and report
+        the latency of each.
+        """
+        n_files = 500000
+        page_size = 10
+        fname = 'chris/feed_1/pacspull_1/data/file{:07d}.dcm'
+        for i in range(0, n_files, 50000):
+            PluginInstanceFile.objects.bulk_create(
+                [PluginInstanceFile(plugin_inst=self.plg_inst, fname=fname.format(j))
+                 for j in range(i, i + 50000)], batch_size=400)
+
+        d_times = {}
+        for page_number in (100, n_files // page_size):
+            offset = (page_number - 1) * page_size
+            # the cursor of a page is keyed on the last file name of the previous page
+            last_fname = PluginInstanceFile.objects.order_by('-fname').values_list(
+                'fname', flat=True)[offset - 1]
+            cursor = b64encode(urlencode({'p': last_fname}).encode()).decode()
+            d_times[page_number] = (
+                self.get_page_time({'limit': page_size, 'offset': offset}, page_size),
+                self.get_page_time({'limit': page_size, 'offset': offset,
+                                    'count': 'false'}, page_size),
+                self.get_page_time({'limit': page_size, 'cursor': cursor}, page_size))
+            print(f'\nPage {page_number} of {n_files} files: limit/offset '
+                  f'{d_times[page_number][0]:.1f} ms, limit/offset without count '
+                  f'{d_times[page_number][1]:.1f} ms, cursor '
+                  f'{d_times[page_number][2]:.1f} ms')
+        (offset_time, no_count_time, cursor_time) = d_times[n_files // page_size]
+        self.assertLess(cursor_time, offset_time)
+        self.assertLess(cursor_time, no_count_time)
@@ -0,0 +1,31 @@
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+
+class ListQueryCountMixin(object):
+    """
+    Mixin for test cases that check that the number of DB queries made by a list
+    endpoint does not grow with the number of items in the returned page, that is
+    that the endpoint's queryset fetches all the related data the serializer reads.
+    """
+
+    def assertListQueriesIndependentOfPageSize(self, url, data=None, small=1,
+                                               large=10):
+        """
+        Get a small and a large page of a list endpoint with the logged in client and
+        assert that both pages are full and took the same number of DB queries.
+        """
+        query_counts = []
+        for limit in (small, large):
+            params = dict(data or {}, limit=limit)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), limit,
+                             'Not enough items to fill the pages of %s' % url)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1],
+                         'The number of DB queries of %s depends on the page size: '
+                         '%s' % (url, query_counts))
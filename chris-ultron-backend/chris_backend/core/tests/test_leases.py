@@ -0,0 +1,118 @@
+
+import logging
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core import leases
+from core.leases import (LeaseBackend, DatabaseLeaseBackend, PostgresAdvisoryLockBackend,
+                         LeaseManager)
+from core.models import TaskLease
+
+
+class DatabaseLeaseBackendTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+        self.backend = DatabaseLeaseBackend()
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_acquire_is_exclusive_until_release(self):
+        """
+        Test whether a lease can only be acquired by one owner until it's released.
+        """
+        self.assertTrue(self.backend.acquire('task', 'owner1', 60))
+        self.assertFalse(self.backend.acquire('task', 'owner2', 60))
+        self.assertTrue(self.backend.acquire('other_task', 'owner2', 60))
+        self.backend.release('task', 'owner1')
+        self.assertTrue(self.backend.acquire('task', 'owner2', 60))
+
+    def test_acquire_takes_over_expired_lease(self):
+        """
+        Test whether an expired lease (eg. its owner's worker died) can be acquired.
+        """
+        self.assertTrue(self.backend.acquire('task', 'owner1', 60))
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch.object(leases.timezone, 'now', return_value=later):
+            self.assertTrue(self.backend.acquire('task', 'owner2', 60))
+        self.assertEqual(TaskLease.objects.get(name='task').owner, 'owner2')
+
+    def test_release_only_releases_own_lease(self):
+        """
+        Test whether a previous owner can not release a lease that was taken over.
+        """
+        self.assertTrue(self.backend.acquire('task', 'owner1', 0))
+        self.assertTrue(self.backend.acquire('task', 'owner2', 60))
+        self.backend.release('task', 'owner1')
+        self.assertFalse(self.backend.acquire('task', 'owner3', 60))
+
+
+class PostgresAdvisoryLockBackendTests(TestCase):
+
+    def test_acquire_and_release_use_same_advisory_lock_key(self):
+        """
+        Test whether the backend locks and unlocks the lease's advisory lock key.
+        """
+        backend = PostgresAdvisoryLockBackend()
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchone.return_value = (True,)
+        with mock.patch.object(leases.connection, 'cursor', return_value=cursor):
+            self.assertTrue(backend.acquire('task', 'owner', 60))
+            backend.release('task', 'owner')
+        key = PostgresAdvisoryLockBackend.get_lock_key('task')
+        self.assertTrue(-2**63 <= key < 2**63)
+        cursor.execute.assert_has_calls([
+            mock.call('SELECT pg_try_advisory_lock(%s)', [key]),
+            mock.call('SELECT pg_advisory_unlock(%s)', [key])])
+
+
+class LeaseManagerTests(TestCase):
+
+    def test_lease_releases_acquired_lease_and_keeps_stats(self):
+        """
+        Test whether the lease context manager releases the lease on exit and
+        records the acquire attempts and latency.
+        """
+        lease_manager = LeaseManager(DatabaseLeaseBackend())
+        with lease_manager.lease('task', 60) as acquired:
+            self.assertTrue(acquired)
+            with lease_manager.lease('task', 60) as acquired_again:
+                self.assertFalse(acquired_again)
+        self.assertFalse(TaskLease.objects.filter(name='task').exists())
+        stats = lease_manager.get_stats()
+        self.assertEqual(stats['attempts'], 2)
+        self.assertEqual(stats['acquired'], 1)
+        self.assertEqual(stats['contended'], 1)
+        self.assertGreater(stats['max_acquire_latency'], 0)
+        self.assertLessEqual(stats['avg_acquire_latency'], stats['max_acquire_latency'])
+
+    def test_lease_backend_is_abstract(self):
+        """
+        Test whether a lease backend must implement acquire and release.
+        """
+        class IncompleteLeaseBackend(LeaseBackend):
+            def acquire(self, name, owner, ttl):
+                return True
+
+        with self.assertRaises(TypeError):
+            IncompleteLeaseBackend()
+
+    def test_lease_backend_is_configurable(self):
+        """
+        Test whether the lease backend is loaded from the TASK_LEASE_BACKEND setting.
+        """
+        with self.settings(TASK_LEASE_BACKEND='core.leases.PostgresAdvisoryLockBackend'):
+            self.assertIsInstance(LeaseManager().backend, PostgresAdvisoryLockBackend)
+        backend = mock.Mock(spec=LeaseBackend)
+        backend.acquire.return_value = True
+        with LeaseManager(backend).lease('task', 60, owner='owner'):
+            pass
+        backend.acquire.assert_called_once_with('task', 'owner', 60)
+        backend.release.assert_called_once_with('task', 'owner')
@@ -0,0 +1,246 @@
+
+import logging
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+
+from feeds.models import Tag, Tagging, Comment
+from plugins.models import PluginMeta, Plugin, PluginParameter, ComputeResource
+from plugininstances.models import (PluginInstance, PluginInstanceFile,
+                                    PluginInstanceSplit, StrParameter)
+from pipelines.models import Pipeline, PluginPiping
+from pipelineinstances.models import PipelineInstance
+from uploadedfiles.models import UploadedFile
+from pacsfiles.models import PACS, PACSFile
+from servicefiles.models import Service, ServiceFile
+
+from .querycount import ListQueryCountMixin
+
+
+COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
+
+
+class ListQueryCountTests(ListQueryCountMixin, TestCase):
+    """
+    Test that the number of DB queries of the list endpoints does not depend on the
+    page size.
+    """
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        self.username = 'foo'
+        self.password = 'bar'
+        user = User.objects.create_user(username=self.username, password=self.password)
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=COMPUTE_RESOURCE_URL)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (plugin_fs, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin_fs.compute_resources.set([compute_resource])
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='mri_convert', type='ds')
+        (self.plugin_ds, tf) = Plugin.objects.get_or_create(meta=pl_meta,
+                                                            version='0.1')
+        self.plugin_ds.compute_resources.set([compute_resource])
+
+        # create 10 compute resources, all of them assigned to the 'ds' plugin
+        for i in range(1, 10):
+            (cr, tf) = ComputeResource.objects.get_or_create(
+                name="host%s" % i, compute_url=COMPUTE_RESOURCE_URL)
+            self.plugin_ds.compute_resources.add(cr)
+
+        # create 10 'ds' plugin metas, 10 versions of the 'ds' plugin and 10
+        # parameters for its first version
+        for i in range(9):
+            PluginMeta.objects.get_or_create(name='plugin%s' % i, type='ds')
+        plugins_ds = [self.plugin_ds]
+        for i in range(2, 11):
+            (plugin, tf) = Plugin.objects.get_or_create(
+                meta=self.plugin_ds.meta, version='0.%s' % i,
+                dock_image='fnndsc/pl-mri_convert:0.%s' % i)
+            plugins_ds.append(plugin)
+        for i in range(10):
+            PluginParameter.objects.get_or_create(plugin=self.plugin_ds,
+                                                  name='param%s' % i,
+                                                  flag='--param%s' % i, type='string')
+
+        # create 10 pipelines and 10 pipings in the first one which then has 10
+        # default parameters
+        self.pipeline = Pipeline.objects.create(name='Pipeline1', owner=user)
+        for i in range(2, 11):
+            Pipeline.objects.create(name='Pipeline%s' % i, owner=user)
+        previous = None
+        for plugin in plugins_ds:
+            previous = PluginPiping.objects.create(pipeline=self.pipeline,
+                                                   plugin=plugin, previous=previous)
+
+        # create 10 pipeline instances
+        self.pipeline_inst = PipelineInstance.objects.create(title='PipelineInst1',
+                                                             pipeline=self.pipeline,
+                                                             owner=user)
+        for i in range(2, 11):
+            PipelineInstance.objects.create(title='PipelineInst%s' % i,
+                                            pipeline=self.pipeline, owner=user)
+
+        # create 10 feeds and 10 'ds' instances in the first one that are part of a
+        # pipeline instance
+        roots = [PluginInstance.objects.create(plugin=plugin_fs, owner=user,
+                                               compute_resource=compute_resource)
+                 for _ in range(10)]
+        self.root = roots[0]
+        for i in range(10):
+            PluginInstance.objects.create(plugin=self.plugin_ds, owner=user,
+                                          previous=self.root,
+                                          pipeline_inst=self.pipeline_inst,
+                                          compute_resource=compute_resource,
+                                          status='finishedSuccessfully')
+
+        # create 10 parameters, 10 splits and 10 files for the first feed's root
+        # instance
+        for plg_param in self.plugin_ds.parameters.all():
+            StrParameter.objects.create(plugin_inst=self.root, plugin_param=plg_param,
+                                        value='value')
+        for i in range(10):
+            PluginInstanceSplit.objects.create(plugin_inst=self.root,
+                                               created_plugin_inst_ids=str(i))
+            PluginInstanceFile.objects.create(
+                plugin_inst=self.root,
+                fname='%s/feed_%s/pacspull_%s/data/file%s.txt' % (
+                    self.username, self.root.feed.id, self.root.id, i))
+
+        # create 10 comments and 10 tags for the first feed and tag all the feeds
+        # with the first tag
+        self.tags = []
+        for i in range(10):
+            Comment.objects.create(feed=self.root.feed, owner=user,
+                                   title='Comment%s' % i)
+            tag = Tag.objects.create(name='Tag%s' % i, color='blue', owner=user)
+            Tagging.objects.create(tag=tag, feed=self.root.feed)
+            self.tags.append(tag)
+        for root in roots[1:]:
+            Tagging.objects.create(tag=self.tags[0], feed=root.feed)
+
+        # create 10 uploaded, PACS and service files
+        (pacs, tf) = PACS.objects.get_or_create(identifier='MyPACS')
+        (service, tf) = Service.objects.get_or_create(identifier='MyService')
+        for i in range(10):
+            UploadedFile.objects.create(owner=user,
+                                        fname='%s/uploads/file%s.txt' % (self.username,
+                                                                         i))
+            PACSFile.objects.create(pacs=pacs,
+                                    fname='SERVICES/PACS/MyPACS/file%s.dcm' % i,
+                                    PatientID='123456', StudyDate='2020-07-28',
+                                    StudyInstanceUID='1.1.3432.54.6545674765.765434',
+                                    SeriesInstanceUID='2.4.3432.54.845674765.763345')
+            ServiceFile.objects.create(service=service,
+                                       fname='SERVICES/MyService/file%s.txt' % i)
+
+        self.client.login(username=self.username, password=self.password)
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_plugin_instance_list_queries(self):
+        endpoints = [
+            (reverse('allplugininstance-list'), None),
+            (reverse('allplugininstance-list-query-search'),
+             {'feed_id': self.root.feed.id}),
+            (reverse('plugininstance-list', kwargs={'pk': self.plugin_ds.id}), None),
+            (reverse('feed-plugininstance-list', kwargs={'pk': self.root.feed.id}),
+             None),
+            (reverse('plugininstance-descendant-list', kwargs={'pk': self.root.id}),
+             None),
+            (reverse('pipelineinstance-plugininstance-list',
+                     kwargs={'pk': self.pipeline_inst.id}), None),
+            (reverse('plugininstancesplit-list', kwargs={'pk': self.root.id}), None),
+            (reverse('plugininstance-parameter-list', kwargs={'pk': self.root.id}),
+             None),
+        ]
+        for url, data in endpoints:
+            with self.subTest(url=url):
+                self.assertListQueriesIndependentOfPageSize(url, data)
+
+    def test_feed_list_queries(self):
+        self.assertListQueriesIndependentOfPageSize(reverse('feed-list'))
+        self.assertListQueriesIndependentOfPageSize(reverse('feed-list-query-search'),
+                                                    {'name': 'pacspull'})
+
+    def test_feed_related_list_queries(self):
+        feed_id = self.root.feed.id
+        endpoints = [
+            (reverse('comment-list', kwargs={'pk': feed_id}), None),
+            (reverse('comment-list-query-search', kwargs={'pk': feed_id}), None),
+            (reverse('feed-tag-list', kwargs={'pk': feed_id}), None),
+            (reverse('feed-tagging-list', kwargs={'pk': feed_id}), None),
+            (reverse('tag-list'), None),
+            (reverse('tag-list-query-search'), {'color': 'blue'}),
+            (reverse('tag-feed-list', kwargs={'pk': self.tags[0].id}), None),
+            (reverse('tag-tagging-list', kwargs={'pk': self.tags[0].id}), None),
+        ]
+        for url, data in endpoints:
+            with self.subTest(url=url):
+                self.assertListQueriesIndependentOfPageSize(url, data)
+
+    def test_plugin_list_queries(self):
+        endpoints = [
+            (reverse('computeresource-list'), None),
+            (reverse('computeresource-list-query-search'), None),
+            (reverse('pluginmeta-list'), None),
+            (reverse('pluginmeta-list-query-search'), {'type': 'ds'}),
+            (reverse('pluginmeta-plugin-list', kwargs={'pk': self.plugin_ds.meta.id}),
+             None),
+            (reverse('plugin-list'), None),
+            (reverse('plugin-list-query-search'), {'name': 'mri_convert'}),
+            (reverse('pluginparameter-list', kwargs={'pk': self.plugin_ds.id}), None),
+            (reverse('plugin-computeresource-list', kwargs={'pk': self.plugin_ds.id}),
+             None),
+        ]
+        for url, data in endpoints:
+            with self.subTest(url=url):
+                self.assertListQueriesIndependentOfPageSize(url, data)
+
+    def test_pipeline_list_queries(self):
+        endpoints = [
+            (reverse('pipeline-list'), None),
+            (reverse('pipeline-list-query-search'), {'owner_username': self.username}),
+            (reverse('pipeline-plugin-list', kwargs={'pk': self.pipeline.id}), None),
+            (reverse('pipeline-pluginpiping-list', kwargs={'pk': self.pipeline.id}),
+             None),
+            (reverse('pipeline-defaultparameter-list', kwargs={'pk': self.pipeline.id}),
+             None),
+            (reverse('pipelineinstance-list', kwargs={'pk': self.pipeline.id}), None),
+            (reverse('allpipelineinstance-list'), None),
+            (reverse('allpipelineinstance-list-query-search'),
+             {'pipeline_name': 'Pipeline1'}),
+        ]
+        for url, data in endpoints:
+            with self.subTest(url=url):
+                self.assertListQueriesIndependentOfPageSize(url, data)
+
+    def test_file_list_queries(self):
+        endpoints = [
+            (reverse('feedfile-list', kwargs={'pk': self.root.feed.id}), None),
+            (reverse('plugininstancefile-list', kwargs={'pk': self.root.id}), None),
+            (reverse('allplugininstancefile-list'), None),
+            (reverse('allplugininstancefile-list-query-search'),
+             {'plugin_inst_id': self.root.id}),
+            (reverse('uploadedfile-list'), None),
+            (reverse('uploadedfile-list-query-search'),
+             {'owner_username': self.username}),
+            (reverse('pacsfile-list'), None),
+            (reverse('pacsfile-list-query-search'), {'PatientID': '123456'}),
+            (reverse('servicefile-list'), None),
+            (reverse('servicefile-list-query-search'),
+             {'service_identifier': 'MyService'}),
+        ]
+        # the file sizes are read from the storage, not from the DB
+        with mock.patch.object(FieldFile, 'size', new_callable=mock.PropertyMock,
+                               return_value=0):
+            for url, data in endpoints:
+                with self.subTest(url=url):
+                    self.assertListQueriesIndependentOfPageSize(url, data)
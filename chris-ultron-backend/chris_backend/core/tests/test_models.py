@@ -0,0 +1,51 @@
+
+from django.test import TestCase
+
+from core.models import ChrisInstance
+
+
+class ChrisInstanceModelTests(TestCase):
+
+    def setUp(self):
+        ChrisInstance.clear_cache()
+
+    def tearDown(self):
+        ChrisInstance.clear_cache()
+
+    def test_load_fetches_singleton_from_db_only_once(self):
+        """
+        Test whether custom load class method caches the singleton.
+        """
+        chris_instance = ChrisInstance.load()
+        with self.assertNumQueries(0):
+            self.assertIs(ChrisInstance.load(), chris_instance)
+
+    def test_save_invalidates_load_cache(self):
+        """
+        Test whether custom save method invalidates the singleton's cache.
+        """
+        chris_instance = ChrisInstance.load()
+        chris_instance.job_id_prefix = 'test-jid-'
+        chris_instance.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(ChrisInstance.load().job_id_prefix, 'test-jid-')
+        self.assertEqual(ChrisInstance.objects.count(), 1)
+
+    def test_delete_invalidates_load_cache(self):
+        """
+        Test whether deleting the singleton invalidates its cache.
+        """
+        chris_instance = ChrisInstance.load()
+        ChrisInstance.objects.all().delete()
+        new_chris_instance = ChrisInstance.load()
+        self.assertNotEqual(new_chris_instance.uuid, chris_instance.uuid)
+        self.assertEqual(ChrisInstance.objects.count(), 1)
+
+    def test_update_invalidates_load_cache(self):
+        """
+        Test whether updating the singleton in bulk invalidates its cache.
+        """
+        ChrisInstance.load()
+        ChrisInstance.objects.all().update(job_id_prefix='test-jid-')
+        with self.assertNumQueries(1):
+            self.assertEqual(ChrisInstance.load().job_id_prefix, 'test-jid-')
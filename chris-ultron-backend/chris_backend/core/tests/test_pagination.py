@@ -0,0 +1,135 @@
+
+import logging
+
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.conf import settings
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import PluginInstance, PluginInstanceFile
+from pipelineinstances.models import PipelineInstance
+from core.pagination import KeysetCursorPagination
+
+
+COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
+
+
+class KeysetCursorPaginationTests(TestCase):
+
+    def setUp(self):
+        self.pagination = KeysetCursorPagination()
+
+    def test_get_ordering_unique_field(self):
+        """
+        Test whether the cursor is only keyed on the model's ordering field when the
+        field is unique.
+        """
+        queryset = PluginInstanceFile.objects.all()
+        self.assertEqual(self.pagination.get_ordering(None, queryset, None),
+                         ('-fname',))
+
+    def test_get_ordering_non_unique_field(self):
+        """
+        Test whether the primary key is appended as a tie-breaker when the model's
+        ordering field is not unique.
+        """
+        queryset = PluginInstance.objects.all()
+        self.assertEqual(self.pagination.get_ordering(None, queryset, None),
+                         ('-start_date', '-pk'))
+        queryset = PluginInstance.objects.order_by('id')
+        self.assertEqual(self.pagination.get_ordering(None, queryset, None),
+                         ('id',))
+
+    def test_get_ordering_foreign_key_field(self):
+        """
+        Test whether a foreign key ordering field is keyed on its column.
+        """
+        queryset = PipelineInstance.objects.all()
+        self.assertEqual(self.pagination.get_ordering(None, queryset, None),
+                         ('pipeline_id', 'pk'))
+
+
+class CollectionPaginationTests(TestCase):
+    """
+    Test the limit/offset and cursor modes of the default pagination on the
+    allplugininstance-list view.
+    """
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        self.username = 'foo'
+        self.password = 'bar'
+        user = User.objects.create_user(username=self.username, password=self.password)
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=COMPUTE_RESOURCE_URL)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin.compute_resources.set([compute_resource])
+
+        # create 5 plugin instances
+        for _ in range(5):
+            PluginInstance.objects.create(plugin=plugin, owner=user,
+                                          compute_resource=compute_resource)
+        self.ids = list(PluginInstance.objects.order_by('-start_date', '-id').values_list(
+            'id', flat=True))
+        self.list_url = reverse('allplugininstance-list')
+        self.client.login(username=self.username, password=self.password)
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def get_ids(self, url):
+        response = self.client.get(url)
+        return response, [item['id'] for item in response.data['results']]
+
+    def test_cursor_pagination_walks_forward_and_backward(self):
+        response, ids = self.get_ids(self.list_url + '?cursor=&limit=2')
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        pages = [ids]
+        while response.data['next']:
+            response, ids = self.get_ids(response.data['next'])
+            pages.append(ids)
+        self.assertEqual([i for ids in pages for i in ids], self.ids)
+        self.assertEqual([len(ids) for ids in pages], [2, 2, 1])
+
+        response, ids = self.get_ids(response.data['previous'])
+        self.assertEqual(ids, pages[1])
+        response, ids = self.get_ids(response.data['previous'])
+        self.assertEqual(ids, pages[0])
+        self.assertIsNone(response.data['previous'])
+
+    def test_cursor_pagination_renders_collection_links(self):
+        response = self.client.get(self.list_url + '?cursor=&limit=2',
+                                   HTTP_ACCEPT='application/vnd.collection+json')
+        self.assertContains(response, '"rel":"next"')
+        self.assertContains(response, 'cursor=')
+        self.assertNotContains(response, '"total"')
+
+    def test_cursor_pagination_skips_count_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.list_url + '?cursor=&limit=2')
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_limit_offset_pagination_without_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response, ids = self.get_ids(self.list_url + '?limit=2&offset=2&count=false')
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+        self.assertNotIn('count', response.data)
+        self.assertEqual(ids, self.ids[2:4])
+        self.assertIn('offset=4', response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+        response, ids = self.get_ids(response.data['next'])
+        self.assertEqual(ids, self.ids[4:])
+        self.assertIsNone(response.data['next'])
+
+    def test_limit_offset_pagination_with_count(self):
+        response, ids = self.get_ids(self.list_url + '?limit=2')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(ids, self.ids[:2])
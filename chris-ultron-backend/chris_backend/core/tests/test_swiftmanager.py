@@ -0,0 +1,350 @@
+
+import io
+import logging
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from rest_framework import status
+
+from core import swiftmanager
+from core.swiftmanager import SwiftConnectionPool, SwiftManager, ClientException
+from core.swiftmanager import RetryBudget, RetryPolicy
+
+
+CONN_PARAMS = {'user': 'chris:chris1234', 'key': 'testing',
+               'authurl': 'http://swift_service:8080/auth/v1.0'}
+
+
+class SwiftConnectionPoolTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+        self.pool = SwiftConnectionPool()
+
+    def tearDown(self):
+        self.pool.clear()
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_acquire_reuses_released_connection(self):
+        """
+        Test whether the pool hands out a released connection again.
+        """
+        conn = self.pool.acquire('users', CONN_PARAMS)
+        self.pool.release(conn)
+        self.assertIs(self.pool.acquire('users', CONN_PARAMS), conn)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['creations'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_acquire_keys_connections_by_container_and_connection_params(self):
+        """
+        Test whether the pool keeps separate connections per container and params.
+        """
+        conn = self.pool.acquire('users', CONN_PARAMS)
+        self.pool.release(conn)
+        other_params = dict(CONN_PARAMS, user='other:other1234')
+        self.assertIsNot(self.pool.acquire('users', other_params), conn)
+        self.assertIsNot(self.pool.acquire('services', CONN_PARAMS), conn)
+        self.assertEqual(self.pool.get_stats()['creations'], 3)
+
+    def test_new_connections_reuse_auth_token(self):
+        """
+        Test whether new connections reuse the token obtained by another connection.
+        """
+        with mock.patch('swiftclient.client.get_auth',
+                        return_value=('http://swift_service:8080/v1/AUTH_chris',
+                                      'token')) as get_auth_mock:
+            conn1 = self.pool.acquire('users', CONN_PARAMS)
+            conn1.get_auth()
+            conn2 = self.pool.acquire('users', CONN_PARAMS)
+            self.assertEqual(conn2.token, 'token')
+            self.assertEqual(conn2.url, 'http://swift_service:8080/v1/AUTH_chris')
+            get_auth_mock.assert_called_once()
+        self.assertEqual(self.pool.get_stats()['auth_round_trips'], 1)
+
+    def test_acquire_evicts_connections_idle_for_too_long(self):
+        """
+        Test whether connections idle for longer than max_idle_time are evicted.
+        """
+        self.pool.max_idle_time = 0
+        conn = self.pool.acquire('users', CONN_PARAMS)
+        self.pool.release(conn)
+        with mock.patch.object(swiftmanager.time, 'monotonic',
+                               return_value=swiftmanager.time.monotonic() + 1):
+            self.assertIsNot(self.pool.acquire('users', CONN_PARAMS), conn)
+        self.assertEqual(self.pool.get_stats()['evictions'], 1)
+
+    def test_acquire_discards_unhealthy_connections(self):
+        """
+        Test whether an idle connection that fails its health check is discarded.
+        """
+        self.pool.health_check_interval = 0
+        conn = self.pool.acquire('users', CONN_PARAMS)
+        self.pool.release(conn)
+        conn.head_account = mock.Mock(side_effect=Exception('Connection refused'))
+        with mock.patch.object(swiftmanager.time, 'monotonic',
+                               return_value=swiftmanager.time.monotonic() + 1):
+            self.assertIsNot(self.pool.acquire('users', CONN_PARAMS), conn)
+        conn.head_account.assert_called_once()
+        self.assertEqual(self.pool.get_stats()['health_check_failures'], 1)
+
+    def test_connections_are_not_shared_with_forked_processes(self):
+        """
+        Test whether idle connections inherited from a parent process are dropped.
+        """
+        conn = self.pool.acquire('users', CONN_PARAMS)
+        self.pool.release(conn)
+        self.pool._pid = -1  # simulate a fork
+        self.assertIsNot(self.pool.acquire('users', CONN_PARAMS), conn)
+
+    def test_swift_manager_draws_connections_from_process_wide_pool(self):
+        """
+        Test whether SwiftManager objects share the process-wide connection pool.
+        """
+        with mock.patch.object(swiftmanager, 'connection_pool', self.pool):
+            swift_manager1 = SwiftManager('users', CONN_PARAMS)
+            with swift_manager1.connection() as conn:
+                pass
+            swift_manager2 = SwiftManager('users', CONN_PARAMS)
+            with swift_manager2.connection() as conn2:
+                self.assertIs(conn2, conn)
+            self.assertEqual(SwiftManager.get_pool_stats()['hits'], 1)
+
+    def test_swift_manager_upload_segmented_obj(self):
+        """
+        Test whether SwiftManager uploads a large object as segments in the segments
+        container followed by a manifest object.
+        """
+        conn = mock.Mock()
+        conn.head_object.side_effect = ClientException('not found', http_status=404)
+        uploaded = []
+        conn.put_object.side_effect = lambda container, name, contents, **kwargs: \
+            uploaded.append((container, name, contents.read(kwargs['content_length'])
+                             if hasattr(contents, 'read') else contents, kwargs))
+        with mock.patch.object(self.pool, 'acquire', return_value=conn), \
+                mock.patch.object(self.pool, 'release'), \
+                mock.patch.object(swiftmanager, 'connection_pool', self.pool):
+            swift_manager = SwiftManager('users', CONN_PARAMS)
+            swift_manager.upload_segmented_obj('foo/large.nii', io.BytesIO(b'x' * 25),
+                                               25, 10)
+        conn.put_container.assert_called_with('users_segments')
+        self.assertEqual([u[0] for u in uploaded], ['users_segments'] * 3 + ['users'])
+        self.assertEqual([len(u[2]) for u in uploaded[:3]], [10, 10, 5])
+        manifest = uploaded[3]
+        self.assertEqual(manifest[1], 'foo/large.nii')
+        segments_prefix = manifest[3]['headers']['X-Object-Manifest']
+        self.assertTrue(segments_prefix.startswith('users_segments/foo/large.nii/'))
+        self.assertTrue(all(u[1].startswith(segments_prefix.split('/', 1)[1])
+                            for u in uploaded[:3]))
+
+
+    def test_swift_manager_upload_segmented_obj_deletes_previous_segments(self):
+        """
+        Test whether SwiftManager deletes the segments of the large object it
+        overwrites once the new manifest is in place.
+        """
+        conn = mock.Mock()
+        conn.head_object.return_value = {
+            'x-object-manifest': 'users_segments/foo/large.nii/1.0/25/10/'}
+        conn.get_container.return_value = (
+            {}, [{'name': 'foo/large.nii/1.0/25/10/00000000'},
+                 {'name': 'foo/large.nii/1.0/25/10/00000001'}])
+        with mock.patch.object(self.pool, 'acquire', return_value=conn), \
+                mock.patch.object(self.pool, 'release'), \
+                mock.patch.object(swiftmanager, 'connection_pool', self.pool):
+            swift_manager = SwiftManager('users', CONN_PARAMS)
+            swift_manager.upload_segmented_obj('foo/large.nii', io.BytesIO(b'x' * 5),
+                                               5, 10)
+        conn.get_container.assert_called_with('users_segments',
+                                              prefix='foo/large.nii/1.0/25/10/',
+                                              full_listing=True)
+        self.assertEqual(conn.delete_object.call_args_list, [
+            mock.call('users_segments', 'foo/large.nii/1.0/25/10/00000000'),
+            mock.call('users_segments', 'foo/large.nii/1.0/25/10/00000001')])
+
+    def test_swift_manager_delete_obj_deletes_segments(self):
+        """
+        Test whether SwiftManager deletes the segments of a large object after its
+        manifest only when the object can be segmented.
+        """
+        conn = mock.Mock()
+        conn.head_object.return_value = {
+            'x-object-manifest': 'users_segments/foo/large.nii/1.0/25/10/'}
+        conn.get_container.return_value = (
+            {}, [{'name': 'foo/large.nii/1.0/25/10/00000000'}])
+        with mock.patch.object(self.pool, 'acquire', return_value=conn), \
+                mock.patch.object(self.pool, 'release'), \
+                mock.patch.object(swiftmanager, 'connection_pool', self.pool):
+            swift_manager = SwiftManager('users', CONN_PARAMS)
+            swift_manager.delete_obj('foo/large.nii', segmented=True)
+            self.assertEqual(conn.delete_object.call_args_list, [
+                mock.call('users', 'foo/large.nii'),
+                mock.call('users_segments', 'foo/large.nii/1.0/25/10/00000000')])
+
+            # ordinary objects are deleted with a single request
+            conn.reset_mock()
+            swift_manager.delete_obj('foo/small.txt')
+            conn.head_object.assert_not_called()
+            conn.delete_object.assert_called_once_with('users', 'foo/small.txt')
+
+    def test_swift_manager_ls_without_retry(self):
+        """
+        Test whether SwiftManager makes a single listing request when the listing is
+        not retried.
+        """
+        conn = mock.Mock()
+        conn.get_container.side_effect = ClientException('Container GET failed',
+                                                         http_status=503)
+        with mock.patch.object(self.pool, 'acquire', return_value=conn), \
+                mock.patch.object(self.pool, 'release'), \
+                mock.patch.object(swiftmanager, 'connection_pool', self.pool):
+            with self.assertRaises(ClientException):
+                SwiftManager('users', CONN_PARAMS).ls('foo', retry=False)
+        conn.get_container.assert_called_once_with('users', prefix='foo',
+                                                   full_listing=True)
+
+    def test_swift_manager_download_obj_chunks_releases_connection_when_read(self):
+        """
+        Test whether the connection used to download an object in chunks is given
+        back to the pool only when the object's body has been fully read and is
+        closed otherwise.
+        """
+        conn = mock.Mock()
+        conn.get_object.side_effect = lambda *args, **kwargs: (
+            {}, mock.MagicMock(__next__=mock.Mock(side_effect=[b'a', b'b',
+                                                               StopIteration])))
+        with mock.patch.object(self.pool, 'acquire', return_value=conn), \
+                mock.patch.object(self.pool, 'release') as release_mock, \
+                mock.patch.object(swiftmanager, 'connection_pool', self.pool):
+            swift_manager = SwiftManager('users', CONN_PARAMS)
+            chunks = swift_manager.download_obj('foo/bar.txt', resp_chunk_size=1)
+            self.assertEqual(list(chunks), [b'a', b'b'])
+            release_mock.assert_called_once_with(conn)
+            conn.close.assert_not_called()
+
+            # abandoned after the first chunk
+            with swift_manager.download_obj('foo/bar.txt', resp_chunk_size=1) as chunks:
+                next(chunks)
+            conn.close.assert_called_once()
+
+            # never iterated
+            chunks = swift_manager.download_obj('foo/bar.txt', resp_chunk_size=1)
+            chunks.close()
+            self.assertEqual(conn.close.call_count, 2)
+            release_mock.assert_called_once_with(conn)
+
+class RetryPolicyTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.CRITICAL)
+        patcher = mock.patch.object(swiftmanager.time, 'sleep')
+        self.sleep_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_call_retries_until_success(self):
+        """
+        Test whether the policy retries a failing call until it succeeds.
+        """
+        policy = RetryPolicy(max_attempts=5)
+        func = mock.Mock(side_effect=[ClientException('error'),
+                                      ClientException('error'), 'ok'])
+        self.assertEqual(policy.call(func, 'arg', kw='kwarg'), 'ok')
+        func.assert_called_with('arg', kw='kwarg')
+        self.assertEqual(self.sleep_mock.call_count, 2)
+        stats = policy.get_stats()
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['give_ups'], 0)
+
+    def test_call_gives_up_after_max_attempts(self):
+        """
+        Test whether the policy gives up after the max number of attempts.
+        """
+        policy = RetryPolicy(max_attempts=3)
+        func = mock.Mock(side_effect=ClientException('error'))
+        with self.assertRaises(ClientException):
+            policy.call(func)
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(policy.get_stats()['give_ups'], 1)
+
+    def test_call_does_not_retry_non_retryable_errors(self):
+        """
+        Test whether the policy immediately re-raises errors that are not retryable.
+        """
+        policy = RetryPolicy()
+        func = mock.Mock(side_effect=ClientException('not found', http_status=404))
+        with self.assertRaises(ClientException):
+            policy.call(func, retry_if=lambda e: e.http_status != 404)
+        func.assert_called_once()
+        self.assertEqual(policy.get_stats()['retries'], 0)
+
+    def test_call_gives_up_when_deadline_would_be_exceeded(self):
+        """
+        Test whether the policy gives up when the next retry would exceed the deadline.
+        """
+        policy = RetryPolicy(max_attempts=10, base_delay=10, max_delay=10, deadline=1)
+        func = mock.Mock(side_effect=ClientException('error'))
+        with mock.patch.object(policy, 'get_delay', return_value=2):
+            with self.assertRaises(ClientException):
+                policy.call(func)
+        func.assert_called_once()
+        self.assertEqual(policy.get_stats()['give_ups'], 1)
+
+    def test_call_gives_up_when_retry_budget_is_exhausted(self):
+        """
+        Test whether the policy gives up when the shared retry budget is exhausted.
+        """
+        budget = RetryBudget(capacity=2, refill_rate=0)
+        policy1 = RetryPolicy(max_attempts=10, budget=budget)
+        policy2 = RetryPolicy(max_attempts=10, budget=budget)
+        func = mock.Mock(side_effect=ClientException('error'))
+        with self.assertRaises(ClientException):
+            policy1.call(func)
+        self.assertEqual(func.call_count, 3)
+        with self.assertRaises(ClientException):
+            policy2.call(func)
+        self.assertEqual(func.call_count, 4)
+        self.assertEqual(policy2.get_stats()['budget_exhausted'], 1)
+
+    def test_get_delay_is_capped_with_full_jitter(self):
+        """
+        Test whether the retry delays are random and capped by max_delay.
+        """
+        policy = RetryPolicy(base_delay=1, max_delay=4)
+        delays = [policy.get_delay(attempt) for attempt in range(1, 10) for _ in range(20)]
+        self.assertTrue(all(0 <= delay <= 4 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+
+class SwiftConnectionPoolStatsViewTests(TestCase):
+
+    def setUp(self):
+        self.stats_url = reverse('swiftpool-stats')
+        self.username = 'foo'
+        self.password = 'bar'
+        self.admin_username = 'admin'
+        self.admin_password = 'adminpass'
+        User.objects.create_user(username=self.username, password=self.password)
+        User.objects.create_superuser(username=self.admin_username,
+                                      password=self.admin_password,
+                                      email='admin@babymri.org')
+
+    def test_swift_connection_pool_stats_success(self):
+        self.client.login(username=self.admin_username, password=self.admin_password)
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'auth_round_trips')
+        self.assertContains(response, 'retry_give_ups')
+
+    def test_swift_connection_pool_stats_failure_access_denied(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
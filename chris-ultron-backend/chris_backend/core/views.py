@@ -1,8 +1,11 @@
 
 from rest_framework import generics, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from .models import ChrisInstance
 from .serializers import ChrisInstanceSerializer
+from .swiftmanager import SwiftManager
 
 
 class ChrisInstanceDetail(generics.RetrieveAPIView):
@@ -19,3 +22,17 @@ class ChrisInstanceDetail(generics.RetrieveAPIView):
         Overriden to return the ChrisInstance singleton.
         """
         return ChrisInstance.load()
+
+
+class SwiftConnectionPoolStats(APIView):
+    """
+    A view for the usage stats of the swift connection pool and the storage
+    operations retry policy of the process serving the request.
+    """
+    http_method_names = ['get']
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        stats = SwiftManager.get_pool_stats()
+        stats.update({f'retry_{k}': v for k, v in SwiftManager.get_retry_stats().items()})
+        return Response(stats)
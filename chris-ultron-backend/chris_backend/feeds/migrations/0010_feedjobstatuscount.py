@@ -0,0 +1,26 @@
+# Generated by Django 2.2.24 on 2026-10-18 03:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0009_auto_20210804_1530'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedJobStatusCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=30)),
+                ('count', models.IntegerField(default=0)),
+                ('feed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_status_counts', to='feeds.Feed')),
+            ],
+            options={
+                'unique_together': {('feed', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_job_status_counts(apps, schema_editor):
+    """
+    Create the job status counters of the existing feeds from the number of their
+    plugin instances in each execution status.
+    """
+    Feed = apps.get_model('feeds', 'Feed')
+    PluginInstance = apps.get_model('plugininstances', 'PluginInstance')
+    FeedJobStatusCount = apps.get_model('feeds', 'FeedJobStatusCount')
+    statuses = [status for status, _ in
+                PluginInstance._meta.get_field('status').choices]
+    counts = dict(((feed_id, status), count) for feed_id, status, count in
+                  PluginInstance.objects.values_list('feed_id', 'status').annotate(
+                      count=Count('id')).order_by().iterator())
+    counters = [FeedJobStatusCount(feed_id=feed_id, status=status,
+                                   count=counts.get((feed_id, status), 0))
+                for feed_id in Feed.objects.values_list('id', flat=True).iterator()
+                for status in statuses]
+    FeedJobStatusCount.objects.bulk_create(counters, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0010_feedjobstatuscount'),
+        ('plugininstances', '0025_backfill_plugininstance_tree_position'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_job_status_counts, migrations.RunPython.noop),
+    ]
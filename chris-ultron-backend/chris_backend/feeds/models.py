@@ -1,16 +1,46 @@
 
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Coalesce
 
 import django_filters
 from django_filters.rest_framework import FilterSet
 
 
+class FeedQuerySet(models.QuerySet):
+
+    def with_jobs_status_count(self):
+        """
+        Annotate the feeds with the number of their plugin instances in each execution
+        status ('jobs_<status>') read from their job status counters and with the
+        username of their creator ('creator_username') with a subquery. The feeds'
+        note and owners are also fetched so that serializing a page of feeds takes a
+        constant number of DB queries.
+        """
+        # plugininstances.models imports this module
+        from plugininstances.models import PluginInstance, STATUS_CHOICES
+
+        annotations = {
+            'jobs_' + status: Coalesce(models.Sum(
+                'job_status_counts__count',
+                filter=models.Q(job_status_counts__status=status)), 0)
+            for status, _ in STATUS_CHOICES}
+        creator = PluginInstance.objects.filter(
+            feed=models.OuterRef('pk'), plugin__meta__type='fs').values(
+            'owner__username')[:1]
+        annotations['creator_username'] = models.Subquery(creator)
+        return self.annotate(**annotations).select_related('note').prefetch_related(
+            'owner')
+
+
 class Feed(models.Model):
     creation_date = models.DateTimeField(auto_now_add=True)
     modification_date = models.DateTimeField(auto_now_add=True)
     name = models.CharField(max_length=200, blank=True, db_index=True)
     owner = models.ManyToManyField('auth.User', related_name='feed')
 
+    objects = FeedQuerySet.as_manager()
+
     class Meta:
         ordering = ('-creation_date',)
 
@@ -43,9 +73,44 @@ class Feed(models.Model):
     def get_plugin_instances_status_count(self, status):
         """
         Custom method to get the number of associated plugin instances with a given
-        execution status.
+        execution status. The count annotated by FeedQuerySet.with_jobs_status_count
+        is used when available, otherwise the feed's job status counter is read.
+        """
+        count = getattr(self, 'jobs_' + status, None)
+        if count is not None:
+            return count
+        counts = self.job_status_counts.filter(status=status).values_list('count',
+                                                                          flat=True)
+        return counts[0] if counts else 0
+
+
+class FeedJobStatusCount(models.Model):
+    feed = models.ForeignKey(Feed, on_delete=models.CASCADE,
+                             related_name='job_status_counts')
+    status = models.CharField(max_length=30)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('feed', 'status',)
+
+    def __str__(self):
+        return '%s: %s' % (self.status, self.count)
+
+    @classmethod
+    def add_deltas(cls, deltas):
+        """
+        Custom method to add the changes in a {(feed id, status): delta} dictionary to
+        the feeds' job status counters. The counters are updated in a consistent order
+        to avoid deadlocks between concurrent transactions and are created the first
+        time they change.
         """
-        return self.plugin_instances.filter(status=status).count()
+        for (feed_id, status), delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            counters = cls.objects.filter(feed_id=feed_id, status=status)
+            if not counters.update(count=F('count') + delta):
+                (counter, tf) = cls.objects.get_or_create(feed_id=feed_id, status=status)
+                cls.objects.filter(pk=counter.pk).update(count=F('count') + delta)
 
 
 class FeedFilter(FilterSet):
@@ -28,8 +28,8 @@ class TagSerializer(serializers.HyperlinkedModelSerializer):
 
 class TaggingSerializer(serializers.HyperlinkedModelSerializer):
     owner_username = serializers.ReadOnlyField(source='tag.owner.username')
-    tag_id = serializers.ReadOnlyField(source='tag.id')
-    feed_id = serializers.ReadOnlyField(source='feed.id')
+    tag_id = serializers.ReadOnlyField()
+    feed_id = serializers.ReadOnlyField()
     feed = serializers.HyperlinkedRelatedField(view_name='feed-detail', read_only=True)
     tag = serializers.HyperlinkedRelatedField(view_name='tag-detail', read_only=True)
 
@@ -94,6 +94,7 @@ class FeedSerializer(serializers.HyperlinkedModelSerializer):
     creator_username = serializers.SerializerMethodField()
     created_jobs = serializers.SerializerMethodField()
     waiting_jobs = serializers.SerializerMethodField()
+    queued_jobs = serializers.SerializerMethodField()
     scheduled_jobs = serializers.SerializerMethodField()
     started_jobs = serializers.SerializerMethodField()
     registering_jobs = serializers.SerializerMethodField()
@@ -113,9 +114,9 @@ class FeedSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Feed
         fields = ('url', 'id', 'creation_date', 'modification_date', 'name',
-                  'creator_username', 'created_jobs', 'waiting_jobs', 'scheduled_jobs',
-                  'started_jobs', 'registering_jobs', 'finished_jobs', 'errored_jobs',
-                  'cancelled_jobs', 'owner', 'note', 'tags', 'taggings', 'comments',
+                  'creator_username', 'created_jobs', 'waiting_jobs', 'queued_jobs',
+                  'scheduled_jobs', 'started_jobs', 'registering_jobs', 'finished_jobs',
+                  'errored_jobs', 'cancelled_jobs', 'owner', 'note', 'tags', 'taggings', 'comments',
                   'files', 'plugin_instances')
 
     def validate_name(self, name):
@@ -147,6 +148,8 @@ class FeedSerializer(serializers.HyperlinkedModelSerializer):
         """
         Overriden to get the username of the creator of the feed.
         """
+        if hasattr(obj, 'creator_username'):
+            return obj.creator_username
         return obj.get_creator().username
 
     def get_created_jobs(self, obj):
@@ -166,6 +169,14 @@ class FeedSerializer(serializers.HyperlinkedModelSerializer):
             raise KeyError(msg)
         return obj.get_plugin_instances_status_count('waiting')
 
+    def get_queued_jobs(self, obj):
+        """
+        Overriden to get the number of plugin instances in 'queued' status.
+        """
+        if 'queued' not in [status[0] for status in STATUS_CHOICES]:
+            raise KeyError("Undefined plugin instance execution status: 'queued'.")
+        return obj.get_plugin_instances_status_count('queued')
+
     def get_scheduled_jobs(self, obj):
         """
         Overriden to get the number of plugin instances in 'scheduled' status.
@@ -96,3 +96,22 @@ class FeedModelTests(TestCase):
         self.assertEqual(count, 0)
         count = feed.get_plugin_instances_status_count('cancelled')
         self.assertEqual(count, 0)
+
+    def test_with_jobs_status_count(self):
+        """
+        Test whether custom with_jobs_status_count queryset method annotates the feeds
+        with the number of plugin instances in each status and their creator.
+        """
+        plg_inst = PluginInstance.objects.get(feed__name=self.feed_name)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='mri_convert', type='ds')
+        (plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        PluginInstance.objects.create(plugin=plugin, owner=plg_inst.owner,
+                                      previous=plg_inst, status='cancelled',
+                                      compute_resource=self.compute_resource)
+        feed = Feed.objects.with_jobs_status_count().get(name=self.feed_name)
+        self.assertEqual(feed.jobs_created, 1)
+        self.assertEqual(feed.jobs_cancelled, 1)
+        self.assertEqual(feed.jobs_started, 0)
+        self.assertEqual(feed.creator_username, self.username)
+        with self.assertNumQueries(0):
+            self.assertEqual(feed.get_plugin_instances_status_count('cancelled'), 1)
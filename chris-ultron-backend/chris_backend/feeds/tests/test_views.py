@@ -4,6 +4,8 @@ import json
 import io
 
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -174,6 +176,25 @@ class FeedListViewTests(ViewTests):
         self.assertNotContains(response, "Feed1")
         self.assertNotContains(response, "Feed2")
 
+    def test_feed_list_queries_do_not_depend_on_page_size(self):
+        plugin = Plugin.objects.get(meta__name="pacspull")
+        user = User.objects.get(username=self.username)
+        for i in range(10):
+            PluginInstance.objects.create(
+                plugin=plugin, owner=user, status='finishedSuccessfully',
+                compute_resource=plugin.compute_resources.all()[0])
+        self.client.login(username=self.username, password=self.password)
+        query_counts = []
+        for limit in (2, 10):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.list_url, {'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+        feed_data = response.data['results'][0]
+        self.assertEqual(feed_data['creator_username'], self.username)
+        self.assertEqual(feed_data['finished_jobs'], 1)
+
 
 class FeedListQuerySearchViewTests(ViewTests):
     """
@@ -912,6 +933,31 @@ class FeedPluginInstanceListViewTests(ViewTests):
         self.assertContains(response, "test")
         self.assertContains(response, "test1")
 
+    def test_feed_plugin_instance_list_queries_do_not_depend_on_depth(self):
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(meta__name="pacspull")
+        plugin_ds = Plugin.objects.get(meta__name="mri_convert")
+        compute_resource = plugin_ds.compute_resources.all()[0]
+        query_counts = []
+        for chained in (False, True):
+            # a feed with 10 'ds' instances either all at depth 1 or at depths 31-40
+            root = PluginInstance.objects.create(plugin=plugin_fs, owner=user,
+                                                 compute_resource=compute_resource)
+            previous = root
+            for i in range(40 if chained else 10):
+                plg_inst = PluginInstance.objects.create(
+                    plugin=plugin_ds, owner=user, previous=previous,
+                    compute_resource=compute_resource)
+                if chained:
+                    previous = plg_inst
+            list_url = reverse("feed-plugininstance-list", kwargs={"pk": root.feed.id})
+            self.client.login(username=self.username, password=self.password)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(list_url, {'limit': 10})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
     def test_feed_plugin_instance_list_failure_not_related_feed_owner(self):
         self.client.login(username=self.other_username, password=self.other_password)
         response = self.client.get(self.list_url)
@@ -52,8 +52,8 @@ class TagList(generics.ListCreateAPIView):
         user = self.request.user
         # if the user is chris then return all the tags in the system
         if user.username == 'chris':
-            return Tag.objects.all()
-        return Tag.objects.filter(owner=user)
+            return Tag.objects.select_related('owner')
+        return Tag.objects.filter(owner=user).select_related('owner')
 
     def perform_create(self, serializer):
         """
@@ -83,7 +83,7 @@ class TagListQuerySearch(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = TagSerializer
-    queryset = Tag.objects.all()
+    queryset = Tag.objects.select_related('owner')
     permission_classes = (permissions.IsAuthenticated,)
     filterset_class = TagFilter
 
@@ -133,7 +133,7 @@ class FeedTagList(generics.ListAPIView):
         Custom method to get the actual tags queryset for the feed and user.
         """
         feed = self.get_object()
-        return feed.tags.filter(owner=user)
+        return feed.tags.filter(owner=user).select_related('owner')
 
 
 class TagFeedList(generics.ListAPIView):
@@ -162,7 +162,7 @@ class TagFeedList(generics.ListAPIView):
         Custom method to get the actual feeds queryset for the tag.
         """
         tag = self.get_object()
-        return tag.feeds.all()
+        return tag.feeds.with_jobs_status_count()
 
 
 class FeedTaggingList(generics.ListCreateAPIView):
@@ -206,7 +206,8 @@ class FeedTaggingList(generics.ListCreateAPIView):
         Custom method to get the actual taggings queryset for the feed.
         """
         feed = self.get_object()
-        return Tagging.objects.filter(feed=feed, tag__owner=user)
+        return Tagging.objects.filter(feed=feed, tag__owner=user).select_related(
+            'tag__owner')
 
 
 class TagTaggingList(generics.ListCreateAPIView):
@@ -250,7 +251,7 @@ class TagTaggingList(generics.ListCreateAPIView):
         Custom method to get the actual taggings queryset for the tag.
         """
         tag = self.get_object()
-        return Tagging.objects.filter(tag=tag)
+        return Tagging.objects.filter(tag=tag).select_related('tag__owner')
 
 
 class TaggingDetail(generics.RetrieveDestroyAPIView):
@@ -279,8 +280,8 @@ class FeedList(generics.ListAPIView):
         user = self.request.user
         # if the user is chris then return all the feeds in the system
         if user.username == 'chris':
-            return Feed.objects.all()
-        return Feed.objects.filter(owner=user)
+            return Feed.objects.with_jobs_status_count()
+        return Feed.objects.filter(owner=user).with_jobs_status_count()
 
     def list(self, request, *args, **kwargs):
         """
@@ -328,8 +329,8 @@ class FeedListQuerySearch(generics.ListAPIView):
         user = self.request.user
         # if the user is chris then return all the feeds in the system
         if user.username == 'chris':
-            return Feed.objects.all()
-        return Feed.objects.filter(owner=user)
+            return Feed.objects.with_jobs_status_count()
+        return Feed.objects.filter(owner=user).with_jobs_status_count()
 
 
 class FeedDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -337,7 +338,7 @@ class FeedDetail(generics.RetrieveUpdateDestroyAPIView):
     A feed view.
     """
     http_method_names = ['get', 'put', 'delete']
-    queryset = Feed.objects.all()
+    queryset = Feed.objects.with_jobs_status_count()
     serializer_class = FeedSerializer
     permission_classes = (permissions.IsAuthenticated, IsOwnerOrChris,)
 
@@ -413,7 +414,7 @@ class CommentList(generics.ListCreateAPIView):
         Custom method to get the actual comments' queryset.
         """
         feed = self.get_object()
-        return self.filter_queryset(feed.comments.all())
+        return self.filter_queryset(feed.comments.select_related('owner'))
 
 
 class CommentListQuerySearch(generics.ListAPIView):
@@ -431,7 +432,7 @@ class CommentListQuerySearch(generics.ListAPIView):
         comments.
         """
         feed = get_object_or_404(Feed, pk=self.kwargs['pk'])
-        return feed.comments.all()
+        return feed.comments.select_related('owner')
 
 
 class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -477,7 +478,8 @@ class FeedFileList(generics.ListAPIView):
         Custom method to get the actual feed files queryset.
         """
         feed = self.get_object()
-        return PluginInstanceFile.objects.filter(plugin_inst__feed=feed)
+        return PluginInstanceFile.objects.filter(plugin_inst__feed=feed).select_related(
+            'plugin_inst')
 
 
 class FeedPluginInstanceList(generics.ListAPIView):
@@ -504,4 +506,5 @@ class FeedPluginInstanceList(generics.ListAPIView):
         Custom method to get the actual plugin instances queryset.
         """
         feed = self.get_object()
-        return self.filter_queryset(feed.plugin_instances.all())
+        queryset = feed.plugin_instances.for_serializer(self.get_serializer().fields)
+        return self.filter_queryset(queryset)
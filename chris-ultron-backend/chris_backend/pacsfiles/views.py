@@ -16,7 +16,7 @@ class PACSFileList(generics.ListCreateAPIView):
     A view for the collection of PACS files.
     """
     http_method_names = ['get', 'post']
-    queryset = PACSFile.objects.all()
+    queryset = PACSFile.objects.select_related('pacs')
     serializer_class = PACSFileSerializer
     permission_classes = (permissions.IsAuthenticated, IsChrisOrReadOnly,)
 
@@ -52,7 +52,7 @@ class PACSFileListQuerySearch(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = PACSFileSerializer
-    queryset = PACSFile.objects.all()
+    queryset = PACSFile.objects.select_related('pacs')
     permission_classes = (permissions.IsAuthenticated,)
     filterset_class = PACSFileFilter
 
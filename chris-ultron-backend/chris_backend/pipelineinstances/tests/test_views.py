@@ -126,6 +126,32 @@ class PipelineInstanceListViewTests(ViewTests):
         response = self.client.post(self.create_read_url, data=post, content_type=self.content_type)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_pipeline_instance_create_success_auto_compute_resource(self):
+        plugin_ds = Plugin.objects.get(meta__name=self.plugin_ds_name)
+        (free, tf) = ComputeResource.objects.get_or_create(
+            name='free', compute_url=COMPUTE_RESOURCE_URL, cpus=2000, memory=1000)
+        plugin_ds.compute_resources.set([self.compute_resource, free])
+        post = json.dumps(
+            {"template": {"data": [{"name": "title", "value": "PipelineInst1"},
+                                   {"name": "previous_plugin_inst_id", "value": self.pl_inst.id},
+                                   {"name": "compute_resource_name", "value": "auto_free"}]}})
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(self.create_read_url, data=post, content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pipeline_inst = PipelineInstance.objects.get(title="PipelineInst1")
+        self.assertEqual([inst.compute_resource.name
+                          for inst in pipeline_inst.plugin_instances.all()],
+                         ['free', 'free'])
+
+    def test_pipeline_instance_create_failure_auto_compute_resource_no_fit(self):
+        post = json.dumps(
+            {"template": {"data": [{"name": "title", "value": "PipelineInst1"},
+                                   {"name": "previous_plugin_inst_id", "value": self.pl_inst.id},
+                                   {"name": "compute_resource_name", "value": "auto_free"}]}})
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(self.create_read_url, data=post, content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_pipeline_instance_list_success(self):
         pipeline = Pipeline.objects.get(name=self.pipeline_name)
         owner = User.objects.get(username=self.username)
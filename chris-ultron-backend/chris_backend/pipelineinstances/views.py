@@ -7,9 +7,12 @@ from rest_framework.serializers import ValidationError
 
 from collectionjson import services
 from pipelines.models import Pipeline
+from pipelines.services.placement import place_pipeline
 from plugininstances.models import PluginInstance
 from plugininstances.serializers import PluginInstanceSerializer
 from plugininstances.serializers import PARAMETER_SERIALIZERS
+from plugininstances.services.placement import (AUTO_COMPUTE_RESOURCE_NAMES,
+                                                AUTO_COMPUTE_RESOURCE_BUDGETS)
 from plugininstances.tasks import cancel_plugin_instance
 from plugins.fields import MemoryInt, CPUInt
 
@@ -42,6 +45,11 @@ class PipelineInstanceList(generics.ListCreateAPIView):
         pipeline = self.get_object()
         # parse and transform plugin parameter names in the request
         self.parsed_parameters = serializer.parse_parameters()
+        # place the pipings on compute resources if automatic placement is requested
+        self.placement = None
+        compute_resource_name = request_data.get('compute_resource_name')
+        if compute_resource_name:
+            self.placement = self.get_pipeline_placement(pipeline, compute_resource_name)
         # create a plugin instance for each piping in the pipeline in the same
         # tree order as the pipings
         pipings_tree = pipeline.get_pipings_tree()
@@ -92,7 +100,7 @@ class PipelineInstanceList(generics.ListCreateAPIView):
         # append write template
         template_data = {'previous_plugin_inst_id': "", 'title': "", 'description': "",
                          'cpu_limit': "", 'memory_limit': "", 'number_of_workers': "",
-                         'gpu_limit': ""}
+                         'gpu_limit': "", 'compute_resource_name': ""}
         param_names = pipeline.get_pipings_parameters_names()
         for name in param_names:
             template_data[name] = ""
@@ -103,7 +111,27 @@ class PipelineInstanceList(generics.ListCreateAPIView):
         Custom method to get the actual pipeline instances' queryset.
         """
         pipeline = self.get_object()
-        return self.filter_queryset(pipeline.instances.all())
+        return self.filter_queryset(pipeline.instances.select_related('owner'))
+
+    def get_pipeline_placement(self, pipeline, compute_resource_name):
+        """
+        Custom method to get the compute resource assignment of the pipeline's pipings
+        for an automatic compute resource option (auto_free or auto_best). Parallel
+        branches of the pipings tree are placed to minimize the pipeline's makespan.
+        """
+        if compute_resource_name not in AUTO_COMPUTE_RESOURCE_NAMES:
+            raise ValidationError(
+                {'compute_resource_name': ["Pipelines can only be placed on the "
+                                           "automatic compute resource options %s."
+                                           % list(AUTO_COMPUTE_RESOURCE_NAMES)]})
+        budget = AUTO_COMPUTE_RESOURCE_BUDGETS[compute_resource_name]
+        placement = place_pipeline(pipeline, budget)
+        if placement is None:
+            raise ValidationError(
+                {'compute_resource_name': ["No compute resources that match the minimum "
+                                           "requirements of all the pipeline's plugins "
+                                           "within the budget (%s)." % budget]})
+        return placement
 
     def create_plugin_inst(self, piping, previous_inst):
         """
@@ -114,7 +142,10 @@ class PipelineInstanceList(generics.ListCreateAPIView):
         plugin_inst.owner = owner
         plugin_inst.plugin = piping.plugin
         plugin_inst.previous = previous_inst
-        plugin_inst.compute_resource = piping.plugin.compute_resources.all()[0]
+        if self.placement:
+            plugin_inst.compute_resource = self.placement['assignment'][piping.id]
+        else:
+            plugin_inst.compute_resource = piping.plugin.compute_resources.all()[0]
         # collect and validate parameters from the request
         parsed_parameters = self.parsed_parameters
         parameter_serializers = []
@@ -191,7 +222,7 @@ class AllPipelineInstanceList(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = PipelineInstanceSerializer
-    queryset = PipelineInstance.objects.all()
+    queryset = PipelineInstance.objects.select_related('pipeline', 'owner')
     permission_classes = (permissions.IsAuthenticated,)
 
     def list(self, request, *args, **kwargs):
@@ -213,7 +244,7 @@ class AllPipelineInstanceListQuerySearch(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = PipelineInstanceSerializer
-    queryset = PipelineInstance.objects.all()
+    queryset = PipelineInstance.objects.select_related('pipeline', 'owner')
     permission_classes = (permissions.IsAuthenticated,)
     filterset_class = PipelineInstanceFilter
 
@@ -284,4 +315,5 @@ class PipelineInstancePluginInstanceList(generics.ListAPIView):
         the queried pipeline instance.
         """
         pipeline_inst = self.get_object()
-        return self.filter_queryset(pipeline_inst.plugin_instances.all())
+        fields = self.get_serializer().fields
+        return self.filter_queryset(pipeline_inst.plugin_instances.for_serializer(fields))
@@ -312,9 +312,9 @@ class PipelineSerializer(serializers.HyperlinkedModelSerializer):
 
 
 class PluginPipingSerializer(serializers.HyperlinkedModelSerializer):
-    plugin_id = serializers.ReadOnlyField(source='plugin.id')
-    pipeline_id = serializers.ReadOnlyField(source='pipeline.id')
-    previous_id = serializers.ReadOnlyField(source='previous.id')
+    plugin_id = serializers.ReadOnlyField()
+    pipeline_id = serializers.ReadOnlyField()
+    previous_id = serializers.ReadOnlyField()
     previous = serializers.HyperlinkedRelatedField(view_name='pluginpiping-detail',
                                                  read_only=True)
     plugin = serializers.HyperlinkedRelatedField(view_name='plugin-detail',
@@ -0,0 +1,123 @@
+"""
+Placement module that assigns a compute resource to every piping of a pipeline. The
+pipings tree is scheduled as a DAG so that parallel branches run concurrently: the
+goal is the lowest critical-path makespan within a cost budget, where each compute
+resource can run at most as many plugin instances at the same time as its number of
+workers.
+
+The scheduler is a budget-constrained list scheduler (HEFT-like): pipings are
+considered in decreasing order of their upward rank (the length of the longest path
+from the piping to a leaf) and each one is assigned to the compute resource with the
+earliest finish time among those it can afford while still leaving enough budget to
+place the remaining pipings on their cheapest compute resource.
+"""
+
+import heapq
+
+from django.db.models import prefetch_related_objects
+
+from plugininstances.services.placement import (AUTO_COMPUTE_RESOURCE_NAMES,
+                                                check_plugin_compute_resource,
+                                                get_expected_runtimes)
+
+
+def get_upward_ranks(tree, root_id, options):
+    """
+    Compute the upward rank of every piping in the tree, that is the mean runtime of
+    the piping plus the max upward rank of its children.
+    """
+    ranks = {}
+    stack = [(root_id, False)]
+    while stack:
+        pip_id, children_done = stack.pop()
+        child_ids = tree[pip_id]
+        if not children_done:
+            stack.append((pip_id, True))
+            stack.extend((child_id, False) for child_id in child_ids)
+            continue
+        mean_runtime = sum(opt[1] for opt in options[pip_id]) / len(options[pip_id])
+        ranks[pip_id] = mean_runtime + max((ranks[c] for c in child_ids), default=0)
+    return ranks
+
+
+def schedule_pipings_tree(tree, root_id, options, capacities, budget):
+    """
+    Schedule a tree of pipings on compute resources. The tree maps each piping id to
+    the list of its child piping ids, options maps each piping id to the list of
+    (compute resource name, runtime, cost) tuples it can run on and capacities maps
+    each compute resource name to its number of concurrent workers.
+
+    Return a dictionary with the 'assignment' (piping id -> compute resource name),
+    the 'makespan' and the total 'cost', or None if there is no feasible placement.
+    """
+    if any(not options[pip_id] for pip_id in tree):
+        return None
+    min_costs = {pip_id: min(opt[2] for opt in options[pip_id]) for pip_id in tree}
+    remaining_min_cost = sum(min_costs.values())
+    if remaining_min_cost > budget:
+        return None
+    ranks = get_upward_ranks(tree, root_id, options)
+
+    # free time of each worker slot of each compute resource
+    slots = {name: [0.0] * max(workers, 1) for name, workers in capacities.items()}
+    assignment = {}
+    finish_times = {}
+    spent = 0.0
+    ready = [(-ranks[root_id], root_id, 0.0)]  # (-rank, piping id, parent finish time)
+    while ready:
+        rank, pip_id, parent_finish = heapq.heappop(ready)
+        remaining_min_cost -= min_costs[pip_id]
+        allowance = budget - spent - remaining_min_cost
+        best = None
+        for name, runtime, cost in options[pip_id]:
+            if cost > allowance + 1e-9:
+                continue
+            start = max(parent_finish, min(slots[name]))
+            candidate = (start + runtime, cost, name)
+            if best is None or candidate < best:
+                best = candidate
+        finish, cost, name = best
+        cr_slots = slots[name]
+        cr_slots[cr_slots.index(min(cr_slots))] = finish
+        assignment[pip_id] = name
+        finish_times[pip_id] = finish
+        spent += cost
+        for child_id in tree[pip_id]:
+            heapq.heappush(ready, (-ranks[child_id], child_id, finish))
+    return {'assignment': assignment, 'makespan': max(finish_times.values()),
+            'cost': spent}
+
+
+def place_pipeline(pipeline, budget):
+    """
+    Assign a compute resource to every piping of the pipeline so that the makespan is
+    minimized within budget. Only the compute resources that a piping's plugin is
+    registered with and that meet the plugin's minimum requirements are considered.
+
+    Return a dictionary with the 'assignment' (piping id -> compute resource), the
+    expected 'makespan' and the 'cost', or None if there is no feasible placement.
+    """
+    pipings_tree = pipeline.get_pipings_tree()
+    root_id = pipings_tree['root_id']
+    pipings = [node['piping'] for node in pipings_tree['tree'].values()]
+    prefetch_related_objects(pipings, 'plugin__compute_resources',
+                             'plugin__runtime_models')
+
+    tree = {}
+    options = {}
+    compute_resources = {}
+    for pip_id, node in pipings_tree['tree'].items():
+        tree[pip_id] = node['child_ids']
+        plugin = node['piping'].plugin
+        candidates = [cr for cr in plugin.compute_resources.all()
+                      if cr.name not in AUTO_COMPUTE_RESOURCE_NAMES and
+                      check_plugin_compute_resource(plugin, cr)['fit']]
+        runtimes = get_expected_runtimes(plugin, candidates)
+        options[pip_id] = [(cr.name, runtimes[cr.id], cr.cost) for cr in candidates]
+        compute_resources.update({cr.name: cr for cr in candidates})
+    capacities = {name: cr.workers for name, cr in compute_resources.items()}
+    placement = schedule_pipings_tree(tree, root_id, options, capacities, budget)
+    if placement is not None:
+        placement['assignment'] = {pip_id: compute_resources[name] for pip_id, name
+                                   in placement['assignment'].items()}
+    return placement
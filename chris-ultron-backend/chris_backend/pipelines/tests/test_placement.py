@@ -0,0 +1,95 @@
+
+import logging
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from pipelines.models import Pipeline, PluginPiping
+from plugininstances.services.placement import get_expected_runtime
+from pipelines.services import placement
+
+
+class PlacementTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        # a root piping with two parallel branches
+        self.tree = {1: [2, 3], 2: [], 3: []}
+        self.options = {pip_id: [('fast', 10, 5), ('slow', 40, 0)]
+                        for pip_id in self.tree}
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_schedule_pipings_tree_runs_parallel_branches_concurrently(self):
+        """
+        Test whether parallel branches are costed by the critical path instead of
+        being summed up as if they ran serially.
+        """
+        result = placement.schedule_pipings_tree(self.tree, 1, self.options,
+                                                 {'fast': 2, 'slow': 2}, budget=15)
+        self.assertEqual(result['assignment'], {1: 'fast', 2: 'fast', 3: 'fast'})
+        self.assertEqual(result['makespan'], 20)
+        self.assertEqual(result['cost'], 15)
+
+    def test_schedule_pipings_tree_respects_worker_capacity(self):
+        """
+        Test whether pipings wait for a free worker of the compute resource and
+        whether a branch is moved to another compute resource when that finishes it
+        sooner.
+        """
+        result = placement.schedule_pipings_tree(self.tree, 1, self.options,
+                                                 {'fast': 1, 'slow': 1}, budget=15)
+        self.assertEqual(result['makespan'], 30)  # branches serialized on 'fast'
+
+        options = dict(self.options)
+        options[3] = [('fast', 10, 5), ('slow', 15, 0)]
+        result = placement.schedule_pipings_tree(self.tree, 1, options,
+                                                 {'fast': 1, 'slow': 1}, budget=15)
+        self.assertEqual(result['assignment'][3], 'slow')
+        self.assertEqual(result['makespan'], 25)
+        self.assertEqual(result['cost'], 10)
+
+    def test_schedule_pipings_tree_respects_budget(self):
+        """
+        Test whether the total cost stays within budget and whether None is returned
+        when no placement is feasible.
+        """
+        result = placement.schedule_pipings_tree(self.tree, 1, self.options,
+                                                 {'fast': 2, 'slow': 2}, budget=5)
+        self.assertLessEqual(result['cost'], 5)
+        self.assertEqual(list(result['assignment'].values()).count('fast'), 1)
+        options = dict(self.options)
+        options[2] = options[3] = [('fast', 10, 5)]
+        self.assertIsNone(placement.schedule_pipings_tree(self.tree, 1, options,
+                                                          {'fast': 2}, budget=5))
+
+    def test_place_pipeline(self):
+        """
+        Test whether place_pipeline assigns a compute resource that meets the plugin's
+        requirements to every piping of the pipeline.
+        """
+        small = ComputeResource.objects.create(name='small', compute_url='http://s/',
+                                               cpus=100, memory=100)
+        free = ComputeResource.objects.create(name='free', compute_url='http://f/',
+                                              cpus=2000, memory=1000, workers=2)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='simpledsapp', type='ds')
+        (plugin_ds, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin_ds.compute_resources.set([small, free])
+        user = User.objects.create_user(username='foo', password='foo-pass')
+        pipeline = Pipeline.objects.create(name='Pipeline1', owner=user)
+        root = PluginPiping.objects.create(plugin=plugin_ds, pipeline=pipeline)
+        pip1 = PluginPiping.objects.create(plugin=plugin_ds, previous=root,
+                                           pipeline=pipeline)
+        pip2 = PluginPiping.objects.create(plugin=plugin_ds, previous=root,
+                                           pipeline=pipeline)
+
+        result = placement.place_pipeline(pipeline, 0)
+        self.assertEqual(result['assignment'], {root.id: free, pip1.id: free,
+                                                pip2.id: free})
+        runtime = get_expected_runtime(plugin_ds, free)
+        self.assertAlmostEqual(result['makespan'], 2 * runtime)
@@ -30,7 +30,8 @@ class PipelineList(generics.ListCreateAPIView):
         Overriden to return a custom queryset that is only comprised by the pipelines
         that are accessible to the currently authenticated user.
         """
-        return Pipeline.get_accesible_pipelines(self.request.user)
+        return Pipeline.get_accesible_pipelines(self.request.user).select_related(
+            'owner')
 
     def perform_create(self, serializer):
         """
@@ -70,7 +71,8 @@ class PipelineListQuerySearch(generics.ListAPIView):
         Overriden to return a custom queryset that is only comprised by the pipelines
         that are accessible to the currently authenticated user.
         """
-        return Pipeline.get_accesible_pipelines(self.request.user)
+        return Pipeline.get_accesible_pipelines(self.request.user).select_related(
+            'owner')
 
 
 class PipelineDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -143,7 +145,7 @@ class PipelinePluginList(generics.ListAPIView):
         Custom method to get the actual plugins queryset for the queried pipeline.
         """
         pipeline = self.get_object()
-        return pipeline.plugins.all()
+        return pipeline.plugins.select_related('meta')
 
 
 class PipelinePluginPipingList(generics.ListAPIView):
@@ -203,13 +205,17 @@ class PipelineDefaultParameterList(generics.ListAPIView):
         pipeline = self.get_object()
         queryset = []
         queryset.extend(list(DefaultPipingStrParameter.objects.filter(
-            plugin_piping__pipeline=pipeline)))
+            plugin_piping__pipeline=pipeline).select_related(
+            'plugin_piping', 'plugin_param__plugin__meta')))
         queryset.extend(list(DefaultPipingIntParameter.objects.filter(
-            plugin_piping__pipeline=pipeline)))
+            plugin_piping__pipeline=pipeline).select_related(
+            'plugin_piping', 'plugin_param__plugin__meta')))
         queryset.extend(list(DefaultPipingFloatParameter.objects.filter(
-            plugin_piping__pipeline=pipeline)))
+            plugin_piping__pipeline=pipeline).select_related(
+            'plugin_piping', 'plugin_param__plugin__meta')))
         queryset.extend(list(DefaultPipingBoolParameter.objects.filter(
-            plugin_piping__pipeline=pipeline)))
+            plugin_piping__pipeline=pipeline).select_related(
+            'plugin_piping', 'plugin_param__plugin__meta')))
         return self.filter_queryset(queryset)
 
 
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.24 on 2026-10-18 02:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugins', '0049_computeresource_data_transfer_workers'),
+        ('plugininstances', '0021_plugininstance_error_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PluginRuntimeModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modification_date', models.DateTimeField(auto_now=True)),
+                ('n_samples', models.IntegerField(default=0)),
+                ('sum_x', models.FloatField(default=0.0)),
+                ('sum_y', models.FloatField(default=0.0)),
+                ('sum_xx', models.FloatField(default=0.0)),
+                ('sum_xy', models.FloatField(default=0.0)),
+                ('last_end_date', models.DateTimeField(null=True)),
+                ('compute_resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runtime_models', to='plugins.ComputeResource')),
+                ('plugin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runtime_models', to='plugins.Plugin')),
+            ],
+            options={
+                'unique_together': {('plugin', 'compute_resource')},
+            },
+        ),
+    ]
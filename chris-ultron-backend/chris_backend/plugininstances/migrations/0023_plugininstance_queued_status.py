@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0022_pluginruntimemodel'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plugininstance',
+            name='status',
+            field=models.CharField(choices=[('created', 'Default initial'), ('waiting', 'Waiting to be scheduled'), ('queued', 'Queued for compute resource capacity'), ('scheduled', 'Scheduled on worker'), ('started', 'Started on compute env'), ('registeringFiles', 'Registering output files'), ('finishedSuccessfully', 'Finished successfully'), ('finishedWithError', 'Finished with error'), ('cancelled', 'Cancelled')], default='created', max_length=30),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.24 on 2026-10-18 02:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0023_plugininstance_queued_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plugininstance',
+            name='depth',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='plugininstance',
+            name='output_path',
+            field=models.CharField(blank=True, db_index=True, max_length=1024),
+        ),
+        migrations.AddField(
+            model_name='plugininstance',
+            name='root_inst',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='plugininstances.PluginInstance'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_tree_position(apps, schema_editor):
+    """
+    Compute the root instance, depth and output path of the existing plugin instances
+    level by level from the 'fs' roots of the feeds down to the leaves.
+    """
+    PluginInstance = apps.get_model('plugininstances', 'PluginInstance')
+    fields = ('id', 'previous_id', 'feed_id', 'owner__username', 'plugin__meta__name')
+
+    # the parent level maps each plugin instance id to its (root instance id, depth,
+    # output path without the '<username>/feed_<id>/' prefix and '/data' suffix)
+    parents = {}
+    rows = PluginInstance.objects.filter(plugin__meta__type='fs').values_list(*fields)
+    level = []
+    for plg_inst_id, _, feed_id, username, plugin_name in rows.iterator():
+        path = f'{plugin_name}_{plg_inst_id}'
+        parents[plg_inst_id] = (plg_inst_id, 0, path)
+        level.append(PluginInstance(id=plg_inst_id, root_inst_id=plg_inst_id, depth=0,
+                                    output_path=f'{username}/feed_{feed_id}/{path}/data'))
+    while level:
+        PluginInstance.objects.bulk_update(level, ['root_inst', 'depth', 'output_path'],
+                                           batch_size=BATCH_SIZE)
+        parent_ids = list(parents)
+        children = {}
+        level = []
+        for i in range(0, len(parent_ids), BATCH_SIZE):
+            rows = PluginInstance.objects.filter(
+                previous_id__in=parent_ids[i:i + BATCH_SIZE]).exclude(
+                plugin__meta__type='fs').values_list(*fields)
+            for plg_inst_id, previous_id, feed_id, username, plugin_name in rows:
+                root_inst_id, depth, previous_path = parents[previous_id]
+                path = f'{previous_path}/{plugin_name}_{plg_inst_id}'
+                children[plg_inst_id] = (root_inst_id, depth + 1, path)
+                level.append(PluginInstance(
+                    id=plg_inst_id, root_inst_id=root_inst_id, depth=depth + 1,
+                    output_path=f'{username}/feed_{feed_id}/{path}/data'))
+        parents = children
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0024_plugininstance_tree_position'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tree_position, migrations.RunPython.noop),
+    ]
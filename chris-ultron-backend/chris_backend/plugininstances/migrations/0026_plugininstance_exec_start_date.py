@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0025_backfill_plugininstance_tree_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plugininstance',
+            name='exec_start_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0026_plugininstance_exec_start_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plugininstance',
+            name='last_status_check',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0027_plugininstance_last_status_check'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plugininstance',
+            name='queued_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,14 +1,15 @@
 
 import logging
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.expressions import RawSQL
 from django.conf import settings
 
 import django_filters
 from django_filters.rest_framework import FilterSet
 
 from core.utils import filter_files_by_n_slashes
-from feeds.models import Feed
+from feeds.models import Feed, FeedJobStatusCount
 from plugins.models import ComputeResource, Plugin, PluginParameter
 from plugins.fields import CPUField, MemoryField
 from plugins.fields import MemoryInt, CPUInt
@@ -23,6 +24,7 @@ logger = logging.getLogger(__name__)
 
 STATUS_CHOICES = [("created",               "Default initial"),
                   ("waiting",               "Waiting to be scheduled"),
+                  ("queued",                "Queued for compute resource capacity"),
                   ("scheduled",             "Scheduled on worker"),
                   ("started",               "Started on compute env"),
                   ("registeringFiles",      "Registering output files"),
@@ -31,10 +33,63 @@ STATUS_CHOICES = [("created",               "Default initial"),
                   ("cancelled",             "Cancelled")]
 
 
+class PluginInstanceQuerySet(models.QuerySet):
+
+    # max number of plugin instances updated by a single UPDATE statement
+    update_batch_size = 1000
+
+    def update(self, **kwargs):
+        """
+        Overriden to keep the job status counters of the feeds in sync when the status
+        of the plugin instances is updated in bulk. The updated plugin instances are
+        locked and their previous status is read in the same transaction.
+        """
+        if 'status' not in kwargs:
+            return super(PluginInstanceQuerySet, self).update(**kwargs)
+        status = kwargs['status']
+        with transaction.atomic():
+            rows = list(self.select_for_update(of=('self',)).values_list('id', 'feed_id',
+                                                                          'status'))
+            deltas = {}
+            for _, feed_id, previous_status in rows:
+                if previous_status != status:
+                    deltas[(feed_id, previous_status)] = deltas.get(
+                        (feed_id, previous_status), 0) - 1
+                    deltas[(feed_id, status)] = deltas.get((feed_id, status), 0) + 1
+            ids = [row[0] for row in rows]
+            n_updated = 0
+            for i in range(0, len(ids), self.update_batch_size):
+                queryset = self.model.objects.filter(
+                    id__in=ids[i:i + self.update_batch_size])
+                n_updated += super(PluginInstanceQuerySet, queryset).update(**kwargs)
+            FeedJobStatusCount.add_deltas(deltas)
+        return n_updated
+
+    def for_serializer(self, fields=None):
+        """
+        Select the related rows read by PluginInstanceSerializer in the same DB query.
+        When the names of the serialized fields are given the large columns that are
+        not among them are deferred.
+        """
+        queryset = self.select_related('plugin__meta', 'pipeline_inst__pipeline',
+                                       'owner', 'compute_resource')
+        if fields is not None:
+            deferred = [name for name in ('summary', 'raw') if name not in fields]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        return queryset
+
+
 class PluginInstance(models.Model):
     title = models.CharField(max_length=100, blank=True)
     start_date = models.DateTimeField(auto_now_add=True)
     end_date = models.DateTimeField(auto_now_add=True)
+    # when the job was submitted to the compute resource (start_date is the creation)
+    exec_start_date = models.DateTimeField(null=True, blank=True)
+    # when the instance was queued for its compute resource's capacity
+    queued_date = models.DateTimeField(null=True, blank=True)
+    # when the job's status was last checked by the safety-net status polling
+    last_status_check = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='created')
     summary = models.CharField(max_length=4000, blank=True, default='')
     raw = models.TextField(blank=True, default='')
@@ -55,6 +110,13 @@ class PluginInstance(models.Model):
     memory_limit = MemoryField(null=True)
     number_of_workers = models.IntegerField(null=True)
     gpu_limit = models.IntegerField(null=True)
+    # materialized position in the feed's tree, computed once when first saved
+    root_inst = models.ForeignKey("self", on_delete=models.CASCADE, null=True,
+                                  related_name='+')
+    depth = models.IntegerField(default=0, db_index=True)
+    output_path = models.CharField(max_length=1024, blank=True, db_index=True)
+
+    objects = PluginInstanceQuerySet.as_manager()
 
     class Meta:
         ordering = ('-start_date',)
@@ -62,10 +124,32 @@ class PluginInstance(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Overriden to remember the status loaded from the DB.
+        """
+        instance = super(PluginInstance, cls).from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        """
+        Overriden to remember the status reloaded from the DB.
+        """
+        super(PluginInstance, self).refresh_from_db(using, fields)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.__dict__.get('status')
+
     def save(self, *args, **kwargs):
         """
         Overriden to save a new feed to the DB the first time 'fs' instances are saved.
-        For 'ds' and 'ts' instances the feed of the previous instance is assigned.
+        For 'ds' and 'ts' instances the feed of the previous instance is assigned. The
+        root instance, depth and output path are also materialized the first time the
+        instance is saved with its previous instance ('fs' instances on their first
+        save). The job status counters of the feed are updated in the same transaction
+        when the instance is created or its status changes (the previous status is only
+        locked and read from the DB when it differs from the one loaded).
         """
         if not hasattr(self, 'feed'):
             plugin_type = self.plugin.meta.type
@@ -74,17 +158,55 @@ class PluginInstance(models.Model):
             elif plugin_type in ('ds', 'ts'):
                 self.feed = self.previous.feed
         self._set_compute_defaults()
-        super(PluginInstance, self).save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            previous_status = None
+            if not self._state.adding:
+                if update_fields is not None and 'status' not in update_fields:
+                    previous_status = self.status
+                elif self.status == getattr(self, '_loaded_status', None):
+                    previous_status = self.status  # the status didn't change
+                else:
+                    previous_status = PluginInstance.objects.select_for_update().filter(
+                        pk=self.pk).values_list('status', flat=True).first()
+            super(PluginInstance, self).save(*args, **kwargs)
+            if previous_status != self.status:
+                deltas = {(self.feed_id, self.status): 1}
+                if previous_status is not None:
+                    deltas[(self.feed_id, previous_status)] = -1
+                FeedJobStatusCount.add_deltas(deltas)
+        self._loaded_status = self.status
+        if self.root_inst_id is None:
+            self._set_tree_position()
+
+    def delete(self, *args, **kwargs):
+        """
+        Overriden to lower the job status counters of the feed by this plugin instance
+        and its descendants (deleted by the DB CASCADE) in the same transaction.
+        """
+        with transaction.atomic():
+            rows = self.get_descendant_instances().select_for_update().values_list(
+                'feed_id', 'status')
+            deltas = {}
+            for feed_id, status in rows:
+                deltas[(feed_id, status)] = deltas.get((feed_id, status), 0) - 1
+            result = super(PluginInstance, self).delete(*args, **kwargs)
+            FeedJobStatusCount.add_deltas(deltas)
+        return result
 
     def _save_feed(self):
         """
-        Custom internal method to create and save a new feed to the DB.
+        Custom internal method to create and save a new feed to the DB along with its
+        job status counters.
         """
         feed = Feed()
         feed.name = self.title or self.plugin.meta.name
         feed.save()
         feed.owner.set([self.owner])
         feed.save()
+        counters = [FeedJobStatusCount(feed=feed, status=status)
+                    for status, _ in STATUS_CHOICES]
+        FeedJobStatusCount.objects.bulk_create(counters)
         return feed
 
     def _set_compute_defaults(self):
@@ -100,10 +222,49 @@ class PluginInstance(models.Model):
         if not self.gpu_limit:
             self.gpu_limit = self.plugin.min_gpu_limit
 
+    def _set_tree_position(self):
+        """
+        Custom internal method to compute and save the root instance, depth and output
+        path of a saved plugin instance from those of its previous instance.
+        """
+        if self.plugin.meta.type == 'fs':
+            self.root_inst_id = self.id
+            self.depth = 0
+        else:
+            previous = self.previous
+            if previous is None:
+                return  # computed when the instance is saved with its previous
+            self.root_inst_id = previous.root_inst_id or previous.get_root_instance().id
+            self.depth = previous.depth + 1
+        self.output_path = self._compute_output_path()
+        PluginInstance.objects.filter(pk=self.pk).update(root_inst_id=self.root_inst_id,
+                                                          depth=self.depth,
+                                                          output_path=self.output_path)
+
+    def _compute_output_path(self):
+        """
+        Custom internal method to compute the output directory for files generated by
+        the plugin instance object.
+        """
+        # 'fs' plugins will output files to:
+        # SWIFT_CONTAINER_NAME/<username>/feed_<id>/plugin_name_plugin_inst_<id>/data
+        # 'ds' and 'ts' plugins will output files to:
+        # SWIFT_CONTAINER_NAME/<username>/feed_<id>/...
+        #/previous_plugin_name_plugin_inst_<id>/plugin_name_plugin_inst_<id>/data
+        path = '{0}_{1}/data'.format(self.plugin.meta.name, self.id)
+        if self.plugin.meta.type != 'fs':
+            # the previous instance's path without its '<username>/feed_<id>/' prefix
+            # (usernames can not contain slashes) and '/data' suffix
+            previous_path = self.previous.get_output_path()
+            path = previous_path.split('/', 2)[2][:-len('data')] + path
+        return '{0}/feed_{1}/'.format(self.owner.username, self.feed_id) + path
+
     def get_root_instance(self):
         """
         Custom method to return the root plugin instance for this plugin instance.
         """
+        if self.root_inst_id:
+            return self.root_inst
         current = self
         while not current.plugin.meta.type == 'fs':
             current = current.previous
@@ -111,35 +272,19 @@ class PluginInstance(models.Model):
 
     def get_descendant_instances(self):
         """
-        Custom method to return all the plugin instances that are a descendant of this
-        plugin instance.
+        Custom method to return a queryset with this plugin instance and all the plugin
+        instances that are a descendant of it in creation order (ancestors come before
+        their descendants). The tree is walked by the DB in a single query.
         """
-        descendant_instances = []
-        queue = [self]
-        while len(queue) > 0:
-            visited = queue.pop()
-            queue.extend(list(visited.next.all()))
-            descendant_instances.append(visited)
-        return descendant_instances
+        return PluginInstance.objects.filter(
+            id__in=DescendantIdsSubquery(self.id)).order_by('id')
 
     def get_output_path(self):
         """
         Custom method to get the output directory for files generated by
         the plugin instance object.
         """
-        # 'fs' plugins will output files to:
-        # SWIFT_CONTAINER_NAME/<username>/feed_<id>/plugin_name_plugin_inst_<id>/data
-        # 'ds' and 'ts' plugins will output files to:
-        # SWIFT_CONTAINER_NAME/<username>/feed_<id>/...
-        #/previous_plugin_name_plugin_inst_<id>/plugin_name_plugin_inst_<id>/data
-        current = self
-        path = '/{0}_{1}/data'.format(current.plugin.meta.name, current.id)
-        while not current.plugin.meta.type == 'fs':
-            current = current.previous
-            path = '/{0}_{1}'.format(current.plugin.meta.name, current.id) + path
-        username = self.owner.username
-        output_path = '{0}/feed_{1}'.format(username, current.feed.id) + path
-        return output_path
+        return self.output_path or self._compute_output_path()
 
     def get_parameter_instances(self):
         """
@@ -147,12 +292,10 @@ class PluginInstance(models.Model):
         instance regardless of their type.
         """
         parameter_instances = []
-        parameter_instances.extend(list(self.unextpath_param.all()))
-        parameter_instances.extend(list(self.path_param.all()))
-        parameter_instances.extend(list(self.string_param.all()))
-        parameter_instances.extend(list(self.integer_param.all()))
-        parameter_instances.extend(list(self.float_param.all()))
-        parameter_instances.extend(list(self.boolean_param.all()))
+        for related_name in ('unextpath_param', 'path_param', 'string_param',
+                             'integer_param', 'float_param', 'boolean_param'):
+            parameter_instances.extend(list(
+                getattr(self, related_name).select_related('plugin_param')))
         return parameter_instances
 
 
@@ -192,17 +335,33 @@ class PluginInstanceFilter(FilterSet):
         Custom method to return the plugin instances in a queryset with a common root
         plugin instance.
         """
-        filtered_queryset = []
-        root_queryset = queryset.filter(pk=value)
-        # check whether the root id value is in the DB
-        if not root_queryset.exists():
-            return root_queryset
-        queue = [root_queryset[0]]
-        while len(queue) > 0:
-            visited = queue.pop()
-            queue.extend(list(visited.next.all()))
-            filtered_queryset.append(visited)
-        return filtered_queryset
+        if not str(value).isdigit():
+            return queryset.none()
+        return queryset.filter(id__in=DescendantIdsSubquery(int(value))).order_by('id')
+
+
+class DescendantIdsSubquery(RawSQL):
+    """
+    Subquery expression that selects the id of a plugin instance and the ids of all
+    its descendants with a recursive common table expression (CTE) that follows the
+    previous relationship. It is meant to be the value of an 'in' lookup.
+    """
+
+    def __init__(self, plg_inst_id):
+        table = PluginInstance._meta.db_table
+        previous_column = PluginInstance._meta.get_field('previous').column
+        sql = (f'WITH RECURSIVE descendants(id) AS ('
+               f'SELECT id FROM {table} WHERE id = %s '
+               f'UNION ALL SELECT p.id FROM {table} p INNER JOIN descendants d '
+               f'ON p.{previous_column} = d.id) '
+               f'SELECT id FROM descendants')
+        super(DescendantIdsSubquery, self).__init__(sql, (plg_inst_id,))
+
+    def as_sql(self, compiler, connection):
+        """
+        Overriden to not wrap the SQL in parentheses as the 'in' lookup already does.
+        """
+        return self.sql, self.params
 
 
 class PluginInstanceLock(models.Model):
@@ -213,6 +372,58 @@ class PluginInstanceLock(models.Model):
         return self.plugin_inst.id
 
 
+class PluginRuntimeModel(models.Model):
+    """
+    Model class that defines a linear regression model of the runtime (in seconds) of
+    a plugin's instances on a compute resource as a function of their number of input
+    files. The sufficient statistics of the least squares fit are stored so that the
+    model can be refreshed incrementally with newly finished plugin instances.
+    """
+    modification_date = models.DateTimeField(auto_now=True)
+    plugin = models.ForeignKey(Plugin, on_delete=models.CASCADE,
+                               related_name='runtime_models')
+    compute_resource = models.ForeignKey(ComputeResource, on_delete=models.CASCADE,
+                                         related_name='runtime_models')
+    n_samples = models.IntegerField(default=0)
+    sum_x = models.FloatField(default=0.0)
+    sum_y = models.FloatField(default=0.0)
+    sum_xx = models.FloatField(default=0.0)
+    sum_xy = models.FloatField(default=0.0)
+    last_end_date = models.DateTimeField(null=True)
+
+    class Meta:
+        unique_together = ('plugin', 'compute_resource',)
+
+    def __str__(self):
+        return '%s@%s' % (self.plugin_id, self.compute_resource_id)
+
+    def add_sample(self, n_input_files, runtime):
+        """
+        Custom method to add a (number of input files, runtime) sample to the model.
+        """
+        self.n_samples += 1
+        self.sum_x += n_input_files
+        self.sum_y += runtime
+        self.sum_xx += n_input_files * n_input_files
+        self.sum_xy += n_input_files * runtime
+
+    def predict(self, n_input_files=None):
+        """
+        Custom method to predict the runtime for a number of input files. The mean
+        runtime is returned when the number of input files is unknown or the samples
+        don't have distinct numbers of input files.
+        """
+        if not self.n_samples:
+            return None
+        mean_y = self.sum_y / self.n_samples
+        var_x = self.sum_xx - self.sum_x * self.sum_x / self.n_samples
+        if n_input_files is None or var_x <= 1e-9:
+            return mean_y
+        mean_x = self.sum_x / self.n_samples
+        slope = (self.sum_xy - self.sum_x * self.sum_y / self.n_samples) / var_x
+        return max(mean_y + slope * (n_input_files - mean_x), 0.0)
+
+
 class PluginInstanceSplit(models.Model):
     creation_date = models.DateTimeField(auto_now_add=True)
     filter = models.CharField(max_length=600, blank=True)
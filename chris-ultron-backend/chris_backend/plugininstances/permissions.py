@@ -49,3 +49,12 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
 
         # Write permissions are only allowed to the owner and superuser 'chris'.
         return request.user == obj.owner
+
+
+class IsChris(permissions.BasePermission):
+    """
+    Custom permission to only allow access to superuser 'chris'.
+    """
+
+    def has_permission(self, request, view):
+        return request.user.username == 'chris'
@@ -8,6 +8,7 @@ from rest_framework import serializers
 from rest_framework.reverse import reverse
 
 from collectionjson.fields import ItemLinkField
+from collectionjson.serializers import SparseFieldsetSerializerMixin
 from core.utils import get_file_resource_link
 from core.swiftmanager import SwiftManager
 from plugins.models import TYPES, Plugin
@@ -21,18 +22,19 @@ from .models import PathParameter, UnextpathParameter, StrParameter
 logger = logging.getLogger(__name__)
 
 
-class PluginInstanceSerializer(serializers.HyperlinkedModelSerializer):
+class PluginInstanceSerializer(SparseFieldsetSerializerMixin,
+                               serializers.HyperlinkedModelSerializer):
     compute_resource_name = serializers.CharField(max_length=100, required=False,
                                                   source='compute_resource.name')
-    previous_id = serializers.ReadOnlyField(source='previous.id')
-    plugin_id = serializers.ReadOnlyField(source='plugin.id')
+    previous_id = serializers.ReadOnlyField()
+    plugin_id = serializers.ReadOnlyField()
     plugin_name = serializers.ReadOnlyField(source='plugin.meta.name')
     plugin_version = serializers.ReadOnlyField(source='plugin.version')
     plugin_type = serializers.ReadOnlyField(source='plugin.meta.type')
     pipeline_id = serializers.ReadOnlyField(source='pipeline_inst.pipeline.id')
     pipeline_name = serializers.ReadOnlyField(source='pipeline_inst.pipeline.name')
-    pipeline_inst_id = serializers.ReadOnlyField(source='pipeline_inst.id')
-    feed_id = serializers.ReadOnlyField(source='feed.id')
+    pipeline_inst_id = serializers.ReadOnlyField()
+    feed_id = serializers.ReadOnlyField()
     output_path = serializers.SerializerMethodField()
     summary = serializers.ReadOnlyField()
     raw = serializers.ReadOnlyField()
@@ -225,8 +227,8 @@ class PluginInstanceFileSerializer(serializers.HyperlinkedModelSerializer):
     file_resource = ItemLinkField('get_file_link')
     fname = serializers.FileField(use_url=False)
     fsize = serializers.ReadOnlyField(source='fname.size')
-    feed_id = serializers.ReadOnlyField(source='plugin_inst.feed.id')
-    plugin_inst_id = serializers.ReadOnlyField(source='plugin_inst.id')
+    feed_id = serializers.ReadOnlyField(source='plugin_inst.feed_id')
+    plugin_inst_id = serializers.ReadOnlyField()
 
     class Meta:
         model = PluginInstanceFile
@@ -0,0 +1,218 @@
+"""
+Fair-share module that decides in which order the queued plugin instances are
+admitted on their compute resources. Each user gets a share of the in-flight plugin
+instances proportional to the weight of their priority class: the next instance
+admitted is the oldest one of the user with the lowest weighted number of in-flight
+instances. Instances that have been waiting for longer than
+PLUGIN_INSTANCE_MAX_QUEUE_WAIT seconds since they were queued are admitted first
+regardless of their user's share so that no user is ever starved.
+
+The module can also be run from the CLI to replay a simulated mixed workload on a
+compute resource and report the per-user latency percentiles of the FIFO and the
+fair-share admission orders.
+"""
+
+import os
+import sys
+import math
+import heapq
+import random
+
+if __name__ == '__main__':
+    # django needs to be loaded when this script is run standalone from the command line
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    import django
+
+    django.setup()
+
+from datetime import datetime, timedelta
+from argparse import ArgumentParser
+
+from django.conf import settings
+
+
+def get_user_weight(username):
+    """
+    Get the fair-share weight of a user from the weight of their priority class.
+    """
+    classes = settings.PLUGIN_INSTANCE_PRIORITY_CLASSES
+    priority_class = settings.PLUGIN_INSTANCE_USER_PRIORITY_CLASSES.get(
+        username, settings.PLUGIN_INSTANCE_DEFAULT_PRIORITY_CLASS)
+    return classes[priority_class]
+
+
+def order_fair_share(entries, usage, weights, now=None, max_wait=None):
+    """
+    Order a list of queued (plugin instance id, user id, queue time) entries for
+    admission. The usage dictionary maps each user id to their number of in-flight
+    plugin instances and the weights dictionary maps each user id to their weight
+    (default 1). The entries that have been waiting for longer than max_wait seconds
+    at the time now come first in queue order, then the others are interleaved by
+    weighted usage assuming each admitted instance adds to its user's usage. Return
+    the list of plugin instance ids in admission order.
+    """
+    starved = []
+    d_user_entries = {}
+    for entry in sorted(entries, key=lambda e: (e[2], e[0])):
+        if max_wait is not None and now is not None and \
+                (now - entry[2]).total_seconds() > max_wait:
+            starved.append(entry[0])
+        else:
+            d_user_entries.setdefault(entry[1], []).append(entry)
+    ordered = starved
+    usage = {user_id: usage.get(user_id, 0) for user_id in d_user_entries}
+    heap = []
+    for user_id, user_entries in d_user_entries.items():
+        weight = weights.get(user_id, 1)
+        heapq.heappush(heap, ((usage[user_id] + 1) / weight, user_entries[0][2],
+                              user_entries[0][0], user_id, 0))
+    while heap:
+        _, _, plg_inst_id, user_id, index = heapq.heappop(heap)
+        ordered.append(plg_inst_id)
+        usage[user_id] += 1
+        user_entries = d_user_entries[user_id]
+        if index + 1 < len(user_entries):
+            entry = user_entries[index + 1]
+            weight = weights.get(user_id, 1)
+            heapq.heappush(heap, ((usage[user_id] + 1) / weight, entry[2], entry[0],
+                                  user_id, index + 1))
+    return ordered
+
+
+def simulate_admission(jobs, slots, policy='fairshare', weights=None, max_wait=None):
+    """
+    Replay a workload on a compute resource with the given number of slots (one per
+    in-flight plugin instance). Each job is an (id, user, arrival time, runtime)
+    tuple with times in seconds and the policy is either 'fifo' or 'fairshare'.
+    Return a dictionary mapping each job id to its queue latency (admission time
+    minus arrival time).
+    """
+    epoch = datetime(2000, 1, 1)
+    weights = weights or {}
+    jobs = sorted(jobs, key=lambda j: (j[2], j[0]))
+    d_jobs = {job[0]: job for job in jobs}
+    queue = []
+    running = []  # heap of (finish time, user)
+    usage = {}
+    latencies = {}
+    next_job = 0
+    now = 0.0
+    while next_job < len(jobs) or queue:
+        # advance the clock to the next arrival or finish event
+        events = []
+        if next_job < len(jobs):
+            events.append(jobs[next_job][2])
+        if running:
+            events.append(running[0][0])
+        now = max(now, min(events)) if events else now
+        while running and running[0][0] <= now:
+            _, user = heapq.heappop(running)
+            usage[user] -= 1
+        while next_job < len(jobs) and jobs[next_job][2] <= now:
+            job = jobs[next_job]
+            queue.append((job[0], job[1], epoch + timedelta(seconds=job[2])))
+            next_job += 1
+        free = slots - len(running)
+        if free <= 0 or not queue:
+            continue
+        if policy == 'fifo':
+            order = [entry[0] for entry in queue]
+        else:
+            order = order_fair_share(queue, usage, weights,
+                                     epoch + timedelta(seconds=now), max_wait)
+        admitted = set(order[:free])
+        for job_id in order[:free]:
+            _, user, arrival, runtime = d_jobs[job_id]
+            latencies[job_id] = now - arrival
+            usage[user] = usage.get(user, 0) + 1
+            heapq.heappush(running, (now + runtime, user))
+        queue = [entry for entry in queue if entry[0] not in admitted]
+    return latencies
+
+
+def get_latency_percentiles(jobs, latencies, percentiles=(50, 90, 99)):
+    """
+    Get the latency percentiles (nearest-rank) of each user's jobs.
+    """
+    d_user_latencies = {}
+    for job_id, user, _, _ in jobs:
+        d_user_latencies.setdefault(user, []).append(latencies[job_id])
+    result = {}
+    for user, user_latencies in d_user_latencies.items():
+        user_latencies.sort()
+        n = len(user_latencies)
+        result[user] = {p: user_latencies[max(math.ceil(p * n / 100) - 1, 0)]
+                        for p in percentiles}
+    return result
+
+
+def generate_mixed_workload(heavy_jobs=500, light_users=5, light_jobs=20,
+                            runtime=60, seed=0):
+    """
+    Generate a mixed workload: a heavy user submits heavy_jobs plugin instances at
+    once while light_users other users (the first one in the clinical priority
+    class) submit light_jobs instances each at random times over the same period.
+    """
+    rng = random.Random(seed)
+    jobs = [(i, 'heavy', 0.0, rng.uniform(0.5, 1.5) * runtime)
+            for i in range(heavy_jobs)]
+    span = heavy_jobs * runtime / 10
+    for u in range(light_users):
+        user = 'clinical' if u == 0 else f'light{u}'
+        for _ in range(light_jobs):
+            jobs.append((len(jobs), user, rng.uniform(0, span),
+                         rng.uniform(0.5, 1.5) * runtime))
+    return jobs
+
+
+class FairShareManager(object):
+
+    def __init__(self):
+        parser = ArgumentParser(description='Simulate the admission of plugin instances')
+        subparsers = parser.add_subparsers(dest='subparser_name', title='subcommands',
+                                           description='valid subcommands',
+                                           help='sub-command help')
+
+        # create the parser for the "simulate" command
+        parser_simulate = subparsers.add_parser(
+            'simulate', help='replay a mixed workload and report per-user latency '
+                             'percentiles')
+        parser_simulate.add_argument('--slots', type=int, default=10,
+                                     help='number of concurrent plugin instances')
+        parser_simulate.add_argument('--heavyjobs', type=int, default=500,
+                                     help="number of the heavy user's plugin instances")
+        parser_simulate.add_argument('--lightusers', type=int, default=5,
+                                     help='number of light users')
+        parser_simulate.add_argument('--lightjobs', type=int, default=20,
+                                     help="number of each light user's plugin "
+                                          "instances")
+        parser_simulate.add_argument('--seed', type=int, default=0,
+                                     help='random seed of the workload')
+        self.parser = parser
+
+    def run(self, args=None):
+        """
+        Parse the arguments passed to the manager and perform the appropriate action.
+        """
+        options = self.parser.parse_args(args)
+        if options.subparser_name == 'simulate':
+            jobs = generate_mixed_workload(options.heavyjobs, options.lightusers,
+                                           options.lightjobs, seed=options.seed)
+            weights = {'clinical': settings.PLUGIN_INSTANCE_PRIORITY_CLASSES.get(
+                'clinical', 1)}
+            max_wait = settings.PLUGIN_INSTANCE_MAX_QUEUE_WAIT
+            for policy in ('fifo', 'fairshare'):
+                latencies = simulate_admission(jobs, options.slots, policy, weights,
+                                               max_wait)
+                print(f'{policy} latency percentiles (s):')
+                percentiles = get_latency_percentiles(jobs, latencies)
+                for user, values in sorted(percentiles.items()):
+                    print('  %-10s p50 %8.1f  p90 %8.1f  p99 %8.1f'
+                          % (user, values[50], values[90], values[99]))
+
+
+# ENTRYPOINT
+if __name__ == "__main__":
+    manager = FairShareManager()
+    manager.run()
@@ -0,0 +1,100 @@
+"""
+Job counts module that reconciles the per-feed job status counters with the actual
+execution status of the feeds' plugin instances. The counters are maintained
+incrementally whenever a plugin instance is created, deleted or its status changes,
+so a reconciliation is only needed after plugin instances are deleted in bulk (for
+instance when a plugin is removed) or to repair the counters.
+The module can be run from the CLI to reconcile the counters of all or some feeds.
+"""
+
+import os
+import sys
+
+if __name__ == '__main__':
+    # django needs to be loaded when this script is run standalone from the command line
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    import django
+
+    django.setup()
+
+from argparse import ArgumentParser
+
+from django.db import transaction
+from django.db.models import Count
+
+from feeds.models import Feed, FeedJobStatusCount
+from plugininstances.models import PluginInstance
+
+
+# number of feeds reconciled in the same transaction
+BATCH_SIZE = 500
+
+
+def reconcile_feed_job_status_counts(feed_ids=None):
+    """
+    Recompute from scratch the job status counters of the feeds with the given ids
+    (all the feeds by default) from the execution status of their plugin instances.
+    The counters of a batch of feeds are locked while they are recomputed so that
+    concurrent status changes are not lost. Return the number of counters that were
+    created or corrected.
+    """
+    queryset = Feed.objects.all()
+    if feed_ids is not None:
+        queryset = queryset.filter(id__in=feed_ids)
+    all_ids = list(queryset.order_by('id').values_list('id', flat=True))
+    n_fixed = 0
+    for i in range(0, len(all_ids), BATCH_SIZE):
+        ids = all_ids[i:i + BATCH_SIZE]
+        with transaction.atomic():
+            counters = {(counter.feed_id, counter.status): counter for counter in
+                        FeedJobStatusCount.objects.select_for_update().filter(
+                            feed_id__in=ids).order_by('id')}
+            counts = dict(((feed_id, status), count) for feed_id, status, count in
+                          PluginInstance.objects.filter(feed_id__in=ids).values_list(
+                              'feed_id', 'status').annotate(Count('id')).order_by())
+            to_update = []
+            for key, counter in counters.items():
+                count = counts.pop(key, 0)
+                if counter.count != count:
+                    counter.count = count
+                    to_update.append(counter)
+            to_create = [FeedJobStatusCount(feed_id=feed_id, status=status, count=count)
+                         for (feed_id, status), count in counts.items()]
+            FeedJobStatusCount.objects.bulk_update(to_update, ['count'])
+            FeedJobStatusCount.objects.bulk_create(to_create)
+        n_fixed += len(to_update) + len(to_create)
+    return n_fixed
+
+
+class JobCountManager(object):
+
+    def __init__(self):
+        parser = ArgumentParser(description='Manage the feeds job status counters')
+        subparsers = parser.add_subparsers(dest='subparser_name', title='subcommands',
+                                           description='valid subcommands',
+                                           help='sub-command help')
+
+        # create the parser for the "reconcile" command
+        parser_reconcile = subparsers.add_parser(
+            'reconcile', help='recompute the job status counters from the plugin '
+                              'instances')
+        parser_reconcile.add_argument('--feedids', type=int, nargs='+',
+                                      help='ids of the feeds to reconcile (all the '
+                                           'feeds by default)')
+        self.parser = parser
+
+    def run(self, args=None):
+        """
+        Parse the arguments passed to the manager and perform the appropriate action.
+        """
+        options = self.parser.parse_args(args)
+        if options.subparser_name == 'reconcile':
+            n_fixed = reconcile_feed_job_status_counts(options.feedids)
+            print('Fixed %s job status counters' % n_fixed)
+
+
+# ENTRYPOINT
+if __name__ == "__main__":
+    manager = JobCountManager()
+    manager.run()
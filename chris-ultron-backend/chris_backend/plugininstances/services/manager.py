@@ -46,18 +46,29 @@ import re
 import io
 import time
 import json
+import shutil
 import zipfile
-from pfconclient import client as pfcon
+import tempfile
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from pfconclient.exceptions import PfconRequestException
 
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.db.utils import IntegrityError
 
-from core.swiftmanager import SwiftManager, ClientException
+from core.swiftmanager import SwiftManager, ClientException, RetryPolicy
 from core.utils import json_zip2str
 from core.models import ChrisInstance
-from plugininstances.models import PluginInstance, PluginInstanceFile, PluginInstanceLock
+from plugininstances.models import (PluginInstance, PluginInstanceFile, PluginInstanceLock,
+                                    DescendantIdsSubquery)
+
+from .pfcon_client import PfconClient
+from .scheduler import admit_queued_plugin_instances
 
 if settings.DEBUG:
     import pdb, pudb, rpudb
@@ -66,6 +77,51 @@ if settings.DEBUG:
 
 logger = logging.getLogger(__name__)
 
+# retry policy to wait for swift storage's eventual consistency. These waits are
+# bounded by the policy's deadline and don't take from the storage retry budget
+eventual_consistency_policy = RetryPolicy(max_attempts=20, base_delay=0.5, max_delay=8,
+                                          deadline=60, log_level=logging.INFO)
+
+
+def check_plugin_instances_app_exec_status(compute_resource, plugin_instances):
+    """
+    Check the app execution status of several 'started' plugin instances running on
+    the same compute resource with a single pfcon session. The status summary of the
+    jobs that are still running is updated in the DB when it changed. Return the
+    plugin instances whose remote job is no longer running so they can be handled by
+    a full status check.
+    """
+    pfcon_client = PfconClient(compute_resource.compute_url)
+    pfcon_url = pfcon_client.url
+    job_id_prefix = ChrisInstance.load().job_id_prefix
+    d_plugin_instances = {job_id_prefix + str(plg_inst.id): plg_inst
+                          for plg_inst in plugin_instances}
+    job_ids = list(d_plugin_instances.keys())
+    logger.info(f'Sending status requests for {len(job_ids)} jobs to pfcon url '
+                f'-->{pfcon_url}<--')
+    d_jobs_status = pfcon_client.get_jobs_status(job_ids, timeout=200)
+
+    changed = []
+    for job_id, d_resp in d_jobs_status.items():
+        if isinstance(d_resp, PfconRequestException):
+            logger.error(f'[CODE02,{job_id}]: Error getting job status at pfcon '
+                         f'url -->{pfcon_url}<--, detail: {str(d_resp)}')
+            continue  # CUBE will retry later
+        plg_inst = d_plugin_instances[job_id]
+        status = d_resp['compute']['status']
+        if status in ('notStarted', 'started'):
+            summary = PluginInstanceManager.get_job_status_summary(d_resp)
+            if summary != plg_inst.summary:
+                # only update (atomically) if status='started' to avoid concurrency
+                # problems
+                PluginInstance.objects.filter(
+                    id=plg_inst.id,
+                    status='started').update(summary=summary, raw=json_zip2str(d_resp))
+        else:
+            logger.info(f'Current job {job_id} remote status = {status}')
+            changed.append(plg_inst)
+    return changed
+
 
 class PluginInstanceManager(object):
 
@@ -73,14 +129,31 @@ class PluginInstanceManager(object):
 
         self.c_plugin_inst = plugin_instance
 
-        self.l_plugin_inst_param_instances = self.c_plugin_inst.get_parameter_instances()
+        # the remaining attributes are lazily constructed (cached properties below)
+        # so that no-op operations (eg. checking the status of an instance that is
+        # not 'started') don't hit the DB or create any client
+
+    @cached_property
+    def l_plugin_inst_param_instances(self):
+        return self.c_plugin_inst.get_parameter_instances()
+
+    @cached_property
+    def str_job_id(self):
+        return ChrisInstance.load().job_id_prefix + str(self.c_plugin_inst.id)
 
-        self.str_job_id = ChrisInstance.load().job_id_prefix + str(plugin_instance.id)
+    @cached_property
+    def pfcon_client(self):
+        return PfconClient(self.c_plugin_inst.compute_resource.compute_url)
 
-        self.pfcon_client = pfcon.Client(plugin_instance.compute_resource.compute_url)
+    @cached_property
+    def data_transfer_workers(self):
+        # max number of concurrent swift storage object transfers
+        return max(self.c_plugin_inst.compute_resource.data_transfer_workers, 1)
 
-        self.swift_manager = SwiftManager(settings.SWIFT_CONTAINER_NAME,
-                                          settings.SWIFT_CONNECTION_PARAMS)
+    @cached_property
+    def swift_manager(self):
+        return SwiftManager(settings.SWIFT_CONTAINER_NAME,
+                            settings.SWIFT_CONNECTION_PARAMS)
 
     def run_plugin_instance_app(self):
         """
@@ -133,13 +206,17 @@ class PluginInstanceManager(object):
             'execshell': plugin.execshell,
             'type': plugin_type
         }
+        if settings.PLUGIN_INSTANCE_STATUS_CALLBACK_URL:
+            # pfcon posts the job's status changes to this URL
+            job_descriptors['status_callback_url'] = (
+                settings.PLUGIN_INSTANCE_STATUS_CALLBACK_URL)
         pfcon_url = self.pfcon_client.url
         job_id = self.str_job_id
         logger.info(f'Submitting job {job_id} to pfcon url -->{pfcon_url}<--, '
                     f'description: {json.dumps(job_descriptors, indent=4)}')
         try:
-            d_resp = self.pfcon_client.submit_job(job_id, job_descriptors,
-                                                  zip_file.getvalue(), timeout=9000)
+            d_resp = self.pfcon_client.submit_job(job_id, job_descriptors, zip_file,
+                                                  timeout=9000)
         except PfconRequestException as e:
             logger.error(f'[CODE01,{job_id}]: Error submitting job to pfcon url '
                          f'-->{pfcon_url}<--, detail: {str(e)}')
@@ -151,9 +228,12 @@ class PluginInstanceManager(object):
                         f'-->{pfcon_url}<--, response: {json.dumps(d_resp, indent=4)}')
             # update the job status and summary
             self.c_plugin_inst.status = 'started'
+            self.c_plugin_inst.exec_start_date = timezone.now()
             self.c_plugin_inst.summary = self.get_job_status_summary()  # initial status
             self.c_plugin_inst.raw = json_zip2str(d_resp)
             self.c_plugin_inst.save()
+        finally:
+            zip_file.close()
 
     def check_plugin_instance_app_exec_status(self):
         """
@@ -231,20 +311,23 @@ class PluginInstanceManager(object):
         previous = self.c_plugin_inst.previous
         output_path = previous.get_output_path()
         fnames = [f.fname.name for f in previous.files.all()]
-        for i in range(20):  # loop to deal with eventual consistency
-            try:
-                l_ls = self.swift_manager.ls(output_path)
-            except ClientException as e:
-                logger.error(f'[CODE06,{job_id}]: Error while listing swift '
-                             f'storage files in {output_path}, detail: {str(e)}')
-            else:
-                if all(obj in l_ls for obj in fnames):
-                    return output_path
-            time.sleep(3)
-        logger.error(f'[CODE11,{job_id}]: Error while listing swift storage files in '
-                     f'{output_path}, detail: Presumable eventual consistency problem')
-        self.c_plugin_inst.error_code = 'CODE11'
-        raise NameError('Presumable eventual consistency problem.')
+
+        def check_output_files():
+            # a single listing request per attempt of the eventual consistency policy
+            l_ls = self.swift_manager.ls(output_path, retry=False)
+            if not all(obj in l_ls for obj in fnames):
+                raise NameError('Presumable eventual consistency problem.')
+            return output_path
+
+        try:
+            return eventual_consistency_policy.call(
+                check_output_files,
+                retry_if=lambda e: isinstance(e, (ClientException, NameError)))
+        except (ClientException, NameError) as e:
+            logger.error(f'[CODE11,{job_id}]: Error while listing swift storage files in '
+                         f'{output_path}, detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE11'
+            raise NameError('Presumable eventual consistency problem.')
 
     def get_plugin_instance_app_cmd_args(self):
         """
@@ -366,56 +449,62 @@ class PluginInstanceManager(object):
     def create_zip_file(self, swift_paths):
         """
         Create job zip file ready for transmission to the remote from a list of swift
-        storage paths (prefixes).
+        storage paths (prefixes). Objects are streamed from swift storage in chunks
+        into a spooled temporary file that is rolled over to disk when its size
+        exceeds settings.JOB_ZIP_SPOOL_MAX_SIZE. The caller must close the returned
+        file object.
         """
         job_id = self.str_job_id
-        memory_zip_file = io.BytesIO()
-        with zipfile.ZipFile(memory_zip_file, 'w', zipfile.ZIP_DEFLATED) as job_data_zip:
-            for swift_path in swift_paths:
-                try:
-                    l_ls = self.swift_manager.ls(swift_path)
-                except ClientException as e:
-                    logger.error(f'[CODE06,{job_id}]: Error while listing swift '
-                                 f'storage files in {swift_path}, detail: {str(e)}')
-                    self.c_plugin_inst.error_code = 'CODE06'
-                    raise
-                for obj_path in l_ls:
+        zip_file = tempfile.SpooledTemporaryFile(max_size=settings.JOB_ZIP_SPOOL_MAX_SIZE)
+        try:
+            with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as job_data_zip:
+                for swift_path in swift_paths:
                     try:
-                        contents = self.swift_manager.download_obj(obj_path)
+                        l_ls = self.swift_manager.ls(swift_path)
                     except ClientException as e:
-                        logger.error(f'[CODE08,{job_id}]: Error while downloading file '
-                                     f'{obj_path} from swift storage, detail: {str(e)}')
-                        self.c_plugin_inst.error_code = 'CODE08'
+                        logger.error(f'[CODE06,{job_id}]: Error while listing swift '
+                                     f'storage files in {swift_path}, detail: {str(e)}')
+                        self.c_plugin_inst.error_code = 'CODE06'
                         raise
-                    zip_path = obj_path.replace(swift_path, '', 1).lstrip('/')
-                    job_data_zip.writestr(zip_path, contents)
-        memory_zip_file.seek(0)
-        return memory_zip_file
+                    if self.data_transfer_workers > 1:
+                        self._write_objs_to_zip_concurrently(job_data_zip, swift_path,
+                                                             l_ls)
+                    else:
+                        for obj_path in l_ls:
+                            self._write_obj_to_zip(job_data_zip, swift_path, obj_path)
+        except Exception:
+            zip_file.close()
+            raise
+        zip_file.seek(0)
+        return zip_file
 
-    def unpack_zip_file(self, zip_file_content):
+    def unpack_zip_file(self, zip_file):
         """
         Unpack job zip file from the remote into swift storage and register the
-        extracted files with the DB.
+        extracted files with the DB. The zip file can be passed as a (seekable) file
+        object or as bytes. Each zip member is streamed into swift storage (as a
+        segmented object if larger than settings.SWIFT_OBJ_SEGMENT_SIZE) and up to
+        self.data_transfer_workers members are uploaded concurrently.
         """
         job_id = self.str_job_id
-        swift_filenames = []
+        if isinstance(zip_file, bytes):
+            zip_file = io.BytesIO(zip_file)
         try:
-            memory_zip_file = io.BytesIO(zip_file_content)
-            with zipfile.ZipFile(memory_zip_file, 'r', zipfile.ZIP_DEFLATED) as job_zip:
-                filenames = job_zip.namelist()
-                logger.info(f'{len(filenames)} files to decompress for job {job_id}')
+            with zipfile.ZipFile(zip_file, 'r', zipfile.ZIP_DEFLATED) as job_zip:
+                zip_infos = job_zip.infolist()
+                logger.info(f'{len(zip_infos)} files to decompress for job {job_id}')
                 output_path = self.c_plugin_inst.get_output_path() + '/'
-                for fname in filenames:
-                    content = job_zip.read(fname)
-                    swift_fname = output_path + fname.lstrip('/')
-                    try:
-                        self.swift_manager.upload_obj(swift_fname, content)
-                    except ClientException as e:
-                        logger.error(f'[CODE07,{job_id}]: Error while uploading file '
-                                     f'{swift_fname} to swift storage, detail: {str(e)}')
-                        self.c_plugin_inst.error_code = 'CODE07'
-                        raise
-                    swift_filenames.append(swift_fname)
+                uploads = [(job_zip, info, output_path + info.filename.lstrip('/'))
+                           for info in zip_infos]
+                if self.data_transfer_workers > 1 and len(uploads) > 1:
+                    with ThreadPoolExecutor(
+                            max_workers=self.data_transfer_workers) as executor:
+                        # map re-raises the first upload error in order
+                        list(executor.map(self._upload_zip_member, uploads))
+                else:
+                    for upload in uploads:
+                        self._upload_zip_member(upload)
+                swift_filenames = [swift_fname for (_, _, swift_fname) in uploads]
         except ClientException:
             raise
         except Exception as e:
@@ -433,7 +522,47 @@ class PluginInstanceManager(object):
         logger.info(f"Saving job {job_id} DB status as '{self.c_plugin_inst.status}'")
         self.c_plugin_inst.end_date = timezone.now()
         logger.info(f"Saving job {job_id} DB end_date as '{self.c_plugin_inst.end_date}'")
-        self.c_plugin_inst.save()
+        with transaction.atomic():
+            self.c_plugin_inst.save()
+            self.dispatch_next_plugin_instances()
+
+    def dispatch_next_plugin_instances(self):
+        """
+        Schedule or cancel the 'waiting' plugin instances that follow this plugin
+        instance according to its final status right away instead of waiting for the
+        periodic reconciliation tasks. The instances queued for the capacity released
+        by this plugin instance are also admitted. Must be called within the same transaction that
+        saves the final status.
+        """
+        from plugininstances import tasks  # avoid circular import
+
+        status = self.c_plugin_inst.status
+        # the instance's reservation is released so admit the instances queued for its
+        # compute resource's capacity first
+        plg_inst_ids = []
+        if self.c_plugin_inst.compute_resource_id is not None:
+            plg_inst_ids = admit_queued_plugin_instances(
+                self.c_plugin_inst.compute_resource_id)
+        if status == 'finishedSuccessfully':
+            batch_size = settings.PLUGIN_INSTANCE_SCHEDULE_BATCH_SIZE
+            lookup = Q(previous_id=self.c_plugin_inst.id)
+            while True:
+                n_claimed, admitted_ids = tasks.claim_waiting_plugin_instances(
+                    lookup, batch_size)
+                plg_inst_ids.extend(admitted_ids)
+                if n_claimed < batch_size:
+                    break
+        if plg_inst_ids:
+            logger.info(f'Scheduling plugin instances {plg_inst_ids} after job '
+                        f'{self.str_job_id}')
+            transaction.on_commit(lambda: tasks.bulk_apply_async(
+                tasks.run_plugin_instance, [(plg_inst_id,)
+                                            for plg_inst_id in plg_inst_ids]))
+        if status in ('finishedWithError', 'cancelled'):
+            # cancel all the waiting descendants with a single statement
+            PluginInstance.objects.filter(
+                id__in=DescendantIdsSubquery(self.c_plugin_inst.id),
+                status='waiting').update(status='cancelled')
 
     def _handle_app_unextpath_parameters(self, unextpath_parameters_dict):
         """
@@ -442,7 +571,7 @@ class PluginInstanceManager(object):
         """
         job_id = self.str_job_id
         outputdir = self.c_plugin_inst.get_output_path()
-        obj_output_path_list = []
+        obj_copy_list = []
         for param_flag in unextpath_parameters_dict:
             # each parameter value is a string of one or more paths separated by comma
             path_list = unextpath_parameters_dict[param_flag].split(',')
@@ -458,17 +587,8 @@ class PluginInstanceManager(object):
                     obj_output_path = obj.replace(path.rstrip('/'), outputdir, 1)
                     if not obj_output_path.startswith(outputdir + '/'):
                         obj_output_path = outputdir + '/' + obj.split('/')[-1]
-                    try:
-                        if not self.swift_manager.obj_exists(obj_output_path):
-                            self.swift_manager.copy_obj(obj, obj_output_path)
-                    except ClientException as e:
-                        logger.error(f'[CODE09,{job_id}]: Error while copying file '
-                                     f'from {obj} to {obj_output_path} in swift storage, '
-                                     f'detail: {str(e)}')
-                        self.c_plugin_inst.error_code = 'CODE09'
-                        raise
-                    else:
-                        obj_output_path_list.append(obj_output_path)
+                    obj_copy_list.append((obj, obj_output_path))
+        obj_output_path_list = self._copy_objs(obj_copy_list)
         logger.info('Registering output files not extracted from swift with job %s',
                     self.str_job_id)
         self._register_output_files(obj_output_path_list)
@@ -478,9 +598,8 @@ class PluginInstanceManager(object):
         Internal method to handle a 'ts' plugin's input instances' filtered objects
         (which are not extracted from object storage).
         """
-        job_id = self.str_job_id
         outputdir = self.c_plugin_inst.get_output_path()
-        obj_output_path_list = []
+        obj_copy_list = []
         for plg_inst_id in d_ts_input_objs:
             plg_inst_output_path = d_ts_input_objs[plg_inst_id]['output_path']
             obj_list = d_ts_input_objs[plg_inst_id]['objs']
@@ -489,20 +608,155 @@ class PluginInstanceManager(object):
                 plg_inst_outputdir = os.path.join(outputdir, str(plg_inst_id))
             for obj in obj_list:
                 obj_output_path = obj.replace(plg_inst_output_path, plg_inst_outputdir, 1)
-                try:
-                    if not self.swift_manager.obj_exists(obj_output_path):
-                        self.swift_manager.copy_obj(obj, obj_output_path)
-                except ClientException as e:
-                    logger.error(f'[CODE09,{job_id}]: Error while copying file '
-                                 f'from {obj} to {obj_output_path} in swift storage, '
-                                 f'detail: {str(e)}')
-                    self.c_plugin_inst.error_code = 'CODE09'
-                    raise
-                obj_output_path_list.append(obj_output_path)
+                obj_copy_list.append((obj, obj_output_path))
+        obj_output_path_list = self._copy_objs(obj_copy_list)
         logger.info("Registering 'ts' plugin's output files not extracted from swift with"
                     " job %s", self.str_job_id)
         self._register_output_files(obj_output_path_list)
 
+    def _copy_objs(self, obj_copy_list):
+        """
+        Internal method to copy a list of (source, destination) object paths within
+        swift storage using up to self.data_transfer_workers concurrent transfers.
+        Return the list of destination paths in the same order as the passed list.
+        """
+        if self.data_transfer_workers > 1 and len(obj_copy_list) > 1:
+            with ThreadPoolExecutor(max_workers=self.data_transfer_workers) as executor:
+                # map returns the results in order and re-raises the first error
+                list(executor.map(self._copy_obj, obj_copy_list))
+        else:
+            for obj_copy in obj_copy_list:
+                self._copy_obj(obj_copy)
+        return [obj_output_path for (_, obj_output_path) in obj_copy_list]
+
+    def _copy_obj(self, obj_copy):
+        """
+        Internal method to copy an object to a destination path in swift storage
+        unless the destination object already exists.
+        """
+        job_id = self.str_job_id
+        obj, obj_output_path = obj_copy
+        try:
+            if not self.swift_manager.obj_exists(obj_output_path):
+                self.swift_manager.copy_obj(obj, obj_output_path)
+        except ClientException as e:
+            logger.error(f'[CODE09,{job_id}]: Error while copying file '
+                         f'from {obj} to {obj_output_path} in swift storage, '
+                         f'detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE09'
+            raise
+
+    def _download_obj_to_file(self, obj_path):
+        """
+        Internal method to download an object from swift storage into a spooled
+        temporary file. The caller must close the returned file object.
+        """
+        job_id = self.str_job_id
+        chunk_size = settings.SWIFT_OBJ_CHUNK_SIZE
+        obj_file = tempfile.SpooledTemporaryFile(max_size=chunk_size)
+        try:
+            with closing(self.swift_manager.download_obj(
+                    obj_path, resp_chunk_size=chunk_size)) as chunks:
+                for chunk in chunks:
+                    obj_file.write(chunk)
+        except ClientException as e:
+            obj_file.close()
+            logger.error(f'[CODE08,{job_id}]: Error while downloading file '
+                         f'{obj_path} from swift storage, detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE08'
+            raise
+        except Exception:
+            obj_file.close()
+            raise
+        obj_file.seek(0)
+        return obj_file
+
+    def _write_obj_to_zip(self, job_data_zip, swift_path, obj_path, obj_file=None):
+        """
+        Internal method to write an object's contents as a new entry of the job zip
+        file. The contents are read from the passed file object or otherwise streamed
+        in chunks from swift storage.
+        """
+        job_id = self.str_job_id
+        chunk_size = settings.SWIFT_OBJ_CHUNK_SIZE
+        zip_path = obj_path.replace(swift_path, '', 1).lstrip('/')
+        zip_info = zipfile.ZipInfo(zip_path, time.localtime()[:6])
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        try:
+            # objects' size is unknown upfront so allow for zip64
+            with job_data_zip.open(zip_info, 'w', force_zip64=True) as zip_entry:
+                if obj_file is not None:
+                    shutil.copyfileobj(obj_file, zip_entry, chunk_size)
+                else:
+                    with closing(self.swift_manager.download_obj(
+                            obj_path, resp_chunk_size=chunk_size)) as chunks:
+                        for chunk in chunks:
+                            zip_entry.write(chunk)
+        except ClientException as e:
+            logger.error(f'[CODE08,{job_id}]: Error while downloading file '
+                         f'{obj_path} from swift storage, detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE08'
+            raise
+
+    def _upload_zip_member(self, upload):
+        """
+        Internal method to stream a member of a job zip file into swift storage.
+        """
+        job_id = self.str_job_id
+        job_zip, zip_info, swift_fname = upload
+        segment_size = settings.SWIFT_OBJ_SEGMENT_SIZE
+        try:
+            with job_zip.open(zip_info) as member:
+                if zip_info.file_size > segment_size:
+                    self.swift_manager.upload_segmented_obj(swift_fname, member,
+                                                            zip_info.file_size,
+                                                            segment_size)
+                else:
+                    self.swift_manager.upload_obj(swift_fname, member,
+                                                  content_length=zip_info.file_size)
+        except ClientException as e:
+            logger.error(f'[CODE07,{job_id}]: Error while uploading file '
+                         f'{swift_fname} to swift storage, detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE07'
+            raise
+
+    def _write_objs_to_zip_concurrently(self, job_data_zip, swift_path, obj_paths):
+        """
+        Internal method to download objects from swift storage using up to
+        self.data_transfer_workers concurrent transfers and write them to the job zip
+        file in the same order as the passed list of object paths. At most twice as
+        many objects as workers are prefetched at any time to bound resource usage.
+        """
+        max_pending = 2 * self.data_transfer_workers
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.data_transfer_workers) as executor:
+            try:
+                for obj_path in obj_paths:
+                    pending.append(
+                        (obj_path, executor.submit(self._download_obj_to_file, obj_path)))
+                    if len(pending) >= max_pending:
+                        self._write_next_fetched_obj_to_zip(job_data_zip, swift_path,
+                                                            pending)
+                while pending:
+                    self._write_next_fetched_obj_to_zip(job_data_zip, swift_path,
+                                                        pending)
+            except Exception:
+                for (_, future) in pending:
+                    if not future.cancel() and future.exception() is None:
+                        future.result().close()
+                raise
+
+    def _write_next_fetched_obj_to_zip(self, job_data_zip, swift_path, pending):
+        """
+        Internal method to wait for the oldest pending object download and write it to
+        the job zip file.
+        """
+        obj_path, future = pending[0]
+        obj_file = future.result()  # re-raises the download error if any
+        pending.popleft()
+        with obj_file:
+            self._write_obj_to_zip(job_data_zip, swift_path, obj_path, obj_file)
+
     def _handle_finished_successfully_status(self):
         """
         Internal method to handle the 'finishedSuccessfully' status returned by the
@@ -520,7 +774,9 @@ class PluginInstanceManager(object):
             logger.info(f'Sending zip file request to pfcon url -->{pfcon_url}<-- '
                         f'for job {job_id}')
             try:
-                zip_content = self.pfcon_client.get_job_zip_data(job_id, timeout=9000)
+                zip_file = self.pfcon_client.get_job_zip_file_obj(
+                    job_id, settings.JOB_ZIP_SPOOL_MAX_SIZE,
+                    chunk_size=settings.SWIFT_OBJ_CHUNK_SIZE, timeout=9000)
             except PfconRequestException as e:
                 logger.error(f'[CODE03,{job_id}]: Error fetching zip from pfcon url '
                              f'-->{pfcon_url}<--, detail: {str(e)}')
@@ -536,7 +792,8 @@ class PluginInstanceManager(object):
                 self.c_plugin_inst.status = 'registeringFiles'
                 self.c_plugin_inst.save()  # inform FE about status change
                 try:
-                    self.unpack_zip_file(zip_content)  # register files from remote
+                    with zip_file:
+                        self.unpack_zip_file(zip_file)  # register files from remote
 
                     # register files from unextracted path parameters
                     d_unextpath_params, _ = self.get_plugin_instance_path_parameters()
@@ -579,16 +836,22 @@ class PluginInstanceManager(object):
         """
         Internal method to register files generated by the plugin instance object with
         the REST API. The 'filenames' arg is a list of obj names in object storage.
+        Files are inserted in chunks of settings.FILE_REGISTRATION_BATCH_SIZE rows
+        (one transaction per chunk) and files already registered are ignored.
         """
         job_id = self.str_job_id
-        for obj_name in filenames:
-            logger.info(f'Registering file -->{obj_name}<-- for job {job_id}')
-            plg_inst_file = PluginInstanceFile(plugin_inst=self.c_plugin_inst)
-            plg_inst_file.fname.name = obj_name
-            try:
-                plg_inst_file.save()
-            except IntegrityError:  # avoid re-register a file already registered
-                logger.info(f'File -->{obj_name}<-- already registered for job {job_id}')
+        batch_size = settings.FILE_REGISTRATION_BATCH_SIZE
+        logger.info(f'Registering {len(filenames)} files for job {job_id}')
+        for i in range(0, len(filenames), batch_size):
+            plg_inst_files = []
+            for obj_name in filenames[i:i + batch_size]:
+                plg_inst_file = PluginInstanceFile(plugin_inst=self.c_plugin_inst)
+                plg_inst_file.fname.name = obj_name
+                plg_inst_files.append(plg_inst_file)
+            with transaction.atomic():
+                # avoid re-register a file already registered
+                PluginInstanceFile.objects.bulk_create(plg_inst_files,
+                                                       ignore_conflicts=True)
 
     @staticmethod
     def get_job_status_summary(d_response=None):
@@ -0,0 +1,158 @@
+"""
+pfcon client module that extends the upstream pfcon client with support for
+transmitting (potentially very large) job data files without holding them in memory.
+"""
+
+import io
+import os
+import uuid
+import tempfile
+
+import requests
+from pfconclient import client as pfcon
+from pfconclient.exceptions import PfconRequestException
+
+
+class MultipartFileBody(object):
+    """
+    File-like multipart/form-data request body. The form fields are encoded upfront
+    but the file object's content is read lazily in chunks as the request body is sent
+    so that the file content is never copied into memory as a whole.
+    """
+
+    def __init__(self, fields, file_field, file_obj, filename=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+
+        head = io.BytesIO()
+        for name, value in fields.items():
+            if value is None:
+                continue  # same as requests' multipart encoding
+            if not isinstance(value, bytes):
+                value = str(value).encode('utf-8')
+            head.write(f'--{self.boundary}\r\n'
+                       f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                       .encode('utf-8'))
+            head.write(value + b'\r\n')
+        filename = filename or file_field
+        head.write(f'--{self.boundary}\r\n'
+                   f'Content-Disposition: form-data; name="{file_field}"; '
+                   f'filename="{filename}"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8'))
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        file_obj.seek(0, os.SEEK_END)
+        file_size = file_obj.tell()
+        file_obj.seek(0)
+
+        self._parts = [io.BytesIO(head.getvalue()), file_obj, io.BytesIO(tail)]
+        self._current = 0
+        # requests uses this attribute to compute the Content-Length header
+        self.len = len(head.getvalue()) + file_size + len(tail)
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes from the body (the whole remaining body if size < 0).
+        """
+        chunks = []
+        remaining = size
+        while self._current < len(self._parts):
+            chunk = self._parts[self._current].read(remaining if size >= 0 else -1)
+            if chunk:
+                chunks.append(chunk)
+                if size >= 0:
+                    remaining -= len(chunk)
+                    if remaining <= 0:
+                        break
+            else:
+                self._current += 1
+        return b''.join(chunks)
+
+
+class PfconClient(pfcon.Client):
+    """
+    pfcon client that streams job data files to the remote pfcon service.
+    """
+
+    def submit_job(self, job_id, d_job_descriptors, data_file, timeout=1000):
+        """
+        Submit a new job. The data_file arg can either be the bytes content of the
+        job zip file or a seekable file object which is then streamed to pfcon.
+        """
+        if isinstance(data_file, bytes):
+            return super(PfconClient, self).submit_job(job_id, d_job_descriptors,
+                                                       data_file, timeout)
+        d_job_descriptors['jid'] = job_id
+        body = MultipartFileBody(d_job_descriptors, 'data_file', data_file)
+        resp = self.post_stream(self.url, body, timeout)
+        return self.get_data_from_response(resp)
+
+    def get_jobs_status(self, job_ids, timeout=1000):
+        """
+        Get the execution status of several jobs. pfcon lacks a batch status API so
+        the requests are pipelined through a single keep-alive HTTP session. Return a
+        dictionary mapping each job id to either its status response data or the
+        PfconRequestException raised while getting it. Remaining jobs are not queried
+        after a connection error.
+        """
+        d_jobs_status = {}
+        with requests.Session() as session:
+            if self.username or self.password:
+                session.auth = (self.username, self.password)
+            for i, job_id in enumerate(job_ids):
+                try:
+                    r = session.get(self.url + job_id + '/', timeout=timeout)
+                except (requests.exceptions.Timeout,
+                        requests.exceptions.RequestException) as e:
+                    for jid in job_ids[i:]:
+                        d_jobs_status[jid] = PfconRequestException(str(e))
+                    break
+                try:
+                    d_jobs_status[job_id] = self.get_data_from_response(r)
+                except (PfconRequestException, ValueError) as e:
+                    d_jobs_status[job_id] = PfconRequestException(str(e))
+        return d_jobs_status
+
+    def get_job_zip_file_obj(self, job_id, spool_max_size, chunk_size=1024 * 1024,
+                             timeout=1000):
+        """
+        Get a job's zip file streamed into a spooled temporary file that is rolled
+        over to disk when its size exceeds spool_max_size. The caller must close the
+        returned file object.
+        """
+        url = self.url + job_id + '/file/'
+        try:
+            if self.username or self.password:
+                r = requests.get(url, auth=(self.username, self.password),
+                                 timeout=timeout, stream=True)
+            else:
+                r = requests.get(url, timeout=timeout, stream=True)
+            with r:
+                if r.status_code not in (200, 201):
+                    raise PfconRequestException(r.text)
+                zip_file = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+                try:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        zip_file.write(chunk)
+                except Exception:
+                    zip_file.close()
+                    raise
+        except (requests.exceptions.Timeout, requests.exceptions.RequestException) as e:
+            raise PfconRequestException(str(e))
+        zip_file.seek(0)
+        return zip_file
+
+    def post_stream(self, url, body, timeout=30):
+        """
+        Make a POST request to pfcon with a streamed multipart body.
+        """
+        headers = {'Content-Type': body.content_type}
+        try:
+            if self.username or self.password:
+                r = requests.post(url, data=body, auth=(self.username, self.password),
+                                  timeout=timeout, headers=headers)
+            else:
+                r = requests.post(url, data=body, timeout=timeout, headers=headers)
+        except (requests.exceptions.Timeout, requests.exceptions.RequestException) as e:
+            raise PfconRequestException(str(e))
+        return r
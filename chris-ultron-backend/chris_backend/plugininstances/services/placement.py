@@ -0,0 +1,114 @@
+"""
+Placement module that selects the compute resource a plugin instance runs on when the
+automatic compute resource options (auto_free and auto_best) are requested. The
+plugin's requirements are evaluated in-process against the compute resources the
+plugin is registered with.
+"""
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+
+
+AUTO_COMPUTE_RESOURCE_NAMES = ('auto_free', 'auto_best')
+
+# max cost of the selected compute resource for each automatic option
+AUTO_COMPUTE_RESOURCE_BUDGETS = {'auto_free': 0, 'auto_best': 1000000}
+
+
+def get_plugin_compute_resources(plugin):
+    """
+    Get the list of actual (non-automatic) compute resources the plugin is registered
+    with. The compute resources are prefetched with a single DB query.
+    """
+    prefetch_related_objects([plugin], 'compute_resources')
+    return [cr for cr in plugin.compute_resources.all()
+            if cr.name not in AUTO_COMPUTE_RESOURCE_NAMES]
+
+
+def check_plugin_compute_resource(plugin, compute_resource):
+    """
+    Check the plugin's minimum requirements against a compute resource. Return a
+    dictionary with the 'fit' boolean and the list of unmet requirement messages.
+    """
+    messages = []
+    if compute_resource.cpus < plugin.min_cpu_limit:
+        messages.append(f"{plugin.min_cpu_limit} milli-core CPU's, but "
+                        f"{compute_resource.cpus} milli-core CPUs available.")
+    if compute_resource.gpus < plugin.min_gpu_limit:
+        messages.append(f"{plugin.min_gpu_limit} milli-core GPU's, but "
+                        f"{compute_resource.gpus} milli-core GPUs available.")
+    if compute_resource.memory < plugin.min_memory_limit:
+        messages.append(f"{plugin.min_memory_limit} MB's memory, but "
+                        f"{compute_resource.memory} MB's available.")
+    if compute_resource.workers < plugin.min_number_of_workers:
+        messages.append(f"{plugin.min_number_of_workers} workers, but only "
+                        f"{compute_resource.workers} workers available.")
+    if messages:
+        return {'fit': False, 'message': messages}
+    return {'fit': True}
+
+
+def check_plugin_compute_resources(plugin, compute_resources):
+    """
+    Check the plugin's minimum requirements against a list of compute resources.
+    Return a list with a {name: {'fit': ..., 'message': ...}} dictionary per compute
+    resource.
+    """
+    return [{cr.name: check_plugin_compute_resource(plugin, cr)}
+            for cr in compute_resources]
+
+
+def get_expected_runtime(plugin, compute_resource):
+    """
+    Estimate the plugin's runtime on a compute resource (relative units).
+    """
+    expected_runtime = 1000
+    speed = compute_resource.cpus * compute_resource.cpu_clock_speed_ghz + \
+        0.2 * (compute_resource.memory / plugin.min_memory_limit) + 0.001
+    if plugin.min_gpu_limit != 0:
+        speed += 0.5 * compute_resource.gpus
+    return expected_runtime / speed
+
+
+def get_expected_runtimes(plugin, compute_resources, n_input_files=None):
+    """
+    Get the expected runtime of the plugin on each compute resource as a dictionary
+    keyed by compute resource id. The plugin's runtime models fit from its finished
+    instances are used when they have enough samples. The other compute resources get
+    the heuristic estimate rescaled to seconds by the mean ratio between the learned
+    and heuristic runtimes (the plain heuristic is used if there is no runtime model).
+    """
+    min_samples = settings.PLUGIN_RUNTIME_MODEL_MIN_SAMPLES
+    runtime_models = {m.compute_resource_id: m for m in plugin.runtime_models.all()
+                      if m.n_samples >= min_samples}
+    heuristic = {cr.id: get_expected_runtime(plugin, cr) for cr in compute_resources}
+    learned = {cr.id: runtime_models[cr.id].predict(n_input_files)
+               for cr in compute_resources if cr.id in runtime_models}
+    ratios = [learned[cr_id] / heuristic[cr_id] for cr_id in learned
+              if heuristic[cr_id] > 0]
+    scale = sum(ratios) / len(ratios) if ratios else 1.0
+    return {cr_id: learned.get(cr_id, runtime * scale)
+            for cr_id, runtime in heuristic.items()}
+
+
+def select_compute_resource(plugin, budget, n_input_files=None):
+    """
+    Select the compute resource with the lowest expected runtime among the plugin's
+    compute resources that meet its minimum requirements and whose cost is within
+    budget. Return a tuple with the selected compute resource (or None) and the list
+    of requirement check results.
+    """
+    prefetch_related_objects([plugin], 'runtime_models')
+    compute_resources = get_plugin_compute_resources(plugin)
+    matching = check_plugin_compute_resources(plugin, compute_resources)
+    candidates = [cr for cr, match in zip(compute_resources, matching)
+                  if match[cr.name]['fit'] and cr.cost <= budget]
+    runtimes = get_expected_runtimes(plugin, candidates, n_input_files)
+    best_compute_resource = None
+    best_runtime = None
+    for cr in candidates:
+        runtime = runtimes[cr.id]
+        if best_runtime is None or runtime < best_runtime:
+            best_runtime = runtime
+            best_compute_resource = cr
+    return best_compute_resource, matching
@@ -0,0 +1,191 @@
+"""
+Runtime model module that fits the runtime models of the plugins on the compute
+resources from the historical finished plugin instances. The models are refreshed
+incrementally by a periodic task and consulted by the automatic compute resource
+placement. The module can also be run from the CLI to refresh the models or to
+evaluate their prediction error offline.
+"""
+
+import os
+import sys
+import math
+
+if __name__ == '__main__':
+    # django needs to be loaded when this script is run standalone from the command line
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    import django
+
+    django.setup()
+
+from datetime import timedelta
+from argparse import ArgumentParser
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from plugininstances.models import PluginInstance, PluginRuntimeModel
+
+
+def get_runtime_samples(since=None, until=None):
+    """
+    Get an iterator over the (plugin id, compute resource id, number of input files,
+    runtime in seconds) samples of the plugin instances that finished successfully
+    after the since date and up to the until date, in the order they finished. The
+    runtime is measured from the job's submission to the compute resource, so the
+    time spent waiting for the previous instance or queued for capacity is left out
+    (instances without a recorded submission date are skipped). The number of input
+    files of a plugin instance is the number of output files of its previous plugin
+    instance.
+    """
+    queryset = PluginInstance.objects.filter(status='finishedSuccessfully',
+                                             compute_resource__isnull=False,
+                                             exec_start_date__isnull=False)
+    if since is not None:
+        queryset = queryset.filter(end_date__gt=since)
+    if until is not None:
+        queryset = queryset.filter(end_date__lte=until)
+    queryset = queryset.annotate(n_input_files=Count('previous__files')).order_by(
+        'end_date', 'id')
+    rows = queryset.values_list('plugin_id', 'compute_resource_id', 'n_input_files',
+                                'exec_start_date', 'end_date')
+    for plugin_id, compute_resource_id, n_input_files, exec_start_date, end_date in \
+            rows.iterator():
+        runtime = (end_date - exec_start_date).total_seconds()
+        yield plugin_id, compute_resource_id, n_input_files, runtime
+
+
+def fit_runtime_models(samples):
+    """
+    Fit unsaved runtime models from an iterable of samples. Return a dictionary
+    mapping (plugin id, compute resource id) tuples to the models.
+    """
+    runtime_models = {}
+    for plugin_id, compute_resource_id, n_input_files, runtime in samples:
+        key = (plugin_id, compute_resource_id)
+        if key not in runtime_models:
+            runtime_models[key] = PluginRuntimeModel(
+                plugin_id=plugin_id, compute_resource_id=compute_resource_id)
+        runtime_models[key].add_sample(n_input_files, runtime)
+    return runtime_models
+
+
+def refresh_runtime_models():
+    """
+    Add the plugin instances that finished since the last refresh to the runtime
+    models. Instances that finished in the last PLUGIN_RUNTIME_MODEL_REFRESH_LAG
+    seconds are left for the next refresh so that none is missed while its final
+    status is being committed. Return the number of updated models.
+    """
+    until = timezone.now() - timedelta(seconds=settings.PLUGIN_RUNTIME_MODEL_REFRESH_LAG)
+    since = PluginRuntimeModel.objects.aggregate(
+        Max('last_end_date'))['last_end_date__max']
+    runtime_models = {(m.plugin_id, m.compute_resource_id): m
+                      for m in PluginRuntimeModel.objects.all()}
+    updated = set()
+    for sample in get_runtime_samples(since, until):
+        key = sample[:2]
+        if key not in runtime_models:
+            runtime_models[key] = PluginRuntimeModel(plugin_id=key[0],
+                                                     compute_resource_id=key[1])
+        runtime_models[key].add_sample(*sample[2:])
+        updated.add(key)
+    with transaction.atomic():
+        for key in updated:
+            runtime_models[key].last_end_date = until
+            runtime_models[key].save()
+    return len(updated)
+
+
+def evaluate_runtime_models(test_fraction=0.2):
+    """
+    Evaluate the prediction error of the runtime models offline. The models are fit
+    on the oldest finished plugin instances and tested on the most recent
+    test_fraction of them. The errors of the models are reported along with the
+    errors of a baseline that predicts the mean runtime of each (plugin, compute
+    resource) pair.
+    """
+    samples = list(get_runtime_samples())
+    n_test = int(math.ceil(len(samples) * test_fraction)) if samples else 0
+    train_samples = samples[:len(samples) - n_test]
+    test_samples = samples[len(samples) - n_test:]
+    runtime_models = fit_runtime_models(train_samples)
+
+    min_samples = settings.PLUGIN_RUNTIME_MODEL_MIN_SAMPLES
+    model_errors = []
+    baseline_errors = []
+    uncovered = 0
+    for plugin_id, compute_resource_id, n_input_files, runtime in test_samples:
+        runtime_model = runtime_models.get((plugin_id, compute_resource_id))
+        if runtime_model is None or runtime_model.n_samples < min_samples:
+            uncovered += 1
+            continue
+        model_errors.append((runtime_model.predict(n_input_files), runtime))
+        baseline_errors.append((runtime_model.predict(), runtime))
+    return {'train_samples': len(train_samples), 'test_samples': len(test_samples),
+            'uncovered_test_samples': uncovered,
+            'model': get_prediction_errors(model_errors),
+            'baseline': get_prediction_errors(baseline_errors)}
+
+
+def get_prediction_errors(predictions):
+    """
+    Get the mean absolute error, root mean squared error (in seconds) and mean
+    absolute percentage error of a list of (predicted, actual) runtime tuples.
+    """
+    if not predictions:
+        return {'mae': None, 'rmse': None, 'mape': None}
+    n = len(predictions)
+    mae = sum(abs(p - a) for p, a in predictions) / n
+    rmse = math.sqrt(sum((p - a) ** 2 for p, a in predictions) / n)
+    relative = [abs(p - a) / a for p, a in predictions if a > 0]
+    mape = 100 * sum(relative) / len(relative) if relative else None
+    return {'mae': mae, 'rmse': rmse, 'mape': mape}
+
+
+class RuntimeModelManager(object):
+
+    def __init__(self):
+        parser = ArgumentParser(description='Manage the plugins runtime models')
+        subparsers = parser.add_subparsers(dest='subparser_name', title='subcommands',
+                                           description='valid subcommands',
+                                           help='sub-command help')
+
+        # create the parser for the "refresh" command
+        subparsers.add_parser('refresh', help='refresh the runtime models with the '
+                                              'recently finished plugin instances')
+
+        # create the parser for the "evaluate" command
+        parser_evaluate = subparsers.add_parser(
+            'evaluate', help='evaluate the prediction error of the runtime models')
+        parser_evaluate.add_argument('--testfraction', type=float, default=0.2,
+                                     help='fraction of the most recent finished plugin '
+                                          'instances used as the test set')
+        self.parser = parser
+
+    def run(self, args=None):
+        """
+        Parse the arguments passed to the manager and perform the appropriate action.
+        """
+        options = self.parser.parse_args(args)
+        if options.subparser_name == 'refresh':
+            n_updated = refresh_runtime_models()
+            print('Updated %s runtime models' % n_updated)
+        elif options.subparser_name == 'evaluate':
+            result = evaluate_runtime_models(options.testfraction)
+            print('Train samples: %s, test samples: %s (%s without a runtime model)'
+                  % (result['train_samples'], result['test_samples'],
+                     result['uncovered_test_samples']))
+            for name in ('model', 'baseline'):
+                errors = {k: 'n/a' if v is None else '%.2f' % v
+                          for k, v in result[name].items()}
+                print('%s: MAE %ss, RMSE %ss, MAPE %s%%' % (
+                    name, errors['mae'], errors['rmse'], errors['mape']))
+
+
+# ENTRYPOINT
+if __name__ == "__main__":
+    manager = RuntimeModelManager()
+    manager.run()
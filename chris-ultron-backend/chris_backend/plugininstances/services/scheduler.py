@@ -0,0 +1,190 @@
+"""
+Scheduler module that implements the capacity-aware admission control of plugin
+instances on compute resources. A runnable plugin instance is first put in 'queued'
+status and is only admitted ('scheduled' status) when the cpu, memory and gpu limits
+reserved by the in-flight plugin instances of its compute resource leave room for its
+own limits. The queued plugin instances are admitted as soon as an instance on the
+same compute resource finishes. A capacity of 0 in any dimension is unlimited so that
+compute resources registered without their capacity keep admitting everything. The
+queued plugin instances are considered in fair-share order across users (see the
+fairshare module).
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum, prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from plugins.models import ComputeResource
+from plugininstances.models import PluginInstance
+
+from .fairshare import get_user_weight, order_fair_share
+from .placement import AUTO_COMPUTE_RESOURCE_NAMES, check_plugin_compute_resource
+
+
+# statuses of the plugin instances that hold a reservation on their compute resource
+IN_FLIGHT_STATUSES = ('scheduled', 'started', 'registeringFiles')
+
+# (plugin instance field, compute resource field) pairs of the reserved resources
+RESERVATION_FIELDS = (('cpu_limit', 'cpus'), ('memory_limit', 'memory'),
+                      ('gpu_limit', 'gpus'))
+
+
+def get_compute_resources_utilization(queryset=None):
+    """
+    Annotate a compute resources queryset with the resources reserved by their
+    in-flight plugin instances ('reserved_cpus', 'reserved_memory', 'reserved_gpus'),
+    their number of in-flight ('running_jobs') and queued ('queued_jobs') plugin
+    instances with a single DB query.
+    """
+    if queryset is None:
+        queryset = ComputeResource.objects.all()
+    in_flight = Q(plugin_instances__status__in=IN_FLIGHT_STATUSES)
+    annotations = {
+        'reserved_' + cr_field: Coalesce(Sum('plugin_instances__' + field,
+                                             filter=in_flight), 0)
+        for field, cr_field in RESERVATION_FIELDS}
+    annotations['running_jobs'] = Count('plugin_instances', filter=in_flight)
+    annotations['queued_jobs'] = Count(
+        'plugin_instances', filter=Q(plugin_instances__status='queued'))
+    return queryset.annotate(**annotations)
+
+
+def get_reservation(plg_inst):
+    """
+    Get the (cpu, memory, gpu) resources reserved by a plugin instance.
+    """
+    return tuple(getattr(plg_inst, field) or 0 for field, _ in RESERVATION_FIELDS)
+
+
+def fits_compute_resource(compute_resource, reserved, reservation):
+    """
+    Check whether a reservation fits in what is left of a compute resource's capacity
+    given its currently reserved resources. A compute resource with no in-flight
+    plugin instance always admits one so that a plugin instance requiring more than
+    the capacity is not queued forever.
+    """
+    if reserved['running_jobs'] == 0:
+        return True
+    for (_, cr_field), amount, in_use in zip(RESERVATION_FIELDS, reservation,
+                                             reserved['resources']):
+        capacity = getattr(compute_resource, cr_field)
+        if capacity and in_use + amount > capacity:
+            return False
+    return True
+
+
+def get_spillover_compute_resources(plg_inst):
+    """
+    Get the compute resources a queued plugin instance can spill over to: the other
+    actual compute resources its plugin is registered with that meet the plugin's
+    minimum requirements and are not more expensive than its compute resource.
+    """
+    max_cost = plg_inst.compute_resource.cost
+    return [cr for cr in plg_inst.plugin.compute_resources.all()
+            if cr.id != plg_inst.compute_resource_id and
+            cr.name not in AUTO_COMPUTE_RESOURCE_NAMES and cr.cost <= max_cost and
+            check_plugin_compute_resource(plg_inst.plugin, cr)['fit']]
+
+
+def order_plugin_instances(instances):
+    """
+    Order a list of queued plugin instances for admission according to their owners'
+    fair share of the in-flight plugin instances and the starvation guarantee.
+    """
+    owners = {plg_inst.owner_id: plg_inst.owner for plg_inst in instances}
+    usage = dict(PluginInstance.objects.filter(
+        owner_id__in=owners, status__in=IN_FLIGHT_STATUSES).values_list(
+        'owner_id').annotate(Count('id')).order_by())
+    weights = {owner_id: get_user_weight(owner.username)
+               for owner_id, owner in owners.items()}
+    # the instances' queue wait is measured from when they were queued (start_date is
+    # their creation, which can be long before for instances that were waiting)
+    entries = [(plg_inst.id, plg_inst.owner_id,
+                plg_inst.queued_date or plg_inst.start_date) for plg_inst in instances]
+    ordered_ids = order_fair_share(entries, usage, weights, timezone.now(),
+                                   settings.PLUGIN_INSTANCE_MAX_QUEUE_WAIT)
+    d_instances = {plg_inst.id: plg_inst for plg_inst in instances}
+    return [d_instances[plg_inst_id] for plg_inst_id in ordered_ids]
+
+
+def admit_plugin_instances(plg_inst_ids):
+    """
+    Admit the plugin instances in 'queued' DB status with the given ids in
+    fair-share order as long as their compute resource has enough capacity left. When the
+    PLUGIN_INSTANCE_SPILLOVER setting is on an instance whose compute resource is
+    saturated is moved to another fitting compute resource with capacity left. The
+    compute resource rows are locked so that concurrent admissions do not overcommit
+    them. Return the list of admitted plugin instance ids, which are now in
+    'scheduled' DB status. The other instances stay queued.
+    """
+    if not plg_inst_ids:
+        return []
+    spillover = settings.PLUGIN_INSTANCE_SPILLOVER
+    with transaction.atomic():
+        queryset = PluginInstance.objects.select_for_update(
+            skip_locked=True, of=('self',)).filter(id__in=plg_inst_ids,
+                                                   status='queued').order_by('id')
+        queryset = queryset.select_related('compute_resource', 'plugin', 'owner')
+        instances = [plg_inst for plg_inst in queryset
+                     if plg_inst.compute_resource is not None]
+        if not instances:
+            return []
+        instances = order_plugin_instances(instances)
+        compute_resources = {plg_inst.compute_resource_id: plg_inst.compute_resource
+                             for plg_inst in instances}
+        if spillover:
+            plugins = list({plg_inst.plugin_id: plg_inst.plugin
+                            for plg_inst in instances}.values())
+            prefetch_related_objects(plugins, 'compute_resources')
+            for plugin in plugins:
+                compute_resources.update({cr.id: cr for cr in
+                                          plugin.compute_resources.all()})
+        # lock the compute resources in a consistent order to avoid deadlocks
+        list(ComputeResource.objects.select_for_update().filter(
+            id__in=compute_resources).order_by('id').values_list('id', flat=True))
+        utilization = get_compute_resources_utilization(
+            ComputeResource.objects.filter(id__in=compute_resources))
+        reserved = {cr.id: {'running_jobs': cr.running_jobs,
+                            'resources': [getattr(cr, 'reserved_' + cr_field)
+                                          for _, cr_field in RESERVATION_FIELDS]}
+                    for cr in utilization}
+
+        admitted = {}  # compute resource id -> admitted plugin instance ids
+        for plg_inst in instances:
+            reservation = get_reservation(plg_inst)
+            candidates = [plg_inst.compute_resource]
+            if spillover:
+                candidates += get_spillover_compute_resources(plg_inst)
+            for cr in candidates:
+                if fits_compute_resource(cr, reserved[cr.id], reservation):
+                    reserved[cr.id]['running_jobs'] += 1
+                    reserved[cr.id]['resources'] = [
+                        in_use + amount for in_use, amount
+                        in zip(reserved[cr.id]['resources'], reservation)]
+                    admitted.setdefault(cr.id, []).append(plg_inst.id)
+                    break
+        for compute_resource_id, ids in admitted.items():
+            PluginInstance.objects.filter(id__in=ids, status='queued').update(
+                status='scheduled', compute_resource_id=compute_resource_id)
+    return sorted(plg_inst_id for ids in admitted.values() for plg_inst_id in ids)
+
+
+def admit_queued_plugin_instances(compute_resource_id=None):
+    """
+    Admit a batch of the oldest plugin instances in 'queued' DB status, optionally
+    only those queued on the given compute resource. The oldest queued instance of
+    every user is always part of the batch so that a user with many queued instances
+    can not keep the others out of it. Return the list of admitted plugin instance
+    ids.
+    """
+    queryset = PluginInstance.objects.filter(status='queued')
+    if compute_resource_id is not None:
+        queryset = queryset.filter(compute_resource_id=compute_resource_id)
+    batch_size = settings.PLUGIN_INSTANCE_SCHEDULE_BATCH_SIZE
+    plg_inst_ids = set(queryset.order_by('id').values_list('id', flat=True)[
+                       :batch_size])
+    plg_inst_ids.update(queryset.values('owner_id').annotate(
+        min_id=Min('id')).order_by().values_list('min_id', flat=True))
+    return admit_plugin_instances(sorted(plg_inst_ids))
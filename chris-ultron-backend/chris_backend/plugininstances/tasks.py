@@ -1,13 +1,26 @@
 
+import hashlib
 import logging
+import math
+import time
+from collections import defaultdict
 from functools import wraps
 
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
 
 from celery import shared_task
 
+from core.leases import lease_manager
+from plugins.models import ComputeResource
+
 from .models import PluginInstance
-from .services.manager import PluginInstanceManager
+from .services.manager import (PluginInstanceManager,
+                               check_plugin_instances_app_exec_status)
+from .services.runtime import refresh_runtime_models
+from .services.scheduler import admit_plugin_instances, admit_queued_plugin_instances
 
 
 logger = logging.getLogger(__name__)
@@ -16,25 +29,23 @@ logger = logging.getLogger(__name__)
 def skip_if_running(f):
     """
     This decorator is supposed to ensure that a task is only running once across all
-    workers.
-    https://stackoverflow.com/questions/20894771/celery-beat-limit-to-single-task-instance-at-a-time
+    workers. The task run holds a lease lock that expires after TASK_LEASE_TTL seconds
+    in case its worker dies mid-run.
     """
     task_name = f'{f.__module__}.{f.__name__}'
     @wraps(f)
     def wrapped(self, *args, **kwargs):
-        workers = self.app.control.inspect().active()
-        if workers is None:
-            logger.info('could not find worker for task %s (%s, %s), skipping',
-                        task_name, args, kwargs)
-            return None
-        for worker, tasks in workers.items():
-            for task in tasks:
-                if (task_name == task['name'] and tuple(args) == tuple(task['args']) and
-                        kwargs == task['kwargs'] and self.request.id != task['id']):
-                    logger.info('task %s (%s, %s) is running on %s, skipping',
-                                task_name, args, kwargs, worker)
-                    return None
-        return f(self, *args, **kwargs)
+        lease_name = task_name
+        if args or kwargs:
+            args_repr = repr((args, sorted(kwargs.items()))).encode('utf-8')
+            lease_name += ':' + hashlib.sha1(args_repr).hexdigest()
+        with lease_manager.lease(lease_name, settings.TASK_LEASE_TTL,
+                                 owner=self.request.id) as acquired:
+            if not acquired:
+                logger.info('task %s (%s, %s) is running, skipping',
+                            task_name, args, kwargs)
+                return None
+            return f(self, *args, **kwargs)
     return wrapped
 
 
@@ -74,24 +85,140 @@ def cancel_plugin_instance(plg_inst_id):
 def schedule_waiting_plugin_instances(self):  # task is passed info about itself
     """
     Schedule the apps corresponding to all plugin instances in 'waiting' DB status
-    and whom previous plugin instance is in 'finishedSuccessfully' DB status.
+    and whom previous plugin instance is in 'finishedSuccessfully' DB status. The next
+    instances are normally scheduled as soon as their previous instance finishes so
+    this is only a reconciliation sweep. The plugin instances queued for their compute
+    resource's capacity are also admitted if there is capacity left. The task stops
+    taking new batches once half of its lease's TTL has elapsed so that it doesn't
+    outlive its lease, the remaining instances are handled by the next run.
+    """
+    batch_size = settings.PLUGIN_INSTANCE_SCHEDULE_BATCH_SIZE
+    deadline = time.monotonic() + settings.TASK_LEASE_TTL / 2
+    while True:
+        plg_inst_ids = admit_queued_plugin_instances()
+        bulk_apply_async(run_plugin_instance, [(plg_inst_id,)
+                                               for plg_inst_id in plg_inst_ids])
+        if len(plg_inst_ids) < batch_size or time.monotonic() > deadline:
+            break
+    lookup = Q(previous__status='finishedSuccessfully')
+    while True:
+        n_claimed, plg_inst_ids = claim_waiting_plugin_instances(lookup, batch_size)
+        bulk_apply_async(run_plugin_instance, [(plg_inst_id,)
+                                               for plg_inst_id in plg_inst_ids])
+        if n_claimed < batch_size or time.monotonic() > deadline:
+            break
+
+
+def claim_waiting_plugin_instances(lookup, batch_size):
+    """
+    Atomically move a batch of plugin instances in 'waiting' DB status and matching
+    the lookup to 'queued' DB status and admit them on their compute resource. Return
+    a tuple with the number of claimed instances and the list of admitted instance
+    ids (now in 'scheduled' DB status). Rows that are locked by a concurrent claim are
+    skipped so an instance is never scheduled twice.
+    """
+    with transaction.atomic():
+        plg_inst_ids = list(PluginInstance.objects.select_for_update(
+            skip_locked=True, of=('self',)).filter(lookup, status='waiting').order_by(
+            'id').values_list('id', flat=True)[:batch_size])
+        if plg_inst_ids:
+            PluginInstance.objects.filter(id__in=plg_inst_ids, status='waiting').update(
+                status='queued', queued_date=timezone.now())
+        admitted_ids = admit_plugin_instances(plg_inst_ids)
+    return len(plg_inst_ids), admitted_ids
+
+
+def bulk_apply_async(task, args_list):
+    """
+    Send the messages for a batch of calls to an async task through a single broker
+    producer (connection).
+    """
+    if not args_list:
+        return
+    with task.app.producer_or_acquire() as producer:
+        for args in args_list:
+            task.apply_async(args, producer=producer)
+
+
+def get_status_poll_count(job_age):
+    """
+    Return the number of safety-net status checks that are due for a started plugin
+    instance given its job's age (in seconds). Young jobs are checked every
+    PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL seconds, then the interval between checks
+    grows with the job's age (by PLUGIN_INSTANCE_STATUS_POLL_AGE_FACTOR) until it reaches
+    PLUGIN_INSTANCE_STATUS_POLL_MAX_INTERVAL seconds.
+    """
+    min_interval = settings.PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL
+    max_interval = settings.PLUGIN_INSTANCE_STATUS_POLL_MAX_INTERVAL
+    age_factor = settings.PLUGIN_INSTANCE_STATUS_POLL_AGE_FACTOR
+    growth_age = min_interval / age_factor  # the interval grows from this age on
+    capped_age = max_interval / age_factor  # the interval is capped from this age on
+    if job_age < growth_age:
+        return int(job_age // min_interval)
+    count = int(growth_age // min_interval)
+    log_growth = math.log(1 + age_factor)
+    if job_age < capped_age:
+        return count + int(math.log(job_age / growth_age) / log_growth)
+    count += int(math.log(capped_age / growth_age) / log_growth) + 1
+    return count + int((job_age - capped_age) // max_interval)
+
+
+def is_status_poll_due(job_age, last_check_age):
+    """
+    Return whether a started plugin instance's status check became due since its last
+    status check. Both ages are the job's age (in seconds) at the time of the check
+    (the last check's age is 0 if the job's status was never checked) so a late or
+    missed polling tick can only delay a due check but never skip it.
     """
-    instances = PluginInstance.objects.filter(status='waiting',
-                                              previous__status='finishedSuccessfully')
-    for plg_inst in instances:
-        plg_inst.status = 'scheduled'
-        plg_inst.save()
-        run_plugin_instance.delay(plg_inst.id)  # call async task
+    return get_status_poll_count(job_age) > get_status_poll_count(last_check_age)
 
 
 @shared_task
 def check_started_plugin_instances_exec_status():
     """
-    Check the execution status of the apps corresponding to all the plugin instances
-    with 'started' DB status.
+    Check the execution status of the apps corresponding to the plugin instances with
+    'started' DB status whose status check is due. pfcon pushes job status changes to
+    the status callback endpoint so this is only a safety net for missed callbacks
+    and older jobs are checked less often. The due instances are grouped by compute
+    resource so that their status is checked in batches.
     """
-    instances = PluginInstance.objects.filter(status='started')
-    for plg_inst in instances:
+    now = timezone.now()
+    batch_size = settings.PLUGIN_INSTANCE_STATUS_CHECK_BATCH_SIZE
+    instances = PluginInstance.objects.filter(status='started').values_list(
+        'id', 'start_date', 'exec_start_date', 'last_status_check', 'compute_resource_id')
+    d_due_instances = defaultdict(list)
+    for (plg_inst_id, start_date, exec_start_date, last_status_check,
+         compute_resource_id) in instances:
+        # the job's age is measured from its submission to pfcon (start_date is the
+        # instance's creation, which can be long before for queued instances)
+        submission_date = exec_start_date or start_date
+        job_age = (now - submission_date).total_seconds()
+        last_check_age = 0
+        if last_status_check is not None:
+            last_check_age = (last_status_check - submission_date).total_seconds()
+        if is_status_poll_due(job_age, last_check_age):
+            d_due_instances[compute_resource_id].append(plg_inst_id)
+    for compute_resource_id, plg_inst_ids in d_due_instances.items():
+        for i in range(0, len(plg_inst_ids), batch_size):
+            batch_ids = plg_inst_ids[i:i + batch_size]
+            PluginInstance.objects.filter(id__in=batch_ids).update(last_status_check=now)
+            check_compute_resource_plugin_instances_exec_status.delay(
+                compute_resource_id, batch_ids)  # call async task
+
+
+@shared_task
+def check_compute_resource_plugin_instances_exec_status(compute_resource_id,
+                                                        plg_inst_ids):
+    """
+    Check the execution status of the apps corresponding to a batch of 'started'
+    plugin instances running on the same compute resource. A full status check is
+    only scheduled for the instances whose remote job is no longer running.
+    """
+    compute_resource = ComputeResource.objects.get(pk=compute_resource_id)
+    instances = PluginInstance.objects.filter(id__in=plg_inst_ids,
+                                              status='started').only('id', 'summary')
+    changed = check_plugin_instances_app_exec_status(compute_resource, instances)
+    for plg_inst in changed:
         check_plugin_instance_exec_status.delay(plg_inst.id)  # call async task
 
 
@@ -100,7 +227,8 @@ def cancel_waiting_plugin_instances():
     """
     Cancel the apps corresponding to all plugin instances in 'waiting' DB
     status when their previous plugin instance is in either 'finishedWithError' or
-    'cancelled' DB status.
+    'cancelled' DB status. The waiting descendants are normally cancelled as soon as
+    their ancestor fails so this is only a reconciliation sweep.
     """
     lookup = Q(previous__status='finishedWithError') | Q(previous__status='cancelled')
     PluginInstance.objects.filter(
@@ -108,6 +236,16 @@ def cancel_waiting_plugin_instances():
     ).filter(lookup).update(status='cancelled')
 
 
+@shared_task(bind=True)
+@skip_if_running
+def refresh_plugin_runtime_models(self):  # task is passed info about itself
+    """
+    Refresh the plugins' runtime models with the recently finished plugin instances.
+    """
+    n_updated = refresh_runtime_models()
+    logger.info('Updated %s plugin runtime models', n_updated)
+
+
 @shared_task  # toy task for testing celery stuff
 def sum(x, y):
     return x + y
@@ -0,0 +1,72 @@
+"""
+Benchmark of the plugin instance manager's output files registration. It is not
+collected with the tests and must be run separately:
+
+    python manage.py test plugininstances.tests.benchmark_manager
+"""
+
+import logging
+import time
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.db.utils import IntegrityError
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import PluginInstance, PluginInstanceFile
+from plugininstances.services import manager
+
+
+COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
+
+
+class PluginInstanceManagerBenchmark(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=COMPUTE_RESOURCE_URL)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='simplefsapp', type='fs')
+        (self.plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        self.plugin.compute_resources.set([compute_resource])
+        self.user = User.objects.create_user(username='foo', password='bar')
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_benchmark_mananger_register_output_files_throughput(self):
+        """
+        Benchmark the registration of 50k output files with one INSERT per row versus
+        the batched registration and report the rows/sec of each.
+        """
+        pl_inst = PluginInstance.objects.create(
+            plugin=self.plugin, owner=self.user, status='registeringFiles',
+            compute_resource=self.plugin.compute_resources.all()[0])
+        output_path = pl_inst.get_output_path()
+        n_files = 50000
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+
+        filenames = [f'{output_path}/row/file{i}.dcm' for i in range(n_files)]
+        start = time.perf_counter()
+        for obj_name in filenames:
+            plg_inst_file = PluginInstanceFile(plugin_inst=pl_inst)
+            plg_inst_file.fname.name = obj_name
+            try:
+                plg_inst_file.save()
+            except IntegrityError:
+                pass
+        row_rate = n_files / (time.perf_counter() - start)
+
+        filenames = [f'{output_path}/bulk/file{i}.dcm' for i in range(n_files)]
+        start = time.perf_counter()
+        plg_inst_manager._register_output_files(filenames)
+        bulk_rate = n_files / (time.perf_counter() - start)
+
+        print(f'\nRegistered {n_files} files: {row_rate:.0f} rows/sec one row per '
+              f'INSERT, {bulk_rate:.0f} rows/sec batched')
+        self.assertEqual(pl_inst.files.count(), 2 * n_files)
+        self.assertGreater(bulk_rate, row_rate)
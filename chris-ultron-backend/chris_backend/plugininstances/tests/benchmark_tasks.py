@@ -0,0 +1,41 @@
+"""
+Benchmark of the dispatch of the plugin instances in a pipeline run. It is not
+collected with the tests and must be run separately:
+
+    python manage.py test plugininstances.tests.benchmark_tasks
+"""
+
+from unittest import mock
+
+from core.celery import app as celery_app
+from plugininstances.models import PluginInstance, PluginInstanceLock
+
+from plugininstances import tasks
+from plugininstances.tests import test_tasks
+
+
+class PipelineDispatchBenchmark(test_tasks.PipelineTestCase):
+    """
+    Benchmark the end-to-end latency of a pipeline run against a fake pfcon.
+    """
+
+    def test_benchmark_pipeline_end_to_end_latency(self):
+        elapsed, beat_ticks = self.run_pipeline()
+        self.assertEqual(beat_ticks, 0)
+
+        # without the immediate dispatch each level waits for a beat tick
+        PluginInstance.objects.filter(id__in=self.pipeline_ids[1:]).update(
+            status='waiting')
+        PluginInstance.objects.filter(id=self.pipeline_ids[0]).update(
+            status='scheduled')
+        PluginInstanceLock.objects.all().delete()
+        with mock.patch.object(tasks.PluginInstanceManager,
+                               'dispatch_next_plugin_instances'):
+            elapsed_without_dispatch, beat_ticks = self.run_pipeline()
+        self.assertEqual(beat_ticks, 9)
+        # on average a waiting instance is idle for half the beat schedule period
+        idle_latency = beat_ticks * celery_app.conf.beat_schedule[
+            'schedule-waiting-plugin-instances-every-45-seconds']['schedule'] / 2
+        print(f'\n10-deep pipeline run time with immediate dispatch: {elapsed:.2f}s, '
+              f'without: {elapsed_without_dispatch:.2f}s + ~{idle_latency:.0f}s '
+              f'expected idle time waiting for {beat_ticks} beat ticks')
@@ -0,0 +1,150 @@
+"""
+Fake pfcon service for the tests. It serves the pfcon API from a local HTTP server
+thread and counts the requests and connections it receives.
+"""
+
+import io
+import json
+import re
+import threading
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class FakePfconRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for the fake pfcon service (supports HTTP keep-alive).
+    """
+    protocol_version = 'HTTP/1.1'
+    job_url_regex = re.compile(r'^/api/v1/(?P<job_id>[^/]+)/$')
+    job_file_url_regex = re.compile(r'^/api/v1/(?P<job_id>[^/]+)/file/$')
+    jid_field_regex = re.compile(rb'name="jid"\r\n\r\n(?P<job_id>[^\r]+)\r\n')
+    callback_url_field_regex = re.compile(
+        rb'name="status_callback_url"\r\n\r\n(?P<url>[^\r]+)\r\n')
+
+    def setup(self):
+        super(FakePfconRequestHandler, self).setup()
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        match = self.jid_field_regex.search(body)
+        job_id = match.group('job_id').decode('utf-8') if match else None
+        self.server.count_request('POST', job_id)
+        self.server.submit_job(job_id)
+        match = self.callback_url_field_regex.search(body)
+        if match:
+            self.server.jobs[job_id]['callback_url'] = match.group('url').decode('utf-8')
+        d_job = self.server.jobs[job_id]
+        self.send_json({'compute': {'jid': job_id, 'status': d_job['status']},
+                        'data': {'jid': job_id}}, 201)
+
+    def do_GET(self):
+        file_match = self.job_file_url_regex.match(self.path)
+        if file_match:
+            job_id = file_match.group('job_id')
+            self.server.count_request('GET_FILE', job_id)
+            body = self.server.get_job_zip_content(job_id)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        match = self.job_url_regex.match(self.path)
+        job_id = match.group('job_id') if match else None
+        self.server.count_request('GET', job_id)
+        if job_id not in self.server.jobs:
+            return self.send_json({'message': f'Job {job_id} not found'}, 404)
+        d_job = self.server.jobs[job_id]
+        self.send_json({'compute': {'jid': job_id, 'status': d_job['status'],
+                                    'logs': d_job['logs']}})
+
+    def do_DELETE(self):
+        match = self.job_url_regex.match(self.path)
+        job_id = match.group('job_id') if match else None
+        self.server.count_request('DELETE', job_id)
+        self.server.jobs.pop(job_id, None)
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_json(self, data, status_code=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # avoid cluttered console output
+
+
+class FakePfcon(ThreadingHTTPServer):
+    """
+    Fake pfcon service. Jobs are either set up by the tests through the set_job method
+    or submitted by CUBE, in which case they immediately get the submitted_job_status
+    and the job's output is a zip file with a single file. Status changes of the
+    submitted jobs are posted to their status callback URL (if any) with the
+    callback_auth credentials.
+    """
+    daemon_threads = True
+
+    def __init__(self, submitted_job_status='finishedSuccessfully', callback_auth=None):
+        super(FakePfcon, self).__init__(('127.0.0.1', 0), FakePfconRequestHandler)
+        self.submitted_job_status = submitted_job_status
+        self.callback_auth = callback_auth
+        self.url = f'http://127.0.0.1:{self.server_address[1]}/api/v1/'
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.request_counts = Counter()
+        self.connection_count = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def set_job(self, job_id, status='started', logs=''):
+        self.jobs[job_id] = {'status': status, 'logs': logs}
+
+    def submit_job(self, job_id):
+        with self.lock:
+            self.set_job(job_id, self.submitted_job_status)
+
+    def change_job_status(self, job_id, status):
+        """
+        Change a submitted job's status and post it to the job's status callback URL.
+        Return the callback's response.
+        """
+        d_job = self.jobs[job_id]
+        d_job['status'] = status
+        return requests.post(d_job['callback_url'],
+                             json={'jid': job_id, 'status': status},
+                             auth=self.callback_auth, timeout=30)
+
+    def get_job_zip_content(self, job_id):
+        memory_zip_file = io.BytesIO()
+        with zipfile.ZipFile(memory_zip_file, 'w', zipfile.ZIP_DEFLATED) as job_zip:
+            job_zip.writestr('out.txt', f'output of job {job_id}')
+        return memory_zip_file.getvalue()
+
+    def count_request(self, method, job_id):
+        with self.lock:
+            self.request_counts[method] += 1
+            self.request_counts[(method, job_id)] += 1
+
+    @property
+    def request_count(self):
+        return sum(v for k, v in self.request_counts.items() if isinstance(k, str))
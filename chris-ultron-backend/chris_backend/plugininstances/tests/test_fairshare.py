@@ -0,0 +1,68 @@
+
+import time
+from datetime import datetime, timedelta
+
+from django.test import TestCase, override_settings
+
+from plugininstances.services import fairshare
+
+
+class FairShareTests(TestCase):
+
+    def setUp(self):
+        self.epoch = datetime(2000, 1, 1)
+
+    def get_entries(self, users):
+        """
+        Get queued entries for a list of users in creation order.
+        """
+        return [(i, user, self.epoch + timedelta(seconds=i))
+                for i, user in enumerate(users)]
+
+    def test_order_fair_share_interleaves_users_by_weighted_usage(self):
+        """
+        Test whether order_fair_share admits the instances of the user with the
+        lowest weighted number of in-flight instances first.
+        """
+        entries = self.get_entries(['heavy'] * 4 + ['light'] * 2)
+        ordered = fairshare.order_fair_share(entries, {'heavy': 2}, {})
+        self.assertEqual(ordered, [4, 5, 0, 1, 2, 3])
+        ordered = fairshare.order_fair_share(entries, {'heavy': 2}, {'heavy': 4})
+        self.assertEqual(ordered, [0, 1, 4, 2, 3, 5])
+
+    def test_order_fair_share_starvation_guarantee(self):
+        """
+        Test whether the instances queued for longer than max_wait seconds are
+        admitted first regardless of their user's share.
+        """
+        entries = self.get_entries(['heavy'] * 3 + ['light'])
+        now = self.epoch + timedelta(seconds=101)
+        ordered = fairshare.order_fair_share(entries, {'heavy': 10}, {}, now,
+                                             max_wait=100)
+        self.assertEqual(ordered, [0, 3, 1, 2])
+
+    @override_settings(PLUGIN_INSTANCE_USER_PRIORITY_CLASSES={'radiology': 'clinical'})
+    def test_get_user_weight(self):
+        """
+        Test whether a user's weight is the weight of their priority class.
+        """
+        self.assertEqual(fairshare.get_user_weight('radiology'), 4)
+        self.assertEqual(fairshare.get_user_weight('foo'), 1)
+
+    def test_simulate_admission_mixed_workload_benchmark(self):
+        """
+        Test whether fair-share admission cuts the latency of the light users of a
+        mixed workload compared to FIFO without starving the heavy user.
+        """
+        jobs = fairshare.generate_mixed_workload(heavy_jobs=500, light_users=5,
+                                                 light_jobs=20)
+        start = time.time()
+        fifo = fairshare.get_latency_percentiles(
+            jobs, fairshare.simulate_admission(jobs, 10, 'fifo'))
+        fair = fairshare.get_latency_percentiles(
+            jobs, fairshare.simulate_admission(jobs, 10, 'fairshare', {'clinical': 4},
+                                               max_wait=3600))
+        self.assertLess(time.time() - start, 10)
+        for user in ('clinical', 'light1', 'light2', 'light3', 'light4'):
+            self.assertLess(fair[user][90] * 10, fifo[user][90])
+        self.assertLess(fair['heavy'][99], 3600 + 2 * 90)
@@ -0,0 +1,47 @@
+
+import logging
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.conf import settings
+
+from feeds.models import FeedJobStatusCount
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import PluginInstance
+from plugininstances.services import jobcounts
+
+
+COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
+
+
+class JobCountsTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=COMPUTE_RESOURCE_URL)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin.compute_resources.set([compute_resource])
+        user = User.objects.create_user(username='foo', password='bar')
+        self.plg_inst = PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                      compute_resource=compute_resource)
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_reconcile_feed_job_status_counts(self):
+        """
+        Test whether reconcile_feed_job_status_counts recomputes the job status
+        counters that drifted from the actual status of the plugin instances.
+        """
+        feed = self.plg_inst.feed
+        self.assertEqual(jobcounts.reconcile_feed_job_status_counts(), 0)
+        FeedJobStatusCount.objects.filter(feed=feed).delete()
+        FeedJobStatusCount.objects.create(feed=feed, status='started', count=3)
+        self.assertEqual(jobcounts.reconcile_feed_job_status_counts([feed.id]), 2)
+        counts = dict(feed.job_status_counts.values_list('status', 'count'))
+        self.assertEqual(counts, {'created': 1, 'started': 0})
@@ -3,22 +3,79 @@ import logging
 import os
 import io
 import time
+import zipfile
+import tracemalloc
 from unittest import mock
 
-from django.test import TestCase, tag
+from django.test import TestCase, tag, override_settings
 from django.contrib.auth.models import User
 from django.conf import settings
 
-from core.swiftmanager import SwiftManager
+from core.swiftmanager import SwiftManager, ClientException
 from plugins.models import PluginMeta, Plugin
 from plugins.models import PluginParameter
-from plugininstances.models import PluginInstance, PathParameter, ComputeResource
+from plugininstances.models import PluginInstance, PluginInstanceFile
+from plugininstances.models import PathParameter, ComputeResource
 from plugininstances.services import manager
+from plugininstances.services.pfcon_client import MultipartFileBody
 
 
 COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
 
 
+class FakeSwiftManager(object):
+    """
+    Local in-memory stand-in for the swift storage manager that can inject a fixed
+    latency into every request.
+    """
+
+    def __init__(self, objects, latency=0):
+        self.objects = objects
+        self.latency = latency
+        self.failing_objs = []
+        self.segmented_objs = {}
+
+    def _request(self, obj_path=None):
+        time.sleep(self.latency)
+        if obj_path in self.failing_objs:
+            raise ClientException('Object GET failed', http_status=500)
+
+    def ls(self, path, **kwargs):
+        self._request()
+        return sorted(name for name in self.objects if name.startswith(path))
+
+    def obj_exists(self, obj_path):
+        self._request()
+        return obj_path in self.objects
+
+    def copy_obj(self, obj_path, dest_path, **kwargs):
+        self._request(obj_path)
+        self.objects[dest_path] = self.objects[obj_path]
+
+    def upload_obj(self, swift_path, contents, **kwargs):
+        self._request(swift_path)
+        contents = contents.read() if hasattr(contents, 'read') else contents
+        self.objects[swift_path] = (contents.encode('utf-8') if isinstance(contents, str)
+                                    else contents)
+
+    def upload_segmented_obj(self, swift_path, file_obj, size, segment_size, **kwargs):
+        self._request(swift_path)
+        segments = []
+        while len(segments) * segment_size < size:
+            segments.append(file_obj.read(segment_size))
+        self.segmented_objs[swift_path] = segments
+        self.objects[swift_path] = b''.join(segments)
+
+    def download_obj(self, obj_path, **kwargs):
+        self._request(obj_path)
+        contents = self.objects[obj_path]
+        chunk_size = kwargs.get('resp_chunk_size')
+        if chunk_size is None:
+            return contents
+        view = memoryview(contents)
+        return (bytes(view[i:i + chunk_size]) for i in range(0, len(view), chunk_size))
+
+
 class PluginInstanceManagerTests(TestCase):
     
     def setUp(self):
@@ -114,6 +171,262 @@ class PluginInstanceManagerTests(TestCase):
             plg_inst_manager.get_job_status_summary.assert_called_once()
             json_zip2str_mock.assert_called_once()
 
+    @override_settings(JOB_ZIP_SPOOL_MAX_SIZE=1024 * 1024, SWIFT_OBJ_CHUNK_SIZE=64 * 1024)
+    def test_mananger_create_zip_file_streams_objects_into_spooled_file(self):
+        """
+        Test whether the manager's create_zip_file method streams the objects from
+        swift storage without holding the whole archive in memory.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='scheduled',
+            compute_resource=plugin.compute_resources.all()[0])
+        obj_size = 4 * 1024 * 1024
+        objects = {f'{self.username}/uploads/file{i}.dcm': os.urandom(obj_size)
+                   for i in range(8)}
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+        plg_inst_manager.swift_manager = FakeSwiftManager(objects)
+
+        tracemalloc.start()
+        try:
+            zip_file = plg_inst_manager.create_zip_file([f'{self.username}/uploads'])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # peak memory is bounded by the chunk and spool sizes rather than the archive
+        self.assertLess(peak, obj_size)
+        with zipfile.ZipFile(zip_file, 'r') as job_zip:
+            self.assertEqual(sorted(job_zip.namelist()),
+                             [f'file{i}.dcm' for i in range(8)])
+            self.assertEqual(job_zip.read('file3.dcm'),
+                             objects[f'{self.username}/uploads/file3.dcm'])
+        zip_file.close()
+
+    def test_mananger_create_zip_file_concurrent_fetch_is_faster_and_ordered(self):
+        """
+        Test whether the manager's create_zip_file method fetches objects concurrently
+        while preserving the archive ordering of the serial path.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='scheduled',
+            compute_resource=plugin.compute_resources.all()[0])
+        objects = {f'{self.username}/uploads/slice{i:03d}.dcm': b'slice%d' % i
+                   for i in range(40)}
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+        plg_inst_manager.swift_manager = FakeSwiftManager(objects, latency=0.02)
+
+        elapsed = {}
+        namelists = {}
+        for workers in (1, 8):
+            plg_inst_manager.data_transfer_workers = workers
+            start = time.perf_counter()
+            zip_file = plg_inst_manager.create_zip_file([f'{self.username}/uploads'])
+            elapsed[workers] = time.perf_counter() - start
+            with zipfile.ZipFile(zip_file, 'r') as job_zip:
+                namelists[workers] = job_zip.namelist()
+            zip_file.close()
+
+        self.assertEqual(namelists[1], namelists[8])
+        self.assertEqual(namelists[1], [f'slice{i:03d}.dcm' for i in range(40)])
+        self.assertLess(elapsed[8] * 3, elapsed[1])
+
+    def test_mananger_create_zip_file_concurrent_fetch_error_sets_code08(self):
+        """
+        Test whether the manager's create_zip_file method sets error code CODE08 when
+        an object download fails during a concurrent fetch.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='scheduled',
+            compute_resource=plugin.compute_resources.all()[0])
+        objects = {f'{self.username}/uploads/slice{i}.dcm': b'data' for i in range(10)}
+        fake_swift_manager = FakeSwiftManager(objects)
+        fake_swift_manager.failing_objs = [f'{self.username}/uploads/slice5.dcm']
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+        plg_inst_manager.swift_manager = fake_swift_manager
+        plg_inst_manager.data_transfer_workers = 4
+
+        with self.assertRaises(ClientException):
+            plg_inst_manager.create_zip_file([f'{self.username}/uploads'])
+        self.assertEqual(pl_inst.error_code, 'CODE08')
+
+    def test_mananger_copy_objs_concurrently_preserves_order_and_sets_code09(self):
+        """
+        Test whether the manager's _copy_objs method returns the destination paths in
+        order and sets error code CODE09 when a copy fails.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='scheduled',
+            compute_resource=plugin.compute_resources.all()[0])
+        objects = {f'src/file{i}.txt': b'data' for i in range(10)}
+        fake_swift_manager = FakeSwiftManager(objects)
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+        plg_inst_manager.swift_manager = fake_swift_manager
+        plg_inst_manager.data_transfer_workers = 4
+        obj_copy_list = [(f'src/file{i}.txt', f'dst/file{i}.txt') for i in range(10)]
+
+        dest_paths = plg_inst_manager._copy_objs(obj_copy_list)
+        self.assertEqual(dest_paths, [f'dst/file{i}.txt' for i in range(10)])
+        self.assertTrue(all(path in objects for path in dest_paths))
+
+        fake_swift_manager.failing_objs = ['src/file3.txt']
+        obj_copy_list = [(f'src/file{i}.txt', f'new/file{i}.txt') for i in range(10)]
+        with self.assertRaises(ClientException):
+            plg_inst_manager._copy_objs(obj_copy_list)
+        self.assertEqual(pl_inst.error_code, 'CODE09')
+
+    def test_mananger_get_previous_output_path_gives_up_with_code11(self):
+        """
+        Test whether the manager's get_previous_output_path method waits for the
+        previous instance's output files using the eventual consistency retry policy
+        and sets error code CODE11 when it gives up.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        previous = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='finishedSuccessfully',
+            compute_resource=plugin.compute_resources.all()[0])
+        PluginInstanceFile.objects.create(
+            plugin_inst=previous, fname=previous.get_output_path() + '/out.txt')
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='mri_convert', type='ds')
+        (plugin_ds, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin_ds, owner=user, previous=previous, status='scheduled',
+            compute_resource=plugin.compute_resources.all()[0])
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+        fake_swift_manager = FakeSwiftManager({})
+        plg_inst_manager.swift_manager = fake_swift_manager
+
+        policy = manager.RetryPolicy(max_attempts=3)
+        with mock.patch.object(manager, 'eventual_consistency_policy', policy), \
+                mock.patch.object(policy, 'get_delay', return_value=0), \
+                mock.patch.object(fake_swift_manager, 'ls',
+                                  wraps=fake_swift_manager.ls) as ls_mock:
+            with self.assertRaises(NameError):
+                plg_inst_manager.get_previous_output_path()
+        self.assertEqual(pl_inst.error_code, 'CODE11')
+        self.assertEqual(policy.get_stats()['retries'], 2)
+        self.assertEqual(policy.get_stats()['give_ups'], 1)
+        # a single listing request per attempt (the listing itself is not retried)
+        self.assertEqual(ls_mock.call_count, 3)
+        for ls_call in ls_mock.call_args_list:
+            self.assertEqual(ls_call[1], {'retry': False})
+
+        plg_inst_manager.swift_manager.objects[previous.get_output_path() +
+                                               '/out.txt'] = b'data'
+        self.assertEqual(plg_inst_manager.get_previous_output_path(),
+                         previous.get_output_path())
+
+    @override_settings(FILE_REGISTRATION_BATCH_SIZE=100)
+    def test_mananger_register_output_files_in_batches(self):
+        """
+        Test whether the manager's _register_output_files method registers files in
+        batches and ignores files that are already registered.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='registeringFiles',
+            compute_resource=plugin.compute_resources.all()[0])
+        output_path = pl_inst.get_output_path()
+        filenames = [f'{output_path}/file{i}.txt' for i in range(250)]
+        PluginInstanceFile.objects.create(plugin_inst=pl_inst, fname=filenames[10])
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+
+        # 3 batches with at most a savepoint, an insert and a release each
+        with self.assertNumQueries(9):
+            plg_inst_manager._register_output_files(filenames)
+        self.assertEqual(pl_inst.files.count(), 250)
+        self.assertEqual(set(f.fname.name for f in pl_inst.files.all()), set(filenames))
+
+    @override_settings(SWIFT_OBJ_SEGMENT_SIZE=1024)
+    def test_mananger_unpack_zip_file_streams_members_into_swift(self):
+        """
+        Test whether the manager's unpack_zip_file method streams each member of the
+        job zip file into swift storage (segmenting large members) and registers the
+        uploaded files.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='registeringFiles',
+            compute_resource=plugin.compute_resources.all()[0])
+        members = {f'out/file{i}.txt': os.urandom(100) for i in range(6)}
+        members['out/large.nii'] = os.urandom(2500)
+        zip_file = io.BytesIO()
+        with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as job_zip:
+            for fname, content in members.items():
+                job_zip.writestr(fname, content)
+        zip_file.seek(0)
+        fake_swift_manager = FakeSwiftManager({})
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+        plg_inst_manager.swift_manager = fake_swift_manager
+        plg_inst_manager.data_transfer_workers = 4
+
+        plg_inst_manager.unpack_zip_file(zip_file)
+
+        output_path = pl_inst.get_output_path()
+        for fname, content in members.items():
+            self.assertEqual(fake_swift_manager.objects[f'{output_path}/{fname}'],
+                             content)
+        self.assertEqual(list(fake_swift_manager.segmented_objs),
+                         [f'{output_path}/out/large.nii'])
+        self.assertEqual(
+            len(fake_swift_manager.segmented_objs[f'{output_path}/out/large.nii']), 3)
+        self.assertEqual(pl_inst.files.count(), len(members))
+
+    def test_mananger_unpack_zip_file_upload_error_sets_code07(self):
+        """
+        Test whether the manager's unpack_zip_file method sets error code CODE07 when
+        an upload to swift storage fails.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='registeringFiles',
+            compute_resource=plugin.compute_resources.all()[0])
+        zip_file = io.BytesIO()
+        with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as job_zip:
+            for i in range(4):
+                job_zip.writestr(f'file{i}.txt', b'data')
+        fake_swift_manager = FakeSwiftManager({})
+        fake_swift_manager.failing_objs = [pl_inst.get_output_path() + '/file2.txt']
+        plg_inst_manager = manager.PluginInstanceManager(pl_inst)
+        plg_inst_manager.swift_manager = fake_swift_manager
+
+        with self.assertRaises(ClientException):
+            plg_inst_manager.unpack_zip_file(zip_file.getvalue())
+        self.assertEqual(pl_inst.error_code, 'CODE07')
+        self.assertEqual(pl_inst.files.count(), 0)
+
+    def test_multipart_file_body_streams_file_between_form_fields(self):
+        """
+        Test whether the multipart body streams the file content between the encoded
+        form fields and reports the total body length.
+        """
+        data_file = io.BytesIO(b'zip content')
+        body = MultipartFileBody({'jid': 'chris-jid-1', 'gpu_limit': 0, 'x': None},
+                                 'data_file', data_file)
+        content = b''
+        chunk = body.read(5)
+        while chunk:
+            content += chunk
+            chunk = body.read(5)
+        self.assertEqual(len(content), body.len)
+        self.assertIn(b'name="jid"\r\n\r\nchris-jid-1\r\n', content)
+        self.assertIn(b'name="gpu_limit"\r\n\r\n0\r\n', content)
+        self.assertNotIn(b'name="x"', content)
+        self.assertIn(b'filename="data_file"', content)
+        self.assertIn(b'\r\n\r\nzip content\r\n', content)
+        self.assertTrue(content.endswith(f'--{body.boundary}--\r\n'.encode()))
+
     def test_mananger_can_check_plugin_instance_app_exec_status(self):
         """
         Test whether the manager can check a plugin's app execution status
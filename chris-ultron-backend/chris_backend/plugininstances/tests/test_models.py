@@ -4,6 +4,8 @@ import os
 from unittest import mock
 
 from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth.models import User
 from django.conf import settings
 
@@ -149,6 +151,33 @@ class PluginInstanceModelTests(ModelTests):
         self.assertEqual(decend_instances[1], plg_inst1)
         self.assertEqual(decend_instances[2], plg_inst2)
 
+    def test_get_descendant_instances_single_query(self):
+        """
+        Test whether custom get_descendant_instances method walks a branching tree of
+        plugin instances with a single DB query.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        compute_resource = plugin.compute_resources.all()[0]
+        plg_inst_root = PluginInstance.objects.create(
+            plugin=plugin, owner=user, compute_resource=compute_resource)
+        plugin = Plugin.objects.get(meta__name=self.plugin_ds_name)
+        level = [plg_inst_root]
+        for depth in range(3):
+            level = [PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                   previous=previous,
+                                                   compute_resource=compute_resource)
+                     for previous in level for _ in range(2)]
+        other_root = PluginInstance.objects.create(
+            plugin=Plugin.objects.get(meta__name=self.plugin_fs_name), owner=user,
+            compute_resource=compute_resource)
+        with self.assertNumQueries(1):
+            descendant_ids = list(plg_inst_root.get_descendant_instances().values_list(
+                'id', flat=True))
+        self.assertEqual(len(descendant_ids), 1 + 2 + 4 + 8)
+        self.assertEqual(descendant_ids[0], plg_inst_root.id)
+        self.assertNotIn(other_root.id, descendant_ids)
+
     def test_get_output_path(self):
         """
         Test whether custom get_output_path method returns appropriate output paths
@@ -183,6 +212,57 @@ class PluginInstanceModelTests(ModelTests):
                                                             pl_inst_ds.id))
         self.assertEqual(pl_inst_ds.get_output_path(), ds_output_path)
 
+    def test_status_changes_update_feed_job_status_counts(self):
+        """
+        Test whether creating plugin instances and changing their status through save
+        and bulk updates keep the feed's job status counters in sync.
+        """
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        plugin_ds = Plugin.objects.get(meta__name=self.plugin_ds_name)
+        plg_inst_root = PluginInstance.objects.create(
+            plugin=plugin_fs, owner=user, compute_resource=self.compute_resource)
+        for _ in range(2):
+            PluginInstance.objects.create(plugin=plugin_ds, owner=user,
+                                          previous=plg_inst_root, status='waiting',
+                                          compute_resource=self.compute_resource)
+        feed = plg_inst_root.feed
+        plg_inst_root.status = 'finishedSuccessfully'
+        plg_inst_root.save()
+        plg_inst_root.get_descendant_instances().filter(status='waiting').update(
+            status='cancelled')
+        counts = dict(feed.job_status_counts.exclude(count=0).values_list('status',
+                                                                          'count'))
+        self.assertEqual(counts, {'cancelled': 2, 'finishedSuccessfully': 1})
+        feed = Feed.objects.with_jobs_status_count().get(pk=feed.pk)
+        self.assertEqual(feed.jobs_cancelled, 2)
+        self.assertEqual(feed.jobs_started, 0)
+
+
+    def test_save_reads_previous_status_only_when_status_changed(self):
+        """
+        Test whether saving a plugin instance loaded from the DB only reads its
+        previous status from the DB when its status changed.
+        """
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        plg_inst = PluginInstance.objects.create(
+            plugin=plugin_fs, owner=user, compute_resource=self.compute_resource,
+            status='started')
+        plg_inst = PluginInstance.objects.get(pk=plg_inst.pk)
+        plg_inst.summary = 'running'
+        with CaptureQueriesContext(connection) as ctx:
+            plg_inst.save()
+        self.assertFalse([q for q in ctx.captured_queries
+                          if q['sql'].startswith('SELECT') and '"status"' in q['sql']])
+        plg_inst.status = 'finishedSuccessfully'
+        with CaptureQueriesContext(connection) as ctx:
+            plg_inst.save()
+        self.assertTrue([q for q in ctx.captured_queries
+                         if q['sql'].startswith('SELECT') and '"status"' in q['sql']])
+        counts = dict(plg_inst.feed.job_status_counts.exclude(count=0).values_list(
+            'status', 'count'))
+        self.assertEqual(counts, {'finishedSuccessfully': 1})
 
 class PluginInstanceFilterModelTests(ModelTests):
 
@@ -214,3 +294,6 @@ class PluginInstanceFilterModelTests(ModelTests):
         self.assertEqual(len(filtered_queryset), 2)
         self.assertEqual(filtered_queryset[0], plg_inst1)
         self.assertEqual(filtered_queryset[1], plg_inst2)
+        # the result is a queryset that further filters push down to the DB
+        self.assertEqual(list(filtered_queryset.filter(previous=plg_inst1)), [plg_inst2])
+        self.assertEqual(filter.filter_by_root_id(queryset, "", "foo").count(), 0)
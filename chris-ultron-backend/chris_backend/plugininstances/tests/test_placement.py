@@ -0,0 +1,91 @@
+
+import logging
+
+from django.test import TestCase
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import PluginRuntimeModel
+from plugininstances.services import placement
+
+
+class PlacementTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='mri_convert', type='ds')
+        (self.plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1',
+                                                         min_cpu_limit=2000,
+                                                         min_memory_limit=1000,
+                                                         min_gpu_limit=0,
+                                                         min_number_of_workers=1)
+        self.small = ComputeResource.objects.create(
+            name='small', compute_url='http://small/api/v1/', cpus=1000,
+            cpu_clock_speed_ghz=2.0, memory=500, workers=1, cost=0)
+        self.free = ComputeResource.objects.create(
+            name='free', compute_url='http://free/api/v1/', cpus=4000,
+            cpu_clock_speed_ghz=2.0, memory=4000, workers=1, cost=0)
+        self.fast = ComputeResource.objects.create(
+            name='fast', compute_url='http://fast/api/v1/', cpus=16000,
+            cpu_clock_speed_ghz=3.0, memory=16000, workers=4, cost=10)
+        self.auto_free = ComputeResource.objects.create(
+            name='auto_free', compute_url='http://auto/api/v1/')
+        self.plugin.compute_resources.set([self.small, self.free, self.fast,
+                                           self.auto_free])
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_check_plugin_compute_resources(self):
+        """
+        Test whether check_plugin_compute_resources returns the fit and the unmet
+        requirement messages for each compute resource.
+        """
+        matching = placement.check_plugin_compute_resources(
+            self.plugin, [self.small, self.free])
+        self.assertEqual(matching[1], {'free': {'fit': True}})
+        self.assertFalse(matching[0]['small']['fit'])
+        self.assertEqual(matching[0]['small']['message'],
+                         ["2000 milli-core CPU's, but 1000 milli-core CPUs available.",
+                          "1000 MB's memory, but 500 MB's available."])
+
+    def test_select_compute_resource_picks_fastest_within_budget(self):
+        """
+        Test whether select_compute_resource picks the fastest fitting compute
+        resource whose cost is within budget with a DB query for the compute resources
+        and another one for the runtime models.
+        """
+        plugin = Plugin.objects.get(id=self.plugin.id)
+        with self.assertNumQueries(2):
+            compute_resource, matching = placement.select_compute_resource(plugin,
+                                                                           1000000)
+        self.assertEqual(compute_resource, self.fast)
+        self.assertEqual(len(matching), 3)  # auto options are not checked
+        compute_resource, matching = placement.select_compute_resource(plugin, 0)
+        self.assertEqual(compute_resource, self.free)
+
+    def test_select_compute_resource_returns_none_if_no_fit(self):
+        """
+        Test whether select_compute_resource returns None when no compute resource
+        meets the plugin's requirements.
+        """
+        self.plugin.compute_resources.set([self.small, self.auto_free])
+        compute_resource, matching = placement.select_compute_resource(self.plugin, 0)
+        self.assertIsNone(compute_resource)
+        self.assertEqual(list(matching[0].keys()), ['small'])
+
+    def test_select_compute_resource_uses_runtime_models(self):
+        """
+        Test whether select_compute_resource prefers the runtimes learned from the
+        plugin's finished instances over the heuristic estimate.
+        """
+        for cr, runtime in ((self.fast, 100), (self.free, 10)):
+            runtime_model = PluginRuntimeModel(plugin=self.plugin, compute_resource=cr)
+            for i in range(3):
+                runtime_model.add_sample(i, runtime)
+            runtime_model.save()
+        compute_resource, matching = placement.select_compute_resource(self.plugin,
+                                                                       1000000)
+        self.assertEqual(compute_resource, self.free)
@@ -0,0 +1,123 @@
+
+import logging
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.utils import timezone
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import (PluginInstance, PluginInstanceFile,
+                                    PluginRuntimeModel)
+from plugininstances.services import runtime
+
+
+COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
+
+
+class RuntimeModelTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        (self.compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=COMPUTE_RESOURCE_URL)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (self.plugin_fs, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        self.plugin_fs.compute_resources.set([self.compute_resource])
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='mri_convert', type='ds')
+        (self.plugin_ds, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        self.plugin_ds.compute_resources.set([self.compute_resource])
+        self.user = User.objects.create_user(username='foo', password='bar')
+        self.now = timezone.now()
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def create_finished_instance(self, n_input_files, runtime, ended_ago,
+                                 waited=60):
+        """
+        Create a finished ds plugin instance whose previous instance has n_input_files
+        output files. The instance was created waited seconds before its job was
+        submitted.
+        """
+        previous = PluginInstance.objects.create(plugin=self.plugin_fs, owner=self.user,
+                                                 compute_resource=self.compute_resource)
+        for i in range(n_input_files):
+            PluginInstanceFile.objects.create(plugin_inst=previous,
+                                              fname=f'foo/{previous.id}/{i}.txt')
+        plg_inst = PluginInstance.objects.create(plugin=self.plugin_ds, owner=self.user,
+                                                 previous=previous,
+                                                 compute_resource=self.compute_resource)
+        end_date = self.now - timedelta(seconds=ended_ago)
+        exec_start_date = end_date - timedelta(seconds=runtime)
+        PluginInstance.objects.filter(id=plg_inst.id).update(
+            status='finishedSuccessfully', end_date=end_date,
+            exec_start_date=exec_start_date,
+            start_date=exec_start_date - timedelta(seconds=waited))
+        return plg_inst
+
+    def test_get_runtime_samples_measures_execution_time(self):
+        """
+        Test whether the runtime samples exclude the time the instances waited before
+        their job was submitted and skip the instances without a submission date.
+        """
+        self.create_finished_instance(1, 15, ended_ago=3600, waited=600)
+        plg_inst = self.create_finished_instance(2, 20, ended_ago=1800)
+        PluginInstance.objects.filter(id=plg_inst.id).update(exec_start_date=None)
+        samples = list(runtime.get_runtime_samples())
+        self.assertEqual(samples, [(self.plugin_ds.id, self.compute_resource.id, 1, 15)])
+
+    def test_predict_fits_runtime_as_a_function_of_the_input_files(self):
+        """
+        Test whether a runtime model fits a linear function of the number of input
+        files and falls back to the mean runtime when the number is unknown.
+        """
+        runtime_model = PluginRuntimeModel(plugin=self.plugin_ds,
+                                           compute_resource=self.compute_resource)
+        self.assertIsNone(runtime_model.predict(1))
+        for n_input_files in (1, 2, 3):
+            runtime_model.add_sample(n_input_files, 10 + 5 * n_input_files)
+        self.assertAlmostEqual(runtime_model.predict(10), 60)
+        self.assertAlmostEqual(runtime_model.predict(), 20)
+
+    def test_refresh_runtime_models_is_incremental(self):
+        """
+        Test whether refresh_runtime_models only adds the instances that finished since
+        the last refresh and leaves the most recent ones for the next refresh.
+        """
+        self.create_finished_instance(1, 15, ended_ago=3600)
+        self.create_finished_instance(2, 20, ended_ago=1800)
+        self.create_finished_instance(3, 25, ended_ago=1)  # within the refresh lag
+        self.assertEqual(runtime.refresh_runtime_models(), 1)
+        runtime_model = PluginRuntimeModel.objects.get(plugin=self.plugin_ds)
+        self.assertEqual(runtime_model.n_samples, 2)
+        self.assertEqual(runtime_model.sum_x, 3)
+        self.assertEqual(runtime_model.sum_y, 35)
+
+        with mock.patch.object(runtime.timezone, 'now',
+                               return_value=self.now + timedelta(seconds=3600)):
+            self.assertEqual(runtime.refresh_runtime_models(), 1)
+            self.assertEqual(runtime.refresh_runtime_models(), 0)
+        runtime_model.refresh_from_db()
+        self.assertEqual(runtime_model.n_samples, 3)
+        self.assertAlmostEqual(runtime_model.predict(4), 30)
+
+    def test_evaluate_runtime_models(self):
+        """
+        Test whether evaluate_runtime_models tests the models on the most recent
+        instances and reports the model and baseline prediction errors.
+        """
+        for i, n_input_files in enumerate((1, 2, 3, 4, 5)):
+            self.create_finished_instance(n_input_files, 10 + 5 * n_input_files,
+                                          ended_ago=3600 - i)
+        result = runtime.evaluate_runtime_models(test_fraction=0.2)
+        self.assertEqual(result['train_samples'], 4)
+        self.assertEqual(result['test_samples'], 1)
+        self.assertEqual(result['uncovered_test_samples'], 0)
+        self.assertAlmostEqual(result['model']['mae'], 0)
+        self.assertAlmostEqual(result['baseline']['mae'], 35 - 22.5)
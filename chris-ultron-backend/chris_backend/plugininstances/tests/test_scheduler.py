@@ -0,0 +1,153 @@
+
+import logging
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth.models import User
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import PluginInstance
+from plugininstances.services import scheduler
+
+
+class SchedulerTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        self.small = ComputeResource.objects.create(
+            name='small', compute_url='http://small/api/v1/', cpus=2000, memory=4000)
+        self.large = ComputeResource.objects.create(
+            name='large', compute_url='http://large/api/v1/', cpus=8000, memory=16000)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (self.plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1',
+                                                         min_cpu_limit=1000,
+                                                         min_memory_limit=1000)
+        self.plugin.compute_resources.set([self.small, self.large])
+        self.user = User.objects.create_user(username='foo', password='bar')
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def create_instances(self, n, compute_resource, status='queued', cpu_limit=1000):
+        """
+        Create n plugin instances with the given status on a compute resource.
+        """
+        return [PluginInstance.objects.create(plugin=self.plugin, owner=self.user,
+                                              compute_resource=compute_resource,
+                                              cpu_limit=cpu_limit, status=status).id
+                for _ in range(n)]
+
+    def test_admit_plugin_instances_respects_capacity(self):
+        """
+        Test whether admit_plugin_instances only admits the queued plugin instances
+        whose limits fit in what is left of their compute resource's capacity.
+        """
+        self.create_instances(1, self.small, status='started')
+        plg_inst_ids = self.create_instances(2, self.small)
+        self.assertEqual(scheduler.admit_plugin_instances(plg_inst_ids),
+                         plg_inst_ids[:1])
+        statuses = PluginInstance.objects.filter(id__in=plg_inst_ids).order_by(
+            'id').values_list('status', flat=True)
+        self.assertEqual(list(statuses), ['scheduled', 'queued'])
+
+    def test_admit_plugin_instances_with_unlimited_capacity(self):
+        """
+        Test whether a compute resource without a registered capacity admits all the
+        queued plugin instances and an idle compute resource admits an instance that
+        is larger than its capacity.
+        """
+        self.small.cpus = 0
+        self.small.save()
+        plg_inst_ids = self.create_instances(3, self.small)
+        self.assertEqual(scheduler.admit_plugin_instances(plg_inst_ids), plg_inst_ids)
+        plg_inst_ids = self.create_instances(1, self.large, cpu_limit=10000)
+        self.assertEqual(scheduler.admit_plugin_instances(plg_inst_ids), plg_inst_ids)
+
+    @override_settings(PLUGIN_INSTANCE_SPILLOVER=True)
+    def test_admit_plugin_instances_spills_over(self):
+        """
+        Test whether a plugin instance queued on a saturated compute resource is moved
+        to another compute resource registered with its plugin.
+        """
+        self.create_instances(2, self.small, status='started')
+        plg_inst_ids = self.create_instances(1, self.small)
+        self.assertEqual(scheduler.admit_plugin_instances(plg_inst_ids), plg_inst_ids)
+        plg_inst = PluginInstance.objects.get(id=plg_inst_ids[0])
+        self.assertEqual(plg_inst.status, 'scheduled')
+        self.assertEqual(plg_inst.compute_resource, self.large)
+
+    def test_admit_plugin_instances_in_fair_share_order(self):
+        """
+        Test whether the queued instance of a user with fewer in-flight instances is
+        admitted before the older queued instance of a user with more.
+        """
+        light_user = User.objects.create_user(username='light', password='bar')
+        self.create_instances(1, self.small, status='started')
+        plg_inst_ids = self.create_instances(1, self.small)
+        light_plg_inst = PluginInstance.objects.create(
+            plugin=self.plugin, owner=light_user, compute_resource=self.small,
+            cpu_limit=1000, status='queued')
+        self.assertEqual(scheduler.admit_queued_plugin_instances(self.small.id),
+                         [light_plg_inst.id])
+        self.assertEqual(PluginInstance.objects.get(id=plg_inst_ids[0]).status,
+                         'queued')
+
+    @override_settings(PLUGIN_INSTANCE_MAX_QUEUE_WAIT=3600)
+    def test_admit_plugin_instances_measures_queue_wait_from_queued_date(self):
+        """
+        Test whether an instance that waited for its previous instance before being
+        queued is not admitted first as starved while one queued for longer than the
+        max queue wait is.
+        """
+        light_user = User.objects.create_user(username='light', password='bar')
+        self.create_instances(1, self.small, status='started')
+        now = timezone.now()
+        plg_inst_ids = self.create_instances(1, self.small)
+        # created two hours ago but only queued now
+        PluginInstance.objects.filter(id=plg_inst_ids[0]).update(
+            start_date=now - timedelta(hours=2), queued_date=now)
+        light_plg_inst = PluginInstance.objects.create(
+            plugin=self.plugin, owner=light_user, compute_resource=self.small,
+            cpu_limit=1000, status='queued', queued_date=now)
+        self.assertEqual(scheduler.admit_queued_plugin_instances(self.small.id),
+                         [light_plg_inst.id])
+
+        PluginInstance.objects.filter(id=light_plg_inst.id).update(status='cancelled')
+        light_plg_inst = PluginInstance.objects.create(
+            plugin=self.plugin, owner=light_user, compute_resource=self.small,
+            cpu_limit=1000, status='queued', queued_date=now)
+        # queued for two hours
+        PluginInstance.objects.filter(id=plg_inst_ids[0]).update(
+            queued_date=now - timedelta(hours=2))
+        self.assertEqual(scheduler.admit_queued_plugin_instances(self.small.id),
+                         plg_inst_ids)
+
+    def test_admit_queued_plugin_instances_after_release(self):
+        """
+        Test whether the queued plugin instances are admitted once an in-flight
+        instance of their compute resource finishes.
+        """
+        started_ids = self.create_instances(2, self.small, status='started')
+        plg_inst_ids = self.create_instances(2, self.small)
+        self.assertEqual(scheduler.admit_queued_plugin_instances(self.small.id), [])
+        PluginInstance.objects.filter(id=started_ids[0]).update(
+            status='finishedSuccessfully')
+        self.assertEqual(scheduler.admit_queued_plugin_instances(self.small.id),
+                         plg_inst_ids[:1])
+
+    def test_get_compute_resources_utilization(self):
+        """
+        Test whether get_compute_resources_utilization annotates the compute resources
+        with their reserved resources and queue depth.
+        """
+        self.create_instances(2, self.small, status='started')
+        self.create_instances(3, self.small)
+        small = scheduler.get_compute_resources_utilization().get(id=self.small.id)
+        self.assertEqual(small.reserved_cpus, 2000)
+        self.assertEqual(small.reserved_memory, 2000)
+        self.assertEqual(small.running_jobs, 2)
+        self.assertEqual(small.queued_jobs, 3)
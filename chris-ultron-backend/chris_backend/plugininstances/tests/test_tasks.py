@@ -1,15 +1,26 @@
 
 import logging
+import time
+from datetime import timedelta
 from unittest import mock, skip
 
-from django.test import TestCase, tag
+from django.test import (TestCase, TransactionTestCase, LiveServerTestCase, tag,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
 
+from core.celery import app as celery_app
+from core.leases import lease_manager
+from core.models import TaskLease
 from plugins.models import PluginMeta, Plugin, ComputeResource
 from plugininstances.models import PluginInstance
 
-from plugininstances import tasks
+from plugininstances import tasks, views
+from plugininstances.tests.fake_pfcon import FakePfcon
+from plugininstances.tests.test_manager import FakeSwiftManager
 
 
 COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
@@ -69,6 +80,16 @@ class PluginInstanceTasksTests(TasksTests):
             tasks.run_plugin_instance(self.plg_inst.id)
             run_mock.assert_called_with()
 
+    def test_task_check_plugin_instance_exec_status_no_op_is_lightweight(self):
+        self.plg_inst.status = 'finishedSuccessfully'
+        self.plg_inst.save()
+        # the only DB query is the one fetching the plugin instance
+        with self.assertNumQueries(1), \
+                mock.patch.object(tasks.PluginInstanceManager, 'pfcon_client',
+                                  new_callable=mock.PropertyMock) as pfcon_client_mock:
+            tasks.check_plugin_instance_exec_status(self.plg_inst.id)
+            pfcon_client_mock.assert_not_called()
+
     def test_task_check_plugin_instance_exec_status(self):
         with mock.patch.object(tasks.PluginInstanceManager,
                                'check_plugin_instance_app_exec_status',
@@ -77,10 +98,401 @@ class PluginInstanceTasksTests(TasksTests):
             check_exec_status_mock.assert_called_with()
 
     def test_task_check_started_plugin_instances_exec_status(self):
-        with mock.patch.object(tasks.check_plugin_instance_exec_status, 'delay',
-                               return_value=None) as delay_mock:
+        # the job's first safety-net status check is due
+        now = self.plg_inst.start_date + timedelta(
+            seconds=settings.PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL)
+        with mock.patch.object(tasks.timezone, 'now', return_value=now), \
+                mock.patch.object(
+                    tasks.check_compute_resource_plugin_instances_exec_status, 'delay',
+                    return_value=None) as delay_mock:
             tasks.check_started_plugin_instances_exec_status()
 
-            # check that the check_plugin_instance_exec_status task was called with appropriate args
-            delay_mock.assert_called_with(self.plg_inst.id)
+            # check that the check_compute_resource_plugin_instances_exec_status task was
+            # called with appropriate args
+            delay_mock.assert_called_with(self.compute_resource.id, [self.plg_inst.id])
             self.assertEqual(self.plg_inst.status, 'started')
+
+    @override_settings(PLUGIN_INSTANCE_STATUS_CHECK_BATCH_SIZE=2)
+    def test_task_check_started_plugin_instances_exec_status_groups_by_compute_resource(
+            self):
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="moc", compute_url=COMPUTE_RESOURCE_URL)
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name="pacspull")
+        plugin.compute_resources.add(compute_resource)
+        d_inst_ids = {self.compute_resource.id: [self.plg_inst.id],
+                      compute_resource.id: []}
+        for i in range(3):
+            plg_inst = PluginInstance.objects.create(
+                plugin=plugin, owner=user, compute_resource=compute_resource,
+                status='started')
+            d_inst_ids[compute_resource.id].append(plg_inst.id)
+        now = self.plg_inst.start_date + timedelta(
+            seconds=settings.PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL + 10)
+        with mock.patch.object(tasks.timezone, 'now', return_value=now), \
+                mock.patch.object(
+                    tasks.check_compute_resource_plugin_instances_exec_status, 'delay',
+                    return_value=None) as delay_mock:
+            tasks.check_started_plugin_instances_exec_status()
+            calls = [c[0] for c in delay_mock.call_args_list]
+            self.assertEqual(len(calls), 3)  # batches of at most 2 instances
+            for compute_resource_id, plg_inst_ids in d_inst_ids.items():
+                batched_ids = [inst_id for cr_id, inst_ids in calls
+                               for inst_id in inst_ids if cr_id == compute_resource_id]
+                self.assertEqual(sorted(batched_ids), sorted(plg_inst_ids))
+
+    @override_settings(PLUGIN_INSTANCE_STATUS_POLL_PERIOD=30,
+                       PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL=120,
+                       PLUGIN_INSTANCE_STATUS_POLL_MAX_INTERVAL=1800,
+                       PLUGIN_INSTANCE_STATUS_POLL_AGE_FACTOR=0.1)
+    def test_task_check_started_plugin_instances_exec_status_adaptive_interval(self):
+        start_date = self.plg_inst.start_date
+        # job age (seconds) -> whether the status check is due
+        expected = {10: False, 125: True, 150: False, 3130: True, 3160: False,
+                    36000: True, 36040: False}
+        for job_age, is_due in expected.items():
+            now = start_date + timedelta(seconds=job_age)
+            with mock.patch.object(tasks.timezone, 'now', return_value=now), \
+                    mock.patch.object(
+                        tasks.check_compute_resource_plugin_instances_exec_status,
+                        'delay', return_value=None) as delay_mock:
+                tasks.check_started_plugin_instances_exec_status()
+                self.assertEqual(delay_mock.called, is_due, f'job age {job_age}')
+
+    @override_settings(PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL=120,
+                       PLUGIN_INSTANCE_STATUS_POLL_MAX_INTERVAL=1800,
+                       PLUGIN_INSTANCE_STATUS_POLL_AGE_FACTOR=0.1)
+    def test_task_check_started_plugin_instances_exec_status_measures_job_age(self):
+        # the instance was queued for ten hours before its job was submitted
+        exec_start_date = self.plg_inst.start_date + timedelta(hours=10)
+        PluginInstance.objects.filter(id=self.plg_inst.id).update(
+            exec_start_date=exec_start_date)
+        # job age (seconds) -> whether the status check is due
+        expected = {60: False, 125: True, 150: False, 245: True}
+        for job_age, is_due in expected.items():
+            now = exec_start_date + timedelta(seconds=job_age)
+            with mock.patch.object(tasks.timezone, 'now', return_value=now), \
+                    mock.patch.object(
+                        tasks.check_compute_resource_plugin_instances_exec_status,
+                        'delay', return_value=None) as delay_mock:
+                tasks.check_started_plugin_instances_exec_status()
+                self.assertEqual(delay_mock.called, is_due, f'job age {job_age}')
+
+    @override_settings(PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL=120,
+                       PLUGIN_INSTANCE_STATUS_POLL_MAX_INTERVAL=1800,
+                       PLUGIN_INSTANCE_STATUS_POLL_AGE_FACTOR=0.1)
+    def test_task_check_started_plugin_instances_exec_status_missed_tick(self):
+        start_date = self.plg_inst.start_date
+        # the job's status was last checked at age 125 and the polling ticks at ages
+        # 240 and 270 (when the next check became due) were missed
+        PluginInstance.objects.filter(id=self.plg_inst.id).update(
+            last_status_check=start_date + timedelta(seconds=125))
+        now = start_date + timedelta(seconds=300)
+        with mock.patch.object(tasks.timezone, 'now', return_value=now), \
+                mock.patch.object(
+                    tasks.check_compute_resource_plugin_instances_exec_status, 'delay',
+                    return_value=None) as delay_mock:
+            tasks.check_started_plugin_instances_exec_status()
+            delay_mock.assert_called_once_with(self.compute_resource.id,
+                                               [self.plg_inst.id])
+        self.plg_inst.refresh_from_db()
+        self.assertEqual(self.plg_inst.last_status_check, now)
+
+    @override_settings(PLUGIN_INSTANCE_STATUS_POLL_PERIOD=30,
+                       PLUGIN_INSTANCE_STATUS_POLL_MIN_INTERVAL=120,
+                       PLUGIN_INSTANCE_STATUS_POLL_MAX_INTERVAL=1800,
+                       PLUGIN_INSTANCE_STATUS_POLL_AGE_FACTOR=0.1)
+    def test_task_check_started_plugin_instances_exec_status_polls_older_jobs_less(self):
+        # collect the ages at which a job's status is checked over ten hours
+        period = 30
+        check_ages = [0]
+        for t in range(0, 36000 + 1, period):
+            if tasks.is_status_poll_due(t, check_ages[-1]):
+                check_ages.append(t)
+        check_ages = check_ages[1:]
+        intervals = [b - a for a, b in zip(check_ages, check_ages[1:])]
+        self.assertEqual(check_ages[:2], [120, 240])
+        self.assertTrue(all(120 - period <= i <= 1800 for i in intervals))
+        self.assertGreater(intervals[-1], intervals[0])
+        # a fixed 30 seconds polling would have checked 1200 times
+        self.assertLess(len(check_ages), 60)
+
+    def test_task_schedule_waiting_plugin_instances(self):
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name="mri_convert")
+        self.plg_inst.status = 'finishedSuccessfully'
+        self.plg_inst.save()
+        plg_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, previous=self.plg_inst,
+            compute_resource=self.compute_resource, status='waiting')
+        with mock.patch.object(tasks.run_plugin_instance, 'apply_async',
+                               return_value=None) as apply_async_mock:
+            tasks.schedule_waiting_plugin_instances()
+            self.assertEqual(apply_async_mock.call_args[0][0], (plg_inst.id,))
+        plg_inst.refresh_from_db()
+        self.assertEqual(plg_inst.status, 'scheduled')
+        self.assertIsNotNone(plg_inst.queued_date)  # it was queued before admission
+        # the task's lease was released
+        self.assertFalse(TaskLease.objects.exists())
+
+    def test_task_schedule_waiting_plugin_instances_is_set_based(self):
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name="mri_convert")
+        self.plg_inst.status = 'finishedSuccessfully'
+        self.plg_inst.save()
+        waiting_ids = []
+        query_counts = []
+        for n_instances in (10, 40):
+            for i in range(n_instances - len(waiting_ids)):
+                plg_inst = PluginInstance.objects.create(
+                    plugin=plugin, owner=user, previous=self.plg_inst,
+                    compute_resource=self.compute_resource, status='waiting')
+                waiting_ids.append(plg_inst.id)
+            PluginInstance.objects.filter(id__in=waiting_ids).update(status='waiting')
+            with mock.patch.object(tasks.run_plugin_instance, 'apply_async',
+                                   return_value=None) as apply_async_mock, \
+                    CaptureQueriesContext(connection) as queries:
+                tasks.schedule_waiting_plugin_instances()
+            query_counts.append(len(queries))
+            # all the instances were scheduled through a single broker producer
+            self.assertEqual(sorted(c[0][0][0] for c in apply_async_mock.call_args_list),
+                             waiting_ids)
+            producers = {c[1]['producer'] for c in apply_async_mock.call_args_list}
+            self.assertEqual(len(producers), 1)
+            self.assertEqual(PluginInstance.objects.filter(
+                id__in=waiting_ids, status='scheduled').count(), n_instances)
+        # the number of DB queries doesn't depend on the number of instances
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    @override_settings(PLUGIN_INSTANCE_SCHEDULE_BATCH_SIZE=3)
+    def test_task_schedule_waiting_plugin_instances_claims_in_batches(self):
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name="mri_convert")
+        self.plg_inst.status = 'finishedSuccessfully'
+        self.plg_inst.save()
+        for i in range(7):
+            PluginInstance.objects.create(
+                plugin=plugin, owner=user, previous=self.plg_inst,
+                compute_resource=self.compute_resource, status='waiting')
+        with mock.patch.object(tasks.run_plugin_instance, 'apply_async',
+                               return_value=None) as apply_async_mock, \
+                mock.patch.object(tasks, 'claim_waiting_plugin_instances',
+                                  wraps=tasks.claim_waiting_plugin_instances) as claim_mock:
+            tasks.schedule_waiting_plugin_instances()
+            self.assertEqual(apply_async_mock.call_count, 7)
+            self.assertEqual(claim_mock.call_count, 3)
+        self.assertFalse(PluginInstance.objects.filter(status='waiting').exists())
+
+    @override_settings(PLUGIN_INSTANCE_SCHEDULE_BATCH_SIZE=3, TASK_LEASE_TTL=0)
+    def test_task_schedule_waiting_plugin_instances_stops_before_lease_expires(self):
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name="mri_convert")
+        self.plg_inst.status = 'finishedSuccessfully'
+        self.plg_inst.save()
+        for i in range(7):
+            PluginInstance.objects.create(
+                plugin=plugin, owner=user, previous=self.plg_inst,
+                compute_resource=self.compute_resource, status='waiting')
+        with mock.patch.object(tasks.run_plugin_instance, 'apply_async',
+                               return_value=None) as apply_async_mock:
+            tasks.schedule_waiting_plugin_instances()
+            # a single batch was claimed, the next run claims the remaining instances
+            self.assertEqual(apply_async_mock.call_count, 3)
+        self.assertEqual(PluginInstance.objects.filter(status='waiting').count(), 4)
+
+    def test_task_schedule_waiting_plugin_instances_skipped_while_running(self):
+        lease_name = 'plugininstances.tasks.schedule_waiting_plugin_instances'
+        with lease_manager.lease(lease_name, 60) as acquired:
+            self.assertTrue(acquired)
+            with mock.patch.object(PluginInstance.objects, 'filter') as filter_mock:
+                self.assertIsNone(tasks.schedule_waiting_plugin_instances())
+                filter_mock.assert_not_called()
+
+    def test_task_check_compute_resource_plugin_instances_exec_status(self):
+        fake_pfcon = FakePfcon().start()
+        self.addCleanup(fake_pfcon.stop)
+        self.compute_resource.compute_url = fake_pfcon.url
+        self.compute_resource.save()
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name="pacspull")
+        plg_inst_ids = [self.plg_inst.id]
+        for i in range(49):
+            plg_inst = PluginInstance.objects.create(
+                plugin=plugin, owner=user, compute_resource=self.compute_resource,
+                status='started')
+            plg_inst_ids.append(plg_inst.id)
+        finished_ids = plg_inst_ids[:3]
+        for plg_inst_id in plg_inst_ids:
+            status = 'finishedSuccessfully' if plg_inst_id in finished_ids else 'started'
+            fake_pfcon.set_job(f'chris-jid-{plg_inst_id}', status, logs='running')
+        fake_pfcon.jobs.pop(f'chris-jid-{plg_inst_ids[-1]}')  # unknown job
+
+        with mock.patch.object(tasks.check_plugin_instance_exec_status, 'delay',
+                               return_value=None) as delay_mock:
+            tasks.check_compute_resource_plugin_instances_exec_status(
+                self.compute_resource.id, plg_inst_ids)
+
+            # a full status check is only scheduled for the finished jobs
+            self.assertEqual(sorted(c[0][0] for c in delay_mock.call_args_list),
+                             finished_ids)
+        # all the jobs' status was fetched through a single keep-alive connection
+        self.assertEqual(fake_pfcon.request_counts['GET'], 50)
+        self.assertEqual(fake_pfcon.connection_count, 1)
+        plg_inst = PluginInstance.objects.get(pk=plg_inst_ids[3])
+        self.assertIn('running', plg_inst.summary)
+
+        # running jobs whose status summary did not change are not updated in the DB
+        with mock.patch.object(tasks.check_plugin_instance_exec_status, 'delay',
+                               return_value=None):
+            # 1 query for the compute resource and 1 for the instances
+            with self.assertNumQueries(2):
+                tasks.check_compute_resource_plugin_instances_exec_status(
+                    self.compute_resource.id, plg_inst_ids[3:-1])
+
+
+class PipelineTestCase(TransactionTestCase):
+    """
+    Base test case that runs a 10-deep pipeline of plugin instances against a fake
+    pfcon.
+    """
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        self.fake_pfcon = FakePfcon().start()
+        self.addCleanup(self.fake_pfcon.stop)
+        # run the tasks synchronously
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        fake_swift_manager = FakeSwiftManager({})
+        patcher = mock.patch.object(tasks.PluginInstanceManager, 'swift_manager',
+                                    new_callable=mock.PropertyMock,
+                                    return_value=fake_swift_manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=self.fake_pfcon.url)
+        user = User.objects.create_user(username='foo', password='bar')
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (plugin_fs, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin_fs.compute_resources.set([compute_resource])
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='mri_convert', type='ds')
+        (plugin_ds, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin_ds.compute_resources.set([compute_resource])
+
+        # create a 10-deep pipeline of plugin instances
+        plg_inst = PluginInstance.objects.create(
+            plugin=plugin_fs, owner=user, compute_resource=compute_resource,
+            status='scheduled')
+        self.pipeline_ids = [plg_inst.id]
+        for i in range(9):
+            plg_inst = PluginInstance.objects.create(
+                plugin=plugin_ds, owner=user, previous=plg_inst,
+                compute_resource=compute_resource, status='waiting')
+            self.pipeline_ids.append(plg_inst.id)
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def run_pipeline(self):
+        """
+        Run the pipeline to completion. pfcon's status callbacks are simulated by
+        checking the status of the started instances and a beat tick of the periodic
+        scheduling task happens whenever nothing is running. Return the elapsed time and
+        the number of beat ticks that were needed.
+        """
+        start = time.monotonic()
+        beat_ticks = 0
+        tasks.run_plugin_instance(self.pipeline_ids[0])
+        instances = PluginInstance.objects.filter(id__in=self.pipeline_ids)
+        while instances.filter(status__in=('waiting', 'scheduled', 'started')).exists():
+            started_ids = list(instances.filter(status='started').values_list(
+                'id', flat=True))
+            for plg_inst_id in started_ids:
+                tasks.check_plugin_instance_exec_status(plg_inst_id)
+            if not started_ids:
+                beat_ticks += 1
+                tasks.schedule_waiting_plugin_instances()
+        return time.monotonic() - start, beat_ticks
+
+
+class PipelineDispatchTests(PipelineTestCase):
+    """
+    Test the dispatch of the plugin instances in a pipeline run against a fake pfcon.
+    """
+
+    def test_finished_instance_immediately_dispatches_next_instances(self):
+        elapsed, beat_ticks = self.run_pipeline()
+        statuses = PluginInstance.objects.filter(
+            id__in=self.pipeline_ids).values_list('status', flat=True)
+        self.assertEqual(set(statuses), {'finishedSuccessfully'})
+        # no instance had to wait for the periodic scheduling task
+        self.assertEqual(beat_ticks, 0)
+        self.assertEqual(self.fake_pfcon.request_counts['POST'], 10)
+        # the jobs' submission dates were recorded for the runtime models
+        self.assertFalse(PluginInstance.objects.filter(id__in=self.pipeline_ids,
+                                                       exec_start_date=None).exists())
+
+    def test_failed_instance_immediately_cancels_waiting_descendants(self):
+        self.fake_pfcon.submitted_job_status = 'finishedWithError'
+        elapsed, beat_ticks = self.run_pipeline()
+        plg_inst = PluginInstance.objects.get(id=self.pipeline_ids[0])
+        self.assertEqual(plg_inst.status, 'finishedWithError')
+        statuses = PluginInstance.objects.filter(
+            id__in=self.pipeline_ids[1:]).values_list('status', flat=True)
+        self.assertEqual(set(statuses), {'cancelled'})
+        self.assertEqual(beat_ticks, 0)
+
+
+class PluginInstanceStatusCallbackTests(LiveServerTestCase):
+    """
+    Test that a fake pfcon posting a job's status change to the status callback URL
+    sent with the job submission triggers the check of the plugin instance's status.
+    """
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        self.fake_pfcon = FakePfcon(submitted_job_status='started',
+                                    callback_auth=('chris', 'chris12')).start()
+        self.addCleanup(self.fake_pfcon.stop)
+        fake_swift_manager = FakeSwiftManager({})
+        patcher = mock.patch.object(tasks.PluginInstanceManager, 'swift_manager',
+                                    new_callable=mock.PropertyMock,
+                                    return_value=fake_swift_manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=self.fake_pfcon.url)
+        User.objects.create_user(username='chris', password='chris12')
+        user = User.objects.create_user(username='foo', password='bar')
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin.compute_resources.set([compute_resource])
+        self.plg_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, compute_resource=compute_resource,
+            status='scheduled')
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_pfcon_status_callback_enqueues_status_check(self):
+        callback_url = self.live_server_url + reverse('plugininstance-status-callback')
+        with override_settings(PLUGIN_INSTANCE_STATUS_CALLBACK_URL=callback_url):
+            tasks.run_plugin_instance(self.plg_inst.id)
+        job_id = f'chris-jid-{self.plg_inst.id}'
+        self.assertEqual(self.fake_pfcon.jobs[job_id]['callback_url'], callback_url)
+        self.plg_inst.refresh_from_db()
+        self.assertEqual(self.plg_inst.status, 'started')
+
+        with mock.patch.object(views.check_plugin_instance_exec_status, 'delay',
+                               return_value=None) as delay_mock:
+            response = self.fake_pfcon.change_job_status(job_id, 'finishedSuccessfully')
+            self.assertEqual(response.status_code, 202)
+            delay_mock.assert_called_once_with(self.plg_inst.id)
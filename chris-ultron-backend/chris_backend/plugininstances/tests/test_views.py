@@ -7,6 +7,8 @@ import os
 from unittest import mock, skip
 
 from django.test import TestCase, TransactionTestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -169,6 +171,8 @@ class PluginInstanceListViewTests(TasksViewTests):
             # check that the run_plugin_instance task was called with appropriate args
             delay_mock.assert_called_with(response.data['id'])
             self.assertEqual(response.data['status'], 'scheduled')
+            plg_inst = PluginInstance.objects.get(id=response.data['id'])
+            self.assertIsNotNone(plg_inst.queued_date)
 
         # now test 'ds' plugin instance (has previous plugin instance)
 
@@ -217,6 +221,47 @@ class PluginInstanceListViewTests(TasksViewTests):
             delay_mock.assert_not_called()
             self.assertEqual(response.data['status'], 'cancelled')
 
+    def test_plugin_instance_create_success_auto_compute_resource(self):
+        plugin = Plugin.objects.get(meta__name="pacspull")
+        PluginParameter.objects.get_or_create(plugin=plugin, name='dir', type='string',
+                                              optional=False)
+        (auto_free, tf) = ComputeResource.objects.get_or_create(
+            name='auto_free', compute_url=COMPUTE_RESOURCE_URL)
+        (free, tf) = ComputeResource.objects.get_or_create(
+            name='free', compute_url=COMPUTE_RESOURCE_URL, cpus=2000, memory=1000)
+        plugin.compute_resources.set([self.compute_resource, auto_free, free])
+        post = json.dumps(
+            {"template": {"data": [{"name": "dir", "value": self.user_space_path},
+                                   {"name": "compute_resource_name",
+                                    "value": 'auto_free'}]}})
+
+        with mock.patch.object(views.run_plugin_instance, 'delay',
+                               return_value=None) as delay_mock:
+            self.client.login(username=self.username, password=self.password)
+            response = self.client.post(self.create_read_url, data=post,
+                                        content_type=self.content_type)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data['compute_resource_name'], 'free')
+            delay_mock.assert_called_with(response.data['id'])
+
+    def test_plugin_instance_create_failure_auto_compute_resource_no_fit(self):
+        plugin = Plugin.objects.get(meta__name="pacspull")
+        PluginParameter.objects.get_or_create(plugin=plugin, name='dir', type='string',
+                                              optional=False)
+        (auto_free, tf) = ComputeResource.objects.get_or_create(
+            name='auto_free', compute_url=COMPUTE_RESOURCE_URL)
+        plugin.compute_resources.set([self.compute_resource, auto_free])
+        post = json.dumps(
+            {"template": {"data": [{"name": "dir", "value": self.user_space_path},
+                                   {"name": "compute_resource_name",
+                                    "value": 'auto_free'}]}})
+
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(self.create_read_url, data=post,
+                                    content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('HOST: plugin requires', response.data[0])
+
     @tag('integration')
     def test_integration_plugin_instance_create_success(self):
 
@@ -569,6 +614,32 @@ class PluginInstanceDetailViewTests(TasksViewTests):
         self.assertContains(response, "Test instance")
         self.assertContains(response, "cancelled")
 
+    def test_plugin_instance_update_cancels_descendants_with_constant_queries(self):
+        put = json.dumps({
+            "template": {"data": [{"name": "status", "value": "cancelled"}]}})
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(meta__name='pacspull')
+        plugin_ds = Plugin.objects.get(meta__name='mri_convert')
+        query_counts = []
+        for n_descendants in (1, 20):
+            root = PluginInstance.objects.create(plugin=plugin_fs, owner=user,
+                                                 compute_resource=self.compute_resource)
+            previous = root
+            for i in range(n_descendants):
+                previous = PluginInstance.objects.create(
+                    plugin=plugin_ds, owner=user, previous=previous, status='waiting',
+                    compute_resource=self.compute_resource)
+            self.client.login(username=self.username, password=self.password)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.put(
+                    reverse("plugininstance-detail", kwargs={"pk": root.id}),
+                    data=put, content_type=self.content_type)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+            self.assertFalse(root.get_descendant_instances().exclude(
+                status='cancelled').exists())
+        self.assertEqual(query_counts[0], query_counts[1])
+
     def test_plugin_instance_update_failure_current_status_is_finishedSuccessfully_or_finishedWithError(self):
         put = json.dumps({
             "template": {"data": [{"name": "status", "value": "cancelled"}]}})
@@ -615,6 +686,22 @@ class PluginInstanceDetailViewTests(TasksViewTests):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(PluginInstance.objects.count(), 0)
 
+    def test_plugin_instance_delete_updates_feed_job_status_counts(self):
+        plg_inst = PluginInstance.objects.get(plugin__meta__name='mri_convert')
+        PluginInstance.objects.create(plugin=plg_inst.plugin, owner=plg_inst.owner,
+                                      previous=plg_inst, status='finishedSuccessfully',
+                                      compute_resource=self.compute_resource)
+        feed = self.pl_inst.feed
+        self.assertEqual(feed.get_plugin_instances_status_count('created'), 2)
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.delete(reverse("plugininstance-detail",
+                                              kwargs={"pk": plg_inst.id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(feed.get_plugin_instances_status_count('created'), 1)
+        self.assertEqual(feed.get_plugin_instances_status_count('cancelled'), 0)
+        self.assertEqual(
+            feed.get_plugin_instances_status_count('finishedSuccessfully'), 0)
+
     def test_plugin_instance_delete_failure_unauthenticated(self):
         response = self.client.delete(self.read_update_delete_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -657,11 +744,100 @@ class PluginInstanceListQuerySearchViewTests(ViewTests):
         self.assertContains(response, 'created')
         self.assertNotContains(response,'finishedSuccessfully')
 
+    def test_plugin_instance_query_search_list_sparse_fieldset_success(self):
+        self.client.login(username=self.username, password=self.password)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url + '&fields=id,status')
+        item = response.data['results'][0]
+        self.assertEqual(set(item.keys()), {'url', 'id', 'status'})
+        # the large columns should not have been fetched from the DB
+        self.assertFalse([q for q in ctx.captured_queries if '"raw"' in q['sql']])
+        self.assertFalse([q for q in ctx.captured_queries if '"summary"' in q['sql']])
+
+    def test_plugin_instance_query_search_list_exclude_success(self):
+        self.client.login(username=self.username, password=self.password)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url + '&exclude=summary,raw')
+        item = response.data['results'][0]
+        self.assertNotIn('summary', item)
+        self.assertNotIn('raw', item)
+        self.assertIn('plugin_name', item)
+        self.assertFalse([q for q in ctx.captured_queries if '"raw"' in q['sql']])
+
     def test_plugin_instance_query_search_list_failure_unauthenticated(self):
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class PluginInstanceStatusCallbackViewTests(ViewTests):
+    """
+    Test the plugininstance-status-callback view.
+    """
+
+    def setUp(self):
+        super(PluginInstanceStatusCallbackViewTests, self).setUp()
+
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name="pacspull")
+        (self.plg_inst, tf) = PluginInstance.objects.get_or_create(
+            plugin=plugin, owner=user, compute_resource=plugin.compute_resources.all()[0])
+        self.plg_inst.status = 'started'
+        self.plg_inst.save()
+
+        self.callback_url = reverse("plugininstance-status-callback")
+        self.post = json.dumps({'jid': f'chris-jid-{self.plg_inst.id}',
+                                'status': 'finishedSuccessfully'})
+
+    def test_plugin_instance_status_callback_success(self):
+        self.client.login(username=self.chris_username, password=self.chris_password)
+        with mock.patch.object(views.check_plugin_instance_exec_status, 'delay',
+                               return_value=None) as delay_mock:
+            response = self.client.post(self.callback_url, data=self.post,
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            delay_mock.assert_called_once_with(self.plg_inst.id)
+
+    def test_plugin_instance_status_callback_success_job_still_running(self):
+        self.client.login(username=self.chris_username, password=self.chris_password)
+        post = json.dumps({'jid': f'chris-jid-{self.plg_inst.id}', 'status': 'started'})
+        with mock.patch.object(views.check_plugin_instance_exec_status, 'delay',
+                               return_value=None) as delay_mock:
+            response = self.client.post(self.callback_url, data=post,
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            delay_mock.assert_not_called()
+
+    def test_plugin_instance_status_callback_success_instance_not_started(self):
+        self.plg_inst.status = 'finishedSuccessfully'
+        self.plg_inst.save()
+        self.client.login(username=self.chris_username, password=self.chris_password)
+        with mock.patch.object(views.check_plugin_instance_exec_status, 'delay',
+                               return_value=None) as delay_mock:
+            response = self.client.post(self.callback_url, data=self.post,
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            delay_mock.assert_not_called()
+
+    def test_plugin_instance_status_callback_failure_invalid_job_id(self):
+        self.client.login(username=self.chris_username, password=self.chris_password)
+        for jid in ('jid-1', 'chris-jid-', f'chris-jid-{self.plg_inst.id + 1}'):
+            response = self.client.post(self.callback_url,
+                                        data=json.dumps({'jid': jid}),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_plugin_instance_status_callback_failure_unauthenticated(self):
+        response = self.client.post(self.callback_url, data=self.post,
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_plugin_instance_status_callback_failure_access_denied(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(self.callback_url, data=self.post,
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
 class PluginInstanceDescendantListViewTests(ViewTests):
     """
     Test the plugininstance-descendant-list view.
@@ -1,13 +1,16 @@
-from plugininstances.client import ChrisClient
 import logging
-import json
+
+from django.utils import timezone
 from rest_framework import generics
 from rest_framework import permissions
+from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
+from rest_framework.views import APIView
 
 from collectionjson import services
+from core.models import ChrisInstance
 from core.renderers import BinaryFileRenderer
 from plugins.models import Plugin
 
@@ -19,9 +22,12 @@ from .serializers import PARAMETER_SERIALIZERS
 from .serializers import GenericParameterSerializer, PluginInstanceSplitSerializer
 from .serializers import PluginInstanceSerializer, PluginInstanceFileSerializer
 from .permissions import (IsRelatedFeedOwnerOrChris, IsOwnerOrChrisOrReadOnly,
-                          IsOwnerOrReadOnly)
+                          IsOwnerOrReadOnly, IsChris)
 from .tasks import (run_plugin_instance, check_plugin_instance_exec_status,
                     cancel_plugin_instance)
+from .services.placement import (AUTO_COMPUTE_RESOURCE_NAMES,
+                                 AUTO_COMPUTE_RESOURCE_BUDGETS, select_compute_resource)
+from .services.scheduler import admit_queued_plugin_instances
 
 
 class PluginInstanceList(generics.ListCreateAPIView):
@@ -84,37 +90,9 @@ class PluginInstanceList(generics.ListCreateAPIView):
         # if no validation errors at this point then save to the DB
         cr_data = serializer.validated_data.get('compute_resource')
         if cr_data:
-            if cr_data['name'] == 'auto_free' or cr_data['name'] == 'auto_best':
-                plugin_name = serializer.validated_data.get('plugin_name')
-                self.logger.debug(type(cr_data['name']))
-                self.logger.debug("=========check name==========")
-                self.logger.debug(type(plugin))
-                self.logger.debug(plugin)
-                # self.logger.debug(plugin.name)
-                self.logger.debug("=========check title==========")
-                self.logger.debug(serializer.validated_data.get('title'))
-                # self.logger.debug(self.call_client(str(plugin)))
-                if cr_data['name'] == 'auto_best':
-                    compute_name, message = self.call_client(str(plugin), budget=1000000)
-                elif cr_data['name'] == 'auto_free':
-                    compute_name, message = self.call_client(str(plugin), budget=0)
-                self.logger.debug("=========check rec. compute env name==========")
-                self.logger.debug(compute_name)
-                if compute_name is None:
-                    error = ""
-                    message = json.loads(message)
-                    for cr in message:
-                        msg = " "
-                        key = cr.keys()
-                        for m in cr.values():
-                            msg = msg.join(m["message"])
-                        error = ''.join([error, f"{list(key)[0].upper()}: plugin requires: {msg}\n"])
-                    raise ValidationError(
-                        "No compute resources that match minimum plugin (%s) requirement\n %s" % (str(plugin), error))
-                self.logger.debug("=========requirement check passed==========")
-                self.logger.debug(f"Compute Resource Chosen: {compute_name}")
-                compute_resource = plugin.compute_resources.get(name=compute_name)
-                self.logger.debug("=========done==========")
+            if cr_data['name'] in AUTO_COMPUTE_RESOURCE_NAMES:
+                compute_resource = self.select_compute_resource(plugin, cr_data['name'],
+                                                                previous)
             else:
                 compute_resource = plugin.compute_resources.get(name=cr_data['name'])
         else:
@@ -125,11 +103,16 @@ class PluginInstanceList(generics.ListCreateAPIView):
             param_serializer.save(plugin_inst=plg_inst, plugin_param=param)
 
         if previous is None or previous.status == 'finishedSuccessfully':
-            # schedule the plugin's app to run
-            plg_inst.status = 'scheduled'  # status changes to 'scheduled' right away
+            # schedule the plugin's app to run when its compute resource has capacity,
+            # the compute resource's queue is admitted in fair-share order
+            plg_inst.status = 'queued'
+            plg_inst.queued_date = timezone.now()
             plg_inst.save()
-            run_plugin_instance.delay(plg_inst.id)  # call async task
-        elif previous.status in ('created', 'waiting', 'scheduled',
+            for plg_inst_id in admit_queued_plugin_instances(
+                    plg_inst.compute_resource_id):
+                run_plugin_instance.delay(plg_inst_id)  # call async task
+            plg_inst.refresh_from_db(fields=['status', 'compute_resource'])
+        elif previous.status in ('created', 'waiting', 'queued', 'scheduled',
                                  'registeringFiles', 'started'):
             plg_inst.status = 'waiting'
             plg_inst.save()
@@ -166,31 +149,33 @@ class PluginInstanceList(generics.ListCreateAPIView):
         Custom method to get the actual plugin instances' queryset.
         """
         plugin = self.get_object()
-        return self.filter_queryset(plugin.instances.all())
-
-    def call_client(self, plugin_name, budget):
-
-        c = ChrisClient(
-            address='http://localhost:8000/api/v1/',
-            username='chris',
-            password='chris1234'
-        )
-        self.logger.debug("=======(log) call_client ========")
-        self.logger.debug(plugin_name)
-        self.logger.debug(type(c))
-        # print(plugin.parameters.all())
-
-        match_dict, check, message, pass_list = c.check_plugin_compute_env(plugin_name, summary=True)
-        self.logger.debug("=======call_client : returning from req check========")
-        # self.logger.debug(match_dict)
-        self.logger.debug(check)
-        self.logger.debug(message)
-        self.logger.debug(pass_list)
-        if check == False:
-            return None, str(message)
-        compute_env = c.get_rec_compute_env(plugin_name, pass_list, budget=budget)
-        # message = match_dict['']
-        return compute_env, str(message)
+        return self.filter_queryset(plugin.instances.for_serializer(
+            self.get_serializer().fields))
+
+    def select_compute_resource(self, plugin, auto_name, previous):
+        """
+        Custom method to select the compute resource for the plugin when one of the
+        automatic compute resource options is requested. The output files of the
+        previous plugin instance are the new instance's input files.
+        """
+        budget = AUTO_COMPUTE_RESOURCE_BUDGETS[auto_name]
+        n_input_files = previous.files.count() if previous else None
+        compute_resource, matching = select_compute_resource(plugin, budget,
+                                                             n_input_files)
+        if compute_resource is None:
+            error = ''
+            for match in matching:
+                for cr_name, result in match.items():
+                    if not result['fit']:
+                        msg = ' '.join(result['message'])
+                        error += f"{cr_name.upper()}: plugin requires: {msg}\n"
+            if not error:
+                error = f"No compute resource with a cost within the budget ({budget})."
+            raise ValidationError(
+                "No compute resources that match minimum plugin (%s) requirement\n %s"
+                % (str(plugin), error))
+        self.logger.debug(f"Compute Resource Chosen: {compute_resource.name}")
+        return compute_resource
 
 
 class AllPluginInstanceList(generics.ListAPIView):
@@ -199,7 +184,6 @@ class AllPluginInstanceList(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = PluginInstanceSerializer
-    queryset = PluginInstance.objects.all()
     permission_classes = (permissions.IsAuthenticated,)
 
     def list(self, request, *args, **kwargs):
@@ -214,6 +198,13 @@ class AllPluginInstanceList(generics.ListAPIView):
         links = {'plugins': reverse('plugin-list', request=request)}
         return services.append_collection_links(response, links)
 
+    def get_queryset(self):
+        """
+        Overriden to only fetch the large columns of the plugin instances when they
+        are among the requested fields.
+        """
+        return PluginInstance.objects.for_serializer(self.get_serializer().fields)
+
 
 class AllPluginInstanceListQuerySearch(generics.ListAPIView):
     """
@@ -221,10 +212,16 @@ class AllPluginInstanceListQuerySearch(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = PluginInstanceSerializer
-    queryset = PluginInstance.objects.all()
     permission_classes = (permissions.IsAuthenticated,)
     filterset_class = PluginInstanceFilter
 
+    def get_queryset(self):
+        """
+        Overriden to only fetch the large columns of the plugin instances when they
+        are among the requested fields.
+        """
+        return PluginInstance.objects.for_serializer(self.get_serializer().fields)
+
 
 class PluginInstanceDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -262,12 +259,10 @@ class PluginInstanceDetail(generics.RetrieveUpdateDestroyAPIView):
         if 'status' in self.request.data:
             instance = self.get_object()
             if instance.status != 'cancelled':
-                descendants = instance.get_descendant_instances()
                 if instance.status == 'started':
                     cancel_plugin_instance.delay(instance.id)  # call async task
-                for plg_inst in descendants:
-                    plg_inst.status = 'cancelled'
-                    plg_inst.save()
+                # cancel all the descendants with a single DB update
+                instance.get_descendant_instances().update(status='cancelled')
 
         super(PluginInstanceDetail, self).perform_update(serializer)
 
@@ -277,17 +272,42 @@ class PluginInstanceDetail(generics.RetrieveUpdateDestroyAPIView):
         descendant instances are also cancelled before they are deleted by the DB CASCADE.
         """
         instance = self.get_object()
-        descendants = instance.get_descendant_instances()
         if instance.status == 'started':
             cancel_plugin_instance.delay(instance.id)  # call async task
-        for plg_inst in descendants:
-            if plg_inst.status not in ('finishedSuccessfully', 'finishedWithError',
-                                       'cancelled'):
-                plg_inst.status = 'cancelled'
-                plg_inst.save()
+        # cancel all the unfinished descendants with a single DB update
+        instance.get_descendant_instances().exclude(
+            status__in=('finishedSuccessfully', 'finishedWithError', 'cancelled')
+        ).update(status='cancelled')
         return super(PluginInstanceDetail, self).destroy(request, *args, **kwargs)
 
 
+class PluginInstanceStatusCallback(APIView):
+    """
+    A view for pfcon to notify a change in the remote status of a plugin instance's
+    job. The job status is then checked asynchronously (only when the job is no longer
+    running) instead of waiting for the periodic status polling.
+    """
+    http_method_names = ['post']
+    permission_classes = (permissions.IsAuthenticated, IsChris,)
+
+    def post(self, request, *args, **kwargs):
+        job_id = request.data.get('jid', '')
+        job_status = request.data.get('status')
+        job_id_prefix = ChrisInstance.load().job_id_prefix
+        plg_inst_id = job_id[len(job_id_prefix):]
+        if not job_id.startswith(job_id_prefix) or not plg_inst_id.isdigit():
+            raise ValidationError({'jid': [f"Invalid job id '{job_id}'."]})
+        try:
+            plg_inst = PluginInstance.objects.only('status').get(pk=int(plg_inst_id))
+        except PluginInstance.DoesNotExist:
+            raise ValidationError({'jid': [f"Couldn't find any plugin instance for "
+                                           f"job id '{job_id}'."]})
+        if plg_inst.status == 'started' and job_status not in ('notStarted', 'started'):
+            check_plugin_instance_exec_status.delay(plg_inst.id)  # call async task
+        return Response({'jid': job_id, 'status': plg_inst.status},
+                        status=status.HTTP_202_ACCEPTED)
+
+
 class PluginInstanceDescendantList(generics.ListAPIView):
     """
     A view for the collection of plugin instances that are a descendant of this plugin
@@ -310,7 +330,8 @@ class PluginInstanceDescendantList(generics.ListAPIView):
         Custom method to get the actual descendants queryset.
         """
         instance = self.get_object()
-        return self.filter_queryset(instance.get_descendant_instances())
+        queryset = instance.get_descendant_instances()
+        return self.filter_queryset(queryset.for_serializer(self.get_serializer().fields))
 
 
 class PluginInstanceSplitList(generics.ListCreateAPIView):
@@ -356,11 +377,15 @@ class PluginInstanceSplitList(generics.ListCreateAPIView):
                                             plugin_param=plg_filter_param,
                                             value=f)
             if instance.status == 'finishedSuccessfully':
-                # schedule the plugin's app to run
-                plg_inst.status = 'scheduled'  # status changes to 'scheduled' right away
+                # schedule the plugin's app to run when its compute resource has
+                # capacity, the compute resource's queue is admitted in fair-share order
+                plg_inst.status = 'queued'
+                plg_inst.queued_date = timezone.now()
                 plg_inst.save()
-                run_plugin_instance.delay(plg_inst.id)  # call async task
-            elif instance.status in ('created', 'waiting', 'scheduled',
+                for plg_inst_id in admit_queued_plugin_instances(
+                        plg_inst.compute_resource_id):
+                    run_plugin_instance.delay(plg_inst_id)  # call async task
+            elif instance.status in ('created', 'waiting', 'queued', 'scheduled',
                                      'registeringFiles', 'started'):
                 plg_inst.status = 'waiting'
                 plg_inst.save()
@@ -437,7 +462,7 @@ class PluginInstanceFileList(generics.ListAPIView):
         Custom method to get the actual files queryset.
         """
         instance = self.get_object()
-        return self.filter_queryset(instance.files.all())
+        return self.filter_queryset(instance.files.select_related('plugin_inst'))
 
 
 class AllPluginInstanceFileList(generics.ListAPIView):
@@ -466,8 +491,9 @@ class AllPluginInstanceFileList(generics.ListAPIView):
         user = self.request.user
         # if the user is chris then return all the files in the system
         if user.username == 'chris':
-            return PluginInstanceFile.objects.all()
-        return PluginInstanceFile.objects.filter(plugin_inst__feed__owner=user)
+            return PluginInstanceFile.objects.select_related('plugin_inst')
+        return PluginInstanceFile.objects.filter(
+            plugin_inst__feed__owner=user).select_related('plugin_inst')
 
 
 class AllPluginInstanceFileListQuerySearch(generics.ListAPIView):
@@ -488,8 +514,9 @@ class AllPluginInstanceFileListQuerySearch(generics.ListAPIView):
         user = self.request.user
         # if the user is chris then return all the files in the system
         if user.username == 'chris':
-            return PluginInstanceFile.objects.all()
-        return PluginInstanceFile.objects.filter(plugin_inst__feed__owner=user)
+            return PluginInstanceFile.objects.select_related('plugin_inst')
+        return PluginInstanceFile.objects.filter(
+            plugin_inst__feed__owner=user).select_related('plugin_inst')
 
 
 class PluginInstanceFileDetail(generics.RetrieveAPIView):
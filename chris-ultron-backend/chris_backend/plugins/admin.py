@@ -23,7 +23,7 @@ class ComputeResourceAdmin(admin.ModelAdmin):
     readonly_fields = ['creation_date', 'modification_date']
     list_display = (
         'name', 'compute_url', 'description', 'id', 'workers', 'cpus', 'cpu_clock_speed_ghz', 'gpus',
-        'gpu_memory', 'memory', 'cost', 'currency')
+        'gpu_memory', 'memory', 'cost', 'currency', 'data_transfer_workers')
     list_filter = ['name', 'creation_date', 'modification_date']
     search_fields = ['name', 'description']
 
@@ -32,7 +32,8 @@ class ComputeResourceAdmin(admin.ModelAdmin):
         Overriden to only show the required fields in the add compute resource page.
         """
         self.fields = ['name', 'compute_url', 'description', 'workers', 'cpus', 'cpu_clock_speed_ghz', 'gpus',
-                       'gpu_memory', 'memory', 'cost', 'currency']
+                       'gpu_memory', 'memory', 'cost', 'currency',
+                       'data_transfer_workers']
         return admin.ModelAdmin.add_view(self, request, form_url, extra_context)
 
     def change_view(self, request, object_id, form_url='', extra_context=None):
@@ -41,7 +42,7 @@ class ComputeResourceAdmin(admin.ModelAdmin):
         """
         self.fields = ['name', 'compute_url', 'description', 'creation_date',
                        'modification_date', 'workers', 'cpus', 'cpu_clock_speed_ghz', 'gpus', 'gpu_memory',
-                       'memory', 'cost', 'currency']
+                       'memory', 'cost', 'currency', 'data_transfer_workers']
         return admin.ModelAdmin.change_view(self, request, object_id, form_url,
                                             extra_context)
 
@@ -318,7 +319,7 @@ class ComputeResourceAdminList(generics.ListCreateAPIView):
         # append write template
         template_data = {'name': '', 'compute_url': '', 'description': '', 'workers': '', 'cpus': '',
                          'cpu_clock_speed_ghz': '', 'gpus': '', 'gpu_memory': '', 'memory': '',
-                         'cost': '', 'currency': ''}
+                         'cost': '', 'currency': '', 'data_transfer_workers': ''}
         return services.append_collection_template(response, template_data)
 
 
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugins', '0048_auto_20211108_1445'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computeresource',
+            name='data_transfer_workers',
+            field=models.IntegerField(blank=True, default=4),
+        ),
+    ]
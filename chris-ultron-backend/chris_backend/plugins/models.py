@@ -38,6 +38,7 @@ class ComputeResource(models.Model):
     memory = models.IntegerField(blank=True, default=0)
     cost = models.FloatField(blank=True, default=0.00)
     currency = models.CharField(max_length=300, blank=True, default = 'USD')
+    data_transfer_workers = models.IntegerField(blank=True, default=4)
 
     def __str__(self):
         return self.name
@@ -14,7 +14,51 @@ class ComputeResourceSerializer(serializers.HyperlinkedModelSerializer):
         model = ComputeResource
         fields = ('url', 'id', 'creation_date', 'modification_date', 'name',
                   'compute_url', 'description', 'workers', 'cpus', 'cpu_clock_speed_ghz', 'gpus',
-                  'gpu_memory', 'memory', 'cost', 'currency')
+                  'gpu_memory', 'memory', 'cost', 'currency', 'data_transfer_workers')
+
+
+class ComputeResourceUtilizationSerializer(serializers.HyperlinkedModelSerializer):
+    reserved_cpus = serializers.IntegerField(read_only=True)
+    reserved_memory = serializers.IntegerField(read_only=True)
+    reserved_gpus = serializers.IntegerField(read_only=True)
+    cpu_utilization = serializers.SerializerMethodField()
+    memory_utilization = serializers.SerializerMethodField()
+    gpu_utilization = serializers.SerializerMethodField()
+    running_jobs = serializers.IntegerField(read_only=True)
+    queued_jobs = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ComputeResource
+        fields = ('url', 'id', 'name', 'workers', 'cpus', 'memory', 'gpus',
+                  'reserved_cpus', 'reserved_memory', 'reserved_gpus', 'cpu_utilization',
+                  'memory_utilization', 'gpu_utilization', 'running_jobs',
+                  'queued_jobs')
+
+    def get_cpu_utilization(self, obj):
+        """
+        Overriden to get the fraction of the compute resource's cpus that is reserved.
+        """
+        return self._get_utilization(obj.reserved_cpus, obj.cpus)
+
+    def get_memory_utilization(self, obj):
+        """
+        Overriden to get the fraction of the compute resource's memory that is reserved.
+        """
+        return self._get_utilization(obj.reserved_memory, obj.memory)
+
+    def get_gpu_utilization(self, obj):
+        """
+        Overriden to get the fraction of the compute resource's gpus that is reserved.
+        """
+        return self._get_utilization(obj.reserved_gpus, obj.gpus)
+
+    @staticmethod
+    def _get_utilization(reserved, capacity):
+        """
+        Internal method to get the reserved fraction of a capacity (None if the
+        capacity is unlimited).
+        """
+        return round(reserved / capacity, 4) if capacity else None
 
 
 class PluginMetaSerializer(serializers.HyperlinkedModelSerializer):
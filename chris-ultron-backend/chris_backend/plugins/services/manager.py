@@ -21,6 +21,7 @@ from argparse import ArgumentParser
 from argparse import ArgumentError
 from chrisstoreclient.client import StoreClient
 
+from plugininstances.services.jobcounts import reconcile_feed_job_status_counts
 from plugins.models import ComputeResource
 from plugins.models import PluginMeta, Plugin
 from plugins.serializers import ComputeResourceSerializer
@@ -269,7 +270,8 @@ class PluginManager(object):
     def remove_plugin(self, id):
         """
         Remove an existing/registered plugin from the system. All the associated plugin
-        instances are cancelled before they are deleted by the DB CASCADE.
+        instances are cancelled before they are deleted by the DB CASCADE. The job
+        status counters of their feeds are then reconciled.
         """
         try:
             plugin = Plugin.objects.get(id=id)
@@ -277,10 +279,12 @@ class PluginManager(object):
             raise NameError("Couldn't find plugin with id '%s'" % id)
         for plg_inst in plugin.instances.all():
             plg_inst.cancel()
+        feed_ids = list(plugin.instances.values_list('feed_id', flat=True).distinct())
         if plugin.meta.plugins.count() == 1:
             plugin.meta.delete()  # the cascade deletes the plugin too
         else:
             plugin.delete()  # the cascade deletes the plugin instances too
+        reconcile_feed_job_status_counts(feed_ids)
 
     def remove_compute_resource(self, id):
         """
@@ -10,6 +10,7 @@ from rest_framework import status
 from plugins.models import PluginMeta, Plugin
 from plugins.models import PluginParameter, DefaultStrParameter
 from plugins.models import ComputeResource
+from plugininstances.models import PluginInstance
 
 
 COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
@@ -94,6 +95,39 @@ class ComputeResourceListQuerySearchViewTests(ViewTests):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class ComputeResourceUtilizationListViewTests(ViewTests):
+    """
+    Test the computeresource-utilization-list view.
+    """
+
+    def setUp(self):
+        super(ComputeResourceUtilizationListViewTests, self).setUp()
+        self.list_url = reverse("computeresource-utilization-list")
+        self.compute_resource.cpus = 4000
+        self.compute_resource.save()
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(meta__name='simplecopyapp')
+        for plg_inst_status in ('started', 'queued', 'queued'):
+            PluginInstance.objects.create(plugin=plugin_fs, owner=user,
+                                          compute_resource=self.compute_resource,
+                                          cpu_limit=1000, status=plg_inst_status)
+
+    def test_compute_resource_utilization_list_success(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        utilization = response.data['results'][0]
+        self.assertEqual(utilization['reserved_cpus'], 1000)
+        self.assertEqual(utilization['cpu_utilization'], 0.25)
+        self.assertIsNone(utilization['gpu_utilization'])  # unlimited
+        self.assertEqual(utilization['running_jobs'], 1)
+        self.assertEqual(utilization['queued_jobs'], 2)
+
+    def test_compute_resource_utilization_list_failure_unauthenticated(self):
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class ComputeResourceDetailViewTests(ViewTests):
     """
     Test the computeresource-detail view.
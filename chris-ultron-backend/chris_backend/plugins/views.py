@@ -3,10 +3,11 @@ from rest_framework import generics, permissions
 from rest_framework.reverse import reverse
 
 from collectionjson import services
+from plugininstances.services.scheduler import get_compute_resources_utilization
 
 from .models import ComputeResource, ComputeResourceFilter
 from .models import PluginMeta, PluginMetaFilter, Plugin, PluginFilter, PluginParameter
-from .serializers import ComputeResourceSerializer
+from .serializers import ComputeResourceSerializer, ComputeResourceUtilizationSerializer
 from .serializers import PluginMetaSerializer, PluginSerializer, PluginParameterSerializer
 
 
@@ -44,6 +45,31 @@ class ComputeResourceListQuerySearch(generics.ListAPIView):
     filterset_class = ComputeResourceFilter
 
 
+class ComputeResourceUtilizationList(generics.ListAPIView):
+    """
+    A view for the collection of compute resources' utilization, that is the
+    resources reserved by their in-flight plugin instances and their queue depth.
+    """
+    http_method_names = ['get']
+    serializer_class = ComputeResourceUtilizationSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        """
+        Overriden to annotate the compute resources with their utilization.
+        """
+        return get_compute_resources_utilization().order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Overriden to append document-level link relations to the response.
+        """
+        response = super(ComputeResourceUtilizationList, self).list(request, *args,
+                                                                    **kwargs)
+        links = {'compute_resources': reverse('computeresource-list', request=request)}
+        return services.append_collection_links(response, links)
+
+
 class ComputeResourceDetail(generics.RetrieveAPIView):
     """
     A compute resource view.
@@ -134,7 +160,7 @@ class PluginList(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = PluginSerializer
-    queryset = Plugin.objects.all()
+    queryset = Plugin.objects.select_related('meta')
     permission_classes = (permissions.IsAuthenticated,)
 
     def list(self, request, *args, **kwargs):
@@ -158,7 +184,7 @@ class PluginListQuerySearch(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = PluginSerializer
-    queryset = Plugin.objects.all()
+    queryset = Plugin.objects.select_related('meta')
     permission_classes = (permissions.IsAuthenticated,)
     filterset_class = PluginFilter
 
@@ -228,7 +254,8 @@ class PluginParameterList(generics.ListAPIView):
         Custom method to get the actual plugin parameters' queryset.
         """
         plugin = self.get_object()
-        return self.filter_queryset(plugin.parameters.all())
+        return self.filter_queryset(plugin.parameters.select_related(
+            'string_default', 'integer_default', 'float_default', 'boolean_default'))
 
 
 class PluginParameterDetail(generics.RetrieveAPIView):
@@ -16,7 +16,7 @@ class ServiceFileList(generics.ListCreateAPIView):
     A view for the collection of PACS files.
     """
     http_method_names = ['get', 'post']
-    queryset = ServiceFile.objects.all()
+    queryset = ServiceFile.objects.select_related('service')
     serializer_class = ServiceFileSerializer
     permission_classes = (permissions.IsAuthenticated, IsChrisOrReadOnly,)
 
@@ -47,7 +47,7 @@ class ServiceFileListQuerySearch(generics.ListAPIView):
     """
     http_method_names = ['get']
     serializer_class = ServiceFileSerializer
-    queryset = ServiceFile.objects.all()
+    queryset = ServiceFile.objects.select_related('service')
     permission_classes = (permissions.IsAuthenticated,)
     filterset_class = ServiceFileFilter
 